@@ -0,0 +1,85 @@
+# app/boot.py
+"""
+Startup helpers: lazily loaded heavy modules and an import-time report.
+
+    python -m app.boot [module ...]     # defaults to BOOT_MODULES
+"""
+import importlib.util
+import os
+import subprocess
+import sys
+from types import ModuleType
+from typing import List, NamedTuple, Optional, Sequence
+
+# What a short-lived job or a Streamlit rerun imports before doing any work
+BOOT_MODULES = ('app.dao.models', 'app.dao.repository.base_repository', 'app.services.session_manager')
+REPORT_LENGTH = 15
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    `name` as a module whose code runs on first attribute access, for numeric and plotting libraries
+    that only some code paths touch. Already imported modules are returned as they are.
+    Module-level annotations must not dereference the module (quote them).
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for modules imported by the statement itself
+
+
+def import_report(modules: Sequence[str] = BOOT_MODULES) -> List[ImportTime]:
+    """
+    Import times of `modules` and everything they pull in, measured in a fresh interpreter
+    (`-X importtime`), slowest cumulative first. Modules the interpreter loads at startup are left out.
+    """
+    startup = {timing.module for timing in _import_times('pass')}
+    timings = [timing for timing in _import_times('; '.join(f'import {module}' for module in modules))
+               if timing.module not in startup]
+    return sorted(timings, key=lambda timing: timing.cumulative_us, reverse=True)
+
+
+def _import_times(statement: str) -> List[ImportTime]:
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Running {statement!r} failed:\n{completed.stderr}")
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        timings.append(ImportTime(module.strip(), int(self_us), int(cumulative_us), depth))
+    return timings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    modules = list(argv if argv is not None else sys.argv[1:]) or list(BOOT_MODULES)
+    timings = import_report(modules)
+    total_us = sum(timing.cumulative_us for timing in timings if timing.depth == 0)
+    print(f"{'module':<60} {'self ms':>9} {'total ms':>9}")
+    for timing in timings[:REPORT_LENGTH]:
+        print(f'{timing.module:<60} {timing.self_us / 1000:>9.1f} {timing.cumulative_us / 1000:>9.1f}')
+    print(f"Cold import of {', '.join(modules)}: {total_us / 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
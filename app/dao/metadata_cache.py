@@ -0,0 +1,74 @@
+# app/dao/metadata_cache.py
+import glob
+import hashlib
+import os
+import pickle
+from typing import Optional
+
+from sqlalchemy import MetaData, text
+from sqlalchemy.engine import Engine, make_url
+
+from config import Config
+
+CACHED_SCHEMAS = 8  # pickles kept per cache root, most recently used first
+
+# Column layout of every user table; the standard catalog outside SQLite
+_INFORMATION_SCHEMA_COLUMNS = text(
+    "SELECT table_schema, table_name, column_name, data_type, is_nullable, column_default "
+    "FROM information_schema.columns "
+    "WHERE table_schema NOT IN ('information_schema', 'pg_catalog') "
+    "ORDER BY table_schema, table_name, ordinal_position"
+)
+
+
+def default_cache_root() -> str:
+    """`metadata_cache/` in the directory of the Config.DB_TEST database file (data/ for URLs without a file)."""
+    database = make_url(Config.DB_TEST).database or ''
+    return os.path.join(os.path.dirname(database) or 'data', 'metadata_cache')
+
+
+def schema_hash(engine: Engine) -> str:
+    """
+    SHA-256 of the database schema, read in one catalog query: the DDL of every SQLite object, or
+    the column layout from information_schema on other backends. Any migration changes it.
+    """
+    if engine.dialect.name == 'sqlite':
+        statement = text("SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name")
+    else:
+        statement = _INFORMATION_SCHEMA_COLUMNS
+    with engine.connect() as connection:
+        rows = connection.execute(statement).all()
+    digest = hashlib.sha256(engine.dialect.name.encode('utf-8'))
+    for row in rows:
+        digest.update(repr(tuple(row)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def reflect_metadata(engine: Engine, cache_root: Optional[str] = None) -> MetaData:
+    """
+    `MetaData` reflected from `engine`, loaded from a pickle keyed by `schema_hash()` when one
+    exists. Reflection inspects every table (a query per table and aspect); the hash is one query.
+    A changed schema reflects again; older pickles beyond CACHED_SCHEMAS are removed.
+    """
+    cache_root = cache_root or default_cache_root()
+    path = os.path.join(cache_root, f'metadata-{schema_hash(engine)}.pickle')
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as cache_file:
+                metadata = pickle.load(cache_file)
+            os.utime(path)
+            return metadata
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            pass  # unreadable or written by an incompatible SQLAlchemy: reflect again
+
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    os.makedirs(cache_root, exist_ok=True)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as cache_file:
+        pickle.dump(metadata, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+    cached = sorted(glob.glob(os.path.join(cache_root, 'metadata-*.pickle')), key=os.path.getmtime, reverse=True)
+    for stale in cached[CACHED_SCHEMAS:]:
+        os.remove(stale)
+    return metadata
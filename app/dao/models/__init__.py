@@ -7,8 +7,14 @@ from .document import Document
 from .historical_metrics import HistoricalMetrics
 from .historical_price import HistoricalPrice
 from .holding import Holding
+from .holding_checkpoint import HoldingCheckpoint
+from .price_adjustment import PriceAdjustment
+from .price_watermark import PriceWatermark
+from .sector_metric_aggregate import SectorMetricAggregate
 from .stock_sector import Stock, Sector
+from .stock_split import StockSplit
 from .valuation_model import ValuationModel
+from .valuation_memo import ValuationMemoEntry
 from .transaction import Transaction
 
 
@@ -1,15 +1,56 @@
 # app/dao/models/base.py
+import sqlalchemy as sa
 from sqlalchemy.orm import registry
-from sqlalchemy_continuum import make_versioned
+from sqlalchemy_continuum import make_versioned, versioning_manager, TransactionFactory
+from sqlalchemy_continuum.transaction import TransactionBase
+
+
+class VersionTransactionFactory(TransactionFactory):
+    """
+    Builds the continuum transaction log as `version_transaction`.
+    The default factory reuses any mapped class named `Transaction`, which here is the portfolio ledger.
+    """
+    model_name = 'VersionTransaction'
+
+    def create_class(self, manager):
+        class VersionTransaction(manager.declarative_base, TransactionBase):
+            __tablename__ = 'version_transaction'
+            __versioning_manager__ = manager
+
+            id = sa.Column(sa.BigInteger, sa.Sequence('version_transaction_id_seq'), primary_key=True, autoincrement=True)
+            remote_addr = sa.Column(sa.String(50))
+
+            # Maps an as-of timestamp to the last transaction issued by then
+            __table_args__ = (sa.Index('ix_version_transaction_issued_at', 'issued_at'),)
+
+        return VersionTransaction
+
+
+versioning_manager.transaction_cls = VersionTransactionFactory()
 
 # Call this before defining your mapped classes.
 make_versioned()
 
+
+@sa.event.listens_for(sa.orm.Mapper, 'after_configured')
+def _add_temporal_indexes():
+    """
+    Index (stock_id, transaction_id) on version tables that carry a stock_id, so as-of queries for
+    many stocks read only those stocks' versions. Runs after continuum has built the version tables.
+    """
+    for table in list(Base.metadata.tables.values()):
+        if table.name.endswith('_version') and 'stock_id' in table.c and 'transaction_id' in table.c:
+            name = f'ix_{table.name}_stock_temporal'
+            if not any(index.name == name for index in table.indexes):
+                sa.Index(name, table.c.stock_id, table.c.transaction_id)
+
 mapper_registry = registry()
 Base = mapper_registry.generate_base()
 
 class BaseModel(Base):
     __abstract__ = True
+    # Extra key read by the bulk loaders (not by continuum):
+    # 'bulk_versioning': 'coalesce' (one version transaction per chunk) | 'skip' (no version rows)
     __versioned__ = {}
 
     def __repr__(self):
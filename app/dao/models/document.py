@@ -1,19 +1,128 @@
 # app/dao/models/document.py
-from sqlalchemy import Column, Integer, String, ForeignKey, CheckConstraint, Text, LargeBinary
+import sqlite3
+import zlib
+
+from sqlalchemy import Column, Integer, String, ForeignKey, CheckConstraint, LargeBinary, DDL, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.types import TypeDecorator
 from .base import BaseModel
 
+CONTENT_COMPRESSION_LEVEL = 6
+
+
+def decompress_content(value):
+    """Text of a stored content value: zlib-compressed UTF-8 bytes, or plain text in rows written before compression."""
+    if value is None or isinstance(value, str):
+        return value
+    return zlib.decompress(value).decode('utf-8')
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as a zlib-compressed UTF-8 blob; transparent to ORM and Core statements."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(value.encode('utf-8'), CONTENT_COMPRESSION_LEVEL)
+
+    def process_result_value(self, value, dialect):
+        return decompress_content(value)
+
+
 class Document(BaseModel):
     __tablename__ = "document"
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True, unique=True)
-    content = Column(Text)
+    # Only loaded when accessed (or undefer()ed); DocumentRepository.stream_content reads it in chunks
+    content = deferred(Column(CompressedText))
     embedding = Column(LargeBinary) 
     
     stock_id = Column(Integer, ForeignKey("stocks.id", ondelete='SET NULL'), nullable=True)
     sector_id = Column(Integer, ForeignKey("sector.id", ondelete='SET NULL'), nullable=True)
 
+    stock = relationship("Stock", back_populates="documents")
+    sector = relationship("Sector", back_populates="documents")
+
     __table_args__ = (
         CheckConstraint('stock_id IS NOT NULL OR sector_id IS NOT NULL',
                         name='chk_stock_sector_presence'),
-    )
\ No newline at end of file
+    )
+
+
+# SQL function decompressing content inside SQLite, used by the full-text index below
+CONTENT_FUNCTION = "document_text"
+
+
+@event.listens_for(Engine, 'connect')
+def _register_content_function(dbapi_connection, connection_record):
+    # sqlite3 connections, and the aiosqlite adapter that mirrors their API
+    if isinstance(dbapi_connection, sqlite3.Connection) or type(dbapi_connection).__module__.startswith('sqlalchemy.dialects.sqlite'):
+        dbapi_connection.create_function(CONTENT_FUNCTION, 1, decompress_content, deterministic=True)
+        _create_apply_trigger(dbapi_connection)
+
+
+# SQLite FTS5 index over content. It is an external-content table reading the decompressed text
+# through a view (the text is only stored in `document`). The triggers do not call the content
+# function, so any connection (plain sqlite3 included) can write to `document`: they queue the id
+# and kind of every write, including Core and raw SQL, before a delete and after an insert. On
+# connections with the function, a TEMP trigger applies each queued write to the index at once while
+# `document` still holds the text it reads (the old text for a delete), as long as nothing else is
+# queued. Writes from other connections stay queued until DocumentRepository.sync_search_index().
+DOCUMENT_FTS_TABLE = "document_fts"
+DOCUMENT_FTS_QUEUE = "document_fts_queue"
+DOCUMENT_TEXT_VIEW = "document_text_view"
+DOCUMENT_FTS_APPLY_TRIGGER = "document_fts_apply"
+DOCUMENT_FTS_APPLY_DDL = (
+    f"CREATE TEMP TRIGGER IF NOT EXISTS {DOCUMENT_FTS_APPLY_TRIGGER} AFTER INSERT ON main.{DOCUMENT_FTS_QUEUE} "
+    f"WHEN (SELECT count(*) FROM {DOCUMENT_FTS_QUEUE}) = 1 BEGIN "
+    f"INSERT INTO {DOCUMENT_FTS_TABLE}({DOCUMENT_FTS_TABLE}, rowid, content) "
+    f"SELECT CASE new.op WHEN 'delete' THEN 'delete' END, id, {CONTENT_FUNCTION}(content) FROM document WHERE id = new.document_id; "
+    f"DELETE FROM {DOCUMENT_FTS_QUEUE} WHERE seq = new.seq; END"
+)
+DOCUMENT_FTS_DDL = (
+    f"CREATE VIEW IF NOT EXISTS {DOCUMENT_TEXT_VIEW} AS SELECT id, {CONTENT_FUNCTION}(content) AS content FROM document",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {DOCUMENT_FTS_TABLE} USING fts5("
+    f"content, content='{DOCUMENT_TEXT_VIEW}', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TABLE IF NOT EXISTS {DOCUMENT_FTS_QUEUE} (seq INTEGER PRIMARY KEY, document_id INTEGER NOT NULL, op TEXT NOT NULL)",
+    "CREATE TRIGGER IF NOT EXISTS document_fts_insert AFTER INSERT ON document BEGIN "
+    f"INSERT INTO {DOCUMENT_FTS_QUEUE}(document_id, op) VALUES (new.id, 'insert'); END",
+    "CREATE TRIGGER IF NOT EXISTS document_fts_delete BEFORE DELETE ON document BEGIN "
+    f"INSERT INTO {DOCUMENT_FTS_QUEUE}(document_id, op) VALUES (old.id, 'delete'); END",
+    "CREATE TRIGGER IF NOT EXISTS document_fts_update_old BEFORE UPDATE OF content ON document BEGIN "
+    f"INSERT INTO {DOCUMENT_FTS_QUEUE}(document_id, op) VALUES (old.id, 'delete'); END",
+    "CREATE TRIGGER IF NOT EXISTS document_fts_update_new AFTER UPDATE OF content ON document BEGIN "
+    f"INSERT INTO {DOCUMENT_FTS_QUEUE}(document_id, op) VALUES (new.id, 'insert'); END",
+    DOCUMENT_FTS_APPLY_DDL,
+)
+DOCUMENT_FTS_DROP = (
+    f"DROP TRIGGER IF EXISTS temp.{DOCUMENT_FTS_APPLY_TRIGGER}",
+    "DROP TRIGGER IF EXISTS document_fts_insert",
+    "DROP TRIGGER IF EXISTS document_fts_delete",
+    "DROP TRIGGER IF EXISTS document_fts_update",
+    "DROP TRIGGER IF EXISTS document_fts_update_old",
+    "DROP TRIGGER IF EXISTS document_fts_update_new",
+    f"DROP TABLE IF EXISTS {DOCUMENT_FTS_QUEUE}",
+    f"DROP TABLE IF EXISTS {DOCUMENT_FTS_TABLE}",
+    f"DROP VIEW IF EXISTS {DOCUMENT_TEXT_VIEW}",
+)
+
+
+def _create_apply_trigger(dbapi_connection):
+    # Databases without the queue (new, or created before it) get the trigger from the DDL below
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (DOCUMENT_FTS_QUEUE,))
+        if cursor.fetchone() is not None:
+            cursor.execute(DOCUMENT_FTS_APPLY_DDL)
+    finally:
+        cursor.close()
+
+
+for statement in DOCUMENT_FTS_DDL:
+    event.listen(Document.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in DOCUMENT_FTS_DROP:
+    event.listen(Document.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
\ No newline at end of file
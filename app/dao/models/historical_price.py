@@ -6,6 +6,8 @@ from .base import BaseModel
 class HistoricalPrice(BaseModel):
     """Daily historical prices for a stock"""
     __tablename__ = "historical_price"
+    # Append-only market data: bulk loads write no version rows
+    __versioned__ = {'bulk_versioning': 'skip'}
 
     date = Column(Date, primary_key=True)
     stock_id = Column(Integer, ForeignKey("stocks.id", ondelete='CASCADE'), primary_key=True)
@@ -0,0 +1,27 @@
+# app/dao/models/holding_checkpoint.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from .base import BaseModel
+
+class HoldingCheckpoint(BaseModel):
+    """
+    Position state per (portfolio, stock) after replaying the transaction ledger up to `last_transaction_id`.
+    Replays resume from the latest checkpoint instead of the first trade.
+    """
+    __tablename__ = "holding_checkpoint"
+    # Derived, append-only data
+    __versioned__ = {'bulk_versioning': 'skip'}
+
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolio.id", ondelete='CASCADE'), nullable=False)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete='CASCADE'), nullable=False)
+    last_transaction_id = Column(Integer, nullable=False)
+    as_of_date = Column(DateTime, nullable=False)  # transaction_date of the latest replayed trade
+    quantity = Column(Float, nullable=False)
+    cost_value = Column(Float, nullable=False)  # quantity * average cost basis
+    realised_pnl = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_holding_checkpoint_portfolio_cursor', 'portfolio_id', 'last_transaction_id'),
+    )
\ No newline at end of file
@@ -0,0 +1,21 @@
+# app/dao/models/price_adjustment.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey
+from .base import BaseModel
+
+class PriceAdjustment(BaseModel):
+    """
+    Persisted adjustment factors per corporate action (split or dividend ex-date) of a stock.
+    The cumulative factors multiply every raw bar dated before `ex_date` and on/after the previous event.
+    """
+    __tablename__ = "price_adjustment"
+    # Derived from stock_split, dividend and historical_price; recomputed per stock
+    __versioned__ = {'bulk_versioning': 'skip'}
+
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete='CASCADE'), primary_key=True)
+    ex_date = Column(Date, primary_key=True)
+    split_factor = Column(Float, nullable=False)  # 1 / split ratio (1.0 when no split)
+    dividend_factor = Column(Float, nullable=False)  # 1 - dividend / previous close (1.0 when no dividend)
+    cumulative_split = Column(Float, nullable=False)  # product of split factors from this event on
+    cumulative_total = Column(Float, nullable=False)  # product of split and dividend factors from this event on
+    updated_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
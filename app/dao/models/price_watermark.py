@@ -0,0 +1,16 @@
+# app/dao/models/price_watermark.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from .base import BaseModel
+
+class PriceWatermark(BaseModel):
+    """Last loaded historical_price date per stock (high-water mark for incremental syncs)"""
+    __tablename__ = "price_watermark"
+    __versioned__ = {'bulk_versioning': 'skip'}
+
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete='CASCADE'), primary_key=True)
+    last_date = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    stock = relationship("Stock", back_populates="price_watermark")
\ No newline at end of file
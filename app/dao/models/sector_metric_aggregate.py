@@ -0,0 +1,27 @@
+# app/dao/models/sector_metric_aggregate.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey
+from .base import BaseModel
+
+class SectorMetricAggregate(BaseModel):
+    """
+    Materialised distribution of one HistoricalMetrics ratio across the stocks of a sector for one quarter.
+    Each member stock contributes its latest metrics row of the quarter.
+    """
+    __tablename__ = "sector_metric_aggregate"
+    # Derived data, rebuilt from historical_metric on refresh
+    __versioned__ = {'bulk_versioning': 'skip'}
+
+    sector_id = Column(Integer, ForeignKey("sector.id", ondelete='CASCADE'), primary_key=True)
+    quarter = Column(Date, primary_key=True)  # last day of the calendar quarter
+    metric = Column(String, primary_key=True)  # HistoricalMetrics column name
+    count = Column(Integer, nullable=False)
+    mean = Column(Float)
+    median = Column(Float)
+    p10 = Column(Float)
+    p25 = Column(Float)
+    p75 = Column(Float)
+    p90 = Column(Float)
+    min = Column(Float)
+    max = Column(Float)
+    updated_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
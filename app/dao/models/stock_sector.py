@@ -4,8 +4,8 @@ from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 stock_sector_association = Table('stock_sector', BaseModel.metadata,
-    Column('stock_id', Integer, ForeignKey('stocks.id')),
-    Column('sector_id', Integer, ForeignKey('sector.id'))
+    Column('stock_id', Integer, ForeignKey('stocks.id'), primary_key=True),
+    Column('sector_id', Integer, ForeignKey('sector.id'), primary_key=True)
 )
 
 class Stock(BaseModel):
@@ -27,9 +27,12 @@ class Stock(BaseModel):
     
     historical_prices = relationship("HistoricalPrice", back_populates="stock", )
     dividends = relationship("Dividend", back_populates="stock")
+    splits = relationship("StockSplit", back_populates="stock")
     sectors = relationship("Sector", secondary=stock_sector_association, back_populates="stocks")
     historical_metrics = relationship("HistoricalMetrics", back_populates="stock")
     holding = relationship("Holding", back_populates="stock")
+    price_watermark = relationship("PriceWatermark", back_populates="stock", uselist=False)
+    documents = relationship("Document", back_populates="stock")
 
 class Sector(BaseModel):
     __tablename__ = "sector"
@@ -38,4 +41,5 @@ class Sector(BaseModel):
     name = Column(String, unique=True, nullable=False)
     description = Column(String)
     
-    stocks = relationship("Stock", secondary=stock_sector_association, back_populates="sectors")
\ No newline at end of file
+    stocks = relationship("Stock", secondary=stock_sector_association, back_populates="sectors")
+    documents = relationship("Document", back_populates="sector")
\ No newline at end of file
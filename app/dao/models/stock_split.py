@@ -0,0 +1,15 @@
+# app/dao/models/stock_split.py
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from sqlalchemy.orm import relationship
+from .base import BaseModel
+
+class StockSplit(BaseModel):
+    """Split event of a stock: `ratio` new shares per old share from `date` (ex-date) on, e.g. 2.0 for a 2-for-1 split"""
+    __tablename__ = "stock_split"
+
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete='CASCADE'), index=True)
+    date = Column(Date, nullable=False)
+    ratio = Column(Float, nullable=False)
+
+    stock = relationship("Stock", back_populates="splits")
\ No newline at end of file
@@ -0,0 +1,24 @@
+# app/dao/models/valuation_memo.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from .base import BaseModel
+
+class ValuationMemoEntry(BaseModel):
+    """
+    Content-addressed pointer to an existing valuation: `key` hashes the method, the normalised
+    parameters and assumptions, and a fingerprint of the input data the valuation read.
+    """
+    __tablename__ = "valuation_memo"
+    # Derived cache data
+    __versioned__ = {'bulk_versioning': 'skip'}
+
+    key = Column(String(64), primary_key=True)
+    valuation_id = Column(Integer, ForeignKey("valuation_model.id", ondelete='CASCADE'), nullable=False)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete='CASCADE'))
+    valuation_method = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_valuation_memo_last_used', 'last_used_at'),
+    )
\ No newline at end of file
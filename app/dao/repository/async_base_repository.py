@@ -0,0 +1,69 @@
+# app/dao/repository/async_base_repository.py
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dao.models.base import BaseModel
+from app.services.session_manager import AsyncDatabaseManager
+
+
+# Async counterpart of provide_session; every call without a session gets its own,
+# so independent calls can run concurrently under asyncio.gather
+@asynccontextmanager
+async def provide_async_session(db_manager: AsyncDatabaseManager,
+                                external_session: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    if external_session:
+        yield external_session
+    else:
+        async with db_manager.get_session() as session:
+            yield session
+
+
+class AsyncBaseRepository:
+    """Async counterparts of the BaseRepository CRUD operations"""
+    def __init__(self, model: Type[BaseModel], db_manager: AsyncDatabaseManager):
+        self.model = model
+        self.db_manager = db_manager
+
+    async def create_entity(self, entity: BaseModel, session: Optional[AsyncSession] = None) -> Tuple[bool, int]:
+        async with provide_async_session(self.db_manager, session) as active_session:
+            try:
+                active_session.add(entity)
+                await active_session.flush()
+                return True, entity.id
+            except Exception as e:
+                print(f"Error adding entity ({entity}): {e}")
+                return False, -1
+
+    async def retrieve_entity_by_id(self, entity_id: int, session: Optional[AsyncSession] = None) -> Optional[BaseModel]:
+        async with provide_async_session(self.db_manager, session) as active_session:
+            return await active_session.get(self.model, entity_id)
+
+    async def retrieve_entities_by_conditions(self, conditions: Dict, session: Optional[AsyncSession] = None) -> List[BaseModel]:
+        async with provide_async_session(self.db_manager, session) as active_session:
+            result = await active_session.scalars(select(self.model).filter_by(**conditions))
+            return list(result)
+
+    async def update_entity(self, entity: BaseModel, session: Optional[AsyncSession] = None) -> bool:
+        async with provide_async_session(self.db_manager, session) as active_session:
+            try:
+                await active_session.merge(entity)
+                return True
+            except Exception as e:
+                print(f"Error updating entity: {e}")
+                return False
+
+    async def delete_entity_by_id(self, entity_id: int, session: Optional[AsyncSession] = None) -> bool:
+        async with provide_async_session(self.db_manager, session) as active_session:
+            entity = await active_session.get(self.model, entity_id)
+            if not entity:
+                print(f"Entity with ID {entity_id} does not exist. Cannot delete.")
+                return False
+            try:
+                await active_session.delete(entity)
+                return True
+            except Exception as e:
+                print(f"Error deleting entity: {e}")
+                return False
@@ -0,0 +1,173 @@
+# app/dao/repository/base_repository.py
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy_continuum import version_class
+
+from app.dao.models.base import BaseModel
+from app.dao.repository.bulk_loader import BulkLoader, select_in
+from app.dao.repository.loader_profiles import LoaderProfile
+from app.dao.repository.temporal import as_of_statement, compact_versions, transaction_at
+from config import Config
+
+SessionLocal = sessionmaker()
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """Engine of the sessions provide_session opens, created on first use rather than at import."""
+    return create_engine(Config.DB_TEST)
+
+
+# A utility to optionally provide a session or create a new one
+@contextmanager
+def provide_session(external_session: Optional[Session] = None) -> Iterator[Session]:
+    if external_session:
+        yield external_session
+    else:
+        session = SessionLocal(bind=get_engine())
+        try:
+            yield session
+            session.commit()
+        except:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+class BaseRepository:
+    """Base repository class to provide common CRUD operations from ORM objects (DAO)"""
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+
+    def create_entity(self, entity: BaseModel, current_session: Optional[Session] = None) -> Tuple[bool, int]:
+        with provide_session(current_session) as active_session:
+            try:
+                active_session.add(entity)
+                active_session.flush()
+                return True, entity.id
+            except Exception as e:
+                print(f"Error adding entity ({entity}): {e}")
+                return False, -1
+
+    def retrieve_entity_by_id(self, entity_id: int, session: Optional[Session] = None,
+                              profile: Optional[LoaderProfile] = None) -> Optional[BaseModel]:
+        with provide_session(session) as active_session:
+            entity = active_session.get(self.model, entity_id, options=self._profile_options(profile))
+            if entity and session is None:
+                # Detach the whole loaded graph, not just the root, before commit expires it
+                active_session.expunge_all()
+            return entity
+
+    def update_entity(self, entity: BaseModel, session: Optional[Session] = None) -> bool:
+        with provide_session(session) as active_session:
+            try:
+                active_session.merge(entity)
+                return True
+            except Exception as e:
+                print(f"Error updating entity: {e}")
+                return False
+
+    def delete_entity_by_id(self, entity_id: int, session: Optional[Session] = None) -> bool:
+        with provide_session(session) as active_session:
+            entity = active_session.get(self.model, entity_id)
+            if not entity:
+                print(f"Entity with ID {entity_id} does not exist. Cannot delete.")
+                return False
+            try:
+                active_session.delete(entity)
+                return True
+            except Exception as e:
+                print(f"Error deleting entity: {e}")
+                return False
+
+    def bulk_create(self, entities: Sequence[BaseModel], session: Optional[Session] = None) -> Tuple[bool, List[int]]:
+        """Insert many entities in one flush (batched INSERT ... RETURNING) and return their ids."""
+        with provide_session(session) as active_session:
+            try:
+                active_session.add_all(entities)
+                active_session.flush()
+                return True, [entity.id for entity in entities]
+            except Exception as e:
+                print(f"Error adding {len(entities)} {self.model.__name__} entities: {e}")
+                return False, []
+
+    def bulk_upsert(self, rows: Sequence[Dict], conflict_keys: Sequence[str],
+                    session: Optional[Session] = None) -> Tuple[bool, List[int]]:
+        """Insert or update plain row dicts on `conflict_keys` with chunked executemany; returns ids in input order."""
+        loader = BulkLoader(self.model, conflict_keys=conflict_keys)
+        with provide_session(session) as active_session:
+            try:
+                return True, loader.load_rows_returning(rows, active_session)
+            except Exception as e:
+                print(f"Error upserting {len(rows)} {self.model.__name__} rows: {e}")
+                return False, []
+
+    def retrieve_many(self, entity_ids: Sequence, session: Optional[Session] = None,
+                      profile: Optional[LoaderProfile] = None) -> List[BaseModel]:
+        """Fetch entities by primary key with IN-lists chunked under SQLite's bound-parameter limit."""
+        primary_key = list(self.model.__mapper__.primary_key)
+        keys = [key if isinstance(key, tuple) else (key,) for key in entity_ids]
+        statement = select(self.model).options(*self._profile_options(profile))
+        with provide_session(session) as active_session:
+            entities = [row[0] for row in select_in(active_session, statement, primary_key, keys)]
+            if session is None:
+                active_session.expunge_all()
+            return entities
+
+    def retrieve_entities_by_conditions(self, conditions: Dict, session: Optional[Session] = None,
+                                        profile: Optional[LoaderProfile] = None) -> List[BaseModel]:
+        with provide_session(session) as active_session:
+            statement = select(self.model).filter_by(**conditions).options(*self._profile_options(profile))
+            entities = list(active_session.scalars(statement))
+            if session is None:
+                active_session.expunge_all()
+            return entities
+
+    def retrieve_as_of(self, as_of: datetime, conditions: Optional[Dict] = None,
+                       session: Optional[Session] = None) -> List[BaseModel]:
+        """
+        Versions (continuum version objects) of the entities as they were at `as_of`, in one query.
+        A list, tuple or set condition value matches any of its items, e.g. {'stock_id': stock_ids}.
+        """
+        with provide_session(session) as active_session:
+            transaction_id = transaction_at(active_session, as_of)
+            if transaction_id is None:
+                return []
+            version = version_class(self.model)
+            statement = as_of_statement(self.model, transaction_id)
+            chunked_name = None  # the first list condition is chunked under the bound-parameter limit
+            for name, value in (conditions or {}).items():
+                column = getattr(version, name)
+                if not isinstance(value, (list, tuple, set)):
+                    statement = statement.where(column == value)
+                elif chunked_name is None:
+                    chunked_name = name
+                else:
+                    statement = statement.where(column.in_(list(value)))
+            if chunked_name is not None:
+                keys = [(value,) for value in set(conditions[chunked_name])]
+                versions = [row[0] for row in select_in(active_session, statement, [getattr(version, chunked_name)], keys)]
+            else:
+                versions = list(active_session.scalars(statement))
+            if session is None:
+                active_session.expunge_all()
+            return versions
+
+    def compact_history(self, before: datetime, period: str = 'month', session: Optional[Session] = None) -> int:
+        """Reduce version history older than `before` to one snapshot per entity and period; returns rows deleted."""
+        with provide_session(session) as active_session:
+            return compact_versions(active_session, self.model, before, period)
+
+    def _profile_options(self, profile: Optional[LoaderProfile]) -> tuple:
+        if profile is None:
+            return ()
+        if profile.model is not self.model:
+            raise ValueError(f"Loader profile {profile.name} is for {profile.model.__name__}, not {self.model.__name__}")
+        return profile.options
@@ -0,0 +1,184 @@
+# app/dao/repository/bulk_loader.py
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Type
+
+from sqlalchemy import Date, DateTime, Float, Integer, Table, bindparam, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy_continuum import Operation, version_class, versioning_manager
+
+from app.boot import lazy_import
+from app.dao.models.base import BaseModel
+from app.dao.models.historical_price import HistoricalPrice
+
+DEFAULT_CHUNK_SIZE = 5000
+# SQLite builds before 3.32 cap a statement at 999 bound parameters
+MAX_BIND_PARAMS = 999
+
+# Only the frame/array loaders need NumPy; plain repository use should not pay for importing it
+np = lazy_import('numpy')
+
+
+def chunked(items: Sequence, size: int) -> Iterator[Sequence]:
+    """Yield consecutive slices of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upsert_statement(table: Table, conflict_keys: Sequence[str], columns: Iterable[str], dialect_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE for the given dialect, updating only the supplied columns."""
+    if dialect_name == 'sqlite':
+        stmt = sqlite.insert(table)
+    elif dialect_name == 'postgresql':
+        stmt = postgresql.insert(table)
+    else:
+        raise NotImplementedError(f"Upserts are not supported for the '{dialect_name}' dialect")
+
+    update_columns = {name: stmt.excluded[name] for name in columns if name not in conflict_keys}
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=list(conflict_keys))
+    return stmt.on_conflict_do_update(index_elements=list(conflict_keys), set_=update_columns)
+
+
+class BulkLoader:
+    """
+    Writes plain row dicts with chunked executemany upserts, bypassing per-row ORM objects.
+    Continuum only versions ORM flushes, so the model's `bulk_versioning` option decides
+    whether each chunk gets one coalesced version transaction or none at all.
+    """
+    VERSIONING_MODES = ('coalesce', 'skip')
+
+    def __init__(self, model: Type[BaseModel], conflict_keys: Optional[Sequence[str]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, versioning: Optional[str] = None):
+        self.model = model
+        self.table = model.__table__
+        self.conflict_keys = list(conflict_keys or [column.name for column in self.table.primary_key])
+        self.chunk_size = chunk_size
+        self.versioning = versioning or model.__versioned__.get('bulk_versioning', 'coalesce')
+        if self.versioning not in self.VERSIONING_MODES:
+            raise ValueError(f"Unknown versioning mode '{self.versioning}', expected one of {self.VERSIONING_MODES}")
+
+    def load_rows(self, rows: Sequence[Dict], session: Session) -> int:
+        """Upsert rows (dicts sharing the same keys) and return the number of rows written."""
+        if not rows:
+            return 0
+        stmt = upsert_statement(self.table, self.conflict_keys, rows[0].keys(), session.get_bind().dialect.name)
+        loaded = 0
+        for chunk in chunked(rows, self.chunk_size):
+            session.execute(stmt, list(chunk))
+            if self.versioning == 'coalesce':
+                self._write_versions(chunk, session)
+            loaded += len(chunk)
+        return loaded
+
+    def load_rows_returning(self, rows: Sequence[Dict], session: Session, column: str = 'id') -> list:
+        """Upsert rows like load_rows, returning `column` for every row in input order."""
+        if not rows:
+            return []
+        stmt = upsert_statement(self.table, self.conflict_keys, rows[0].keys(), session.get_bind().dialect.name)
+        stmt = stmt.returning(self.table.c[column], sort_by_parameter_order=True)
+        returned = []
+        for chunk in chunked(rows, self.chunk_size):
+            returned.extend(session.scalars(stmt, list(chunk)))
+            if self.versioning == 'coalesce':
+                self._write_versions(chunk, session)
+        return returned
+
+    def _write_versions(self, chunk: Sequence[Dict], session: Session) -> None:
+        """Record the upserted chunk's resulting rows under a single continuum transaction."""
+        version_table = version_class(self.model).__table__
+        transaction_table = versioning_manager.transaction_cls.__table__
+        transaction_id = session.execute(
+            insert(transaction_table).values(issued_at=datetime.utcnow())
+        ).inserted_primary_key[0]
+
+        # Re-read full rows: the chunk may omit the primary key or unchanged columns
+        keys = [tuple(row[key] for key in self.conflict_keys) for row in chunk]
+        stored = [
+            dict(row._mapping) for row in
+            select_in(session, select(self.table), [self.table.c[key] for key in self.conflict_keys], keys)
+        ]
+        primary_key = [column.name for column in self.table.primary_key]
+        version_key = [version_table.c[name] for name in primary_key]
+        current = {
+            tuple(row) for row in select_in(
+                session,
+                select(*version_key).where(version_table.c.end_transaction_id.is_(None)),
+                version_key,
+                [tuple(row[name] for name in primary_key) for row in stored],
+            )
+        }
+
+        if current:
+            close_previous = (
+                version_table.update()
+                .where(version_table.c.end_transaction_id.is_(None),
+                       *[column == bindparam(f'_{column.name}') for column in version_key])
+                .values(end_transaction_id=transaction_id)
+            )
+            session.execute(close_previous, [
+                {f'_{column.name}': value for column, value in zip(version_key, key)} for key in current
+            ])
+
+        version_columns = set(version_table.c.keys())
+        session.execute(insert(version_table), [
+            {**{name: value for name, value in row.items() if name in version_columns},
+             'transaction_id': transaction_id, 'end_transaction_id': None,
+             'operation_type': Operation.UPDATE if tuple(row[name] for name in primary_key) in current else Operation.INSERT}
+            for row in stored
+        ])
+
+
+def select_in(session: Session, stmt, key_columns: List, keys: Sequence[tuple]) -> list:
+    """Run `stmt` filtered to rows whose `key_columns` match `keys`, chunking the IN-list under MAX_BIND_PARAMS."""
+    rows = []
+    for key_chunk in chunked(keys, MAX_BIND_PARAMS // len(key_columns)):
+        if len(key_columns) == 1:
+            condition = key_columns[0].in_([key[0] for key in key_chunk])
+        else:
+            condition = tuple_(*key_columns).in_(key_chunk)
+        rows.extend(session.execute(stmt.where(condition)))
+    return rows
+
+
+class HistoricalPriceBulkLoader(BulkLoader):
+    """Loads daily OHLC bars into historical_price from NumPy arrays or DataFrames."""
+    # Feed files use the short names, the table uses *_price
+    COLUMN_ALIASES = {'open': 'open_price', 'high': 'high_price', 'low': 'low_price', 'close': 'close_price'}
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, versioning: Optional[str] = None):
+        super().__init__(HistoricalPrice, conflict_keys=['date', 'stock_id'], chunk_size=chunk_size, versioning=versioning)
+
+    def load_ohlc(self, stock_id, date, open, high, low, close, session: Session) -> int:
+        """Load aligned arrays of bars. `stock_id` may be a scalar for a single stock's history."""
+        return self.load_frame(
+            {'stock_id': stock_id, 'date': date, 'open': open, 'high': high, 'low': low, 'close': close},
+            session,
+        )
+
+    def load_frame(self, frame: Mapping, session: Session) -> int:
+        """Load a DataFrame (or mapping of column -> array). Unknown columns such as volume are ignored."""
+        columns = {}
+        for name in frame.keys():
+            column_name = self.COLUMN_ALIASES.get(name, name)
+            if column_name in self.table.c:
+                columns[column_name] = np.asarray(frame[name])
+
+        length = max((values.size for values in columns.values() if values.ndim), default=0)
+        names = list(columns)
+        values = [_to_python(np.broadcast_to(columns[name], (length,)), self.table.c[name].type) for name in names]
+        rows = [dict(zip(names, row)) for row in zip(*values)]
+        return self.load_rows(rows, session)
+
+
+def _to_python(values: 'np.ndarray', column_type) -> list:
+    """Convert a column array into DB-API friendly Python values in one vectorised step."""
+    if isinstance(column_type, Date):
+        return values.astype('datetime64[D]').tolist()
+    if isinstance(column_type, DateTime):
+        return values.astype('datetime64[us]').tolist()
+    if isinstance(column_type, Integer):
+        return values.astype(np.int64).tolist()
+    if isinstance(column_type, Float):
+        return values.astype(np.float64).tolist()
+    return values.tolist()
@@ -0,0 +1,185 @@
+# app/dao/repository/document_repository.py
+import codecs
+import sqlite3
+import zlib
+from typing import Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import LargeBinary, bindparam, func, literal_column, select, text, type_coerce, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column, table
+
+from app.dao.models import Document
+from app.dao.models.document import (CONTENT_FUNCTION, DOCUMENT_FTS_DDL, DOCUMENT_FTS_DROP, DOCUMENT_FTS_QUEUE,
+                                     DOCUMENT_FTS_TABLE)
+from app.dao.repository.base_repository import BaseRepository, provide_session
+from app.dao.repository.bulk_loader import DEFAULT_CHUNK_SIZE
+
+STREAM_CHUNK_SIZE = 64 * 1024  # compressed bytes read per step
+
+# Lightweight handle on the FTS5 table; it is created by DDL hooks, not by the metadata
+document_fts = table(DOCUMENT_FTS_TABLE, column('rowid'), column('content'))
+_FTS = literal_column(DOCUMENT_FTS_TABLE)
+
+# Indexes the current text of documents with queued inserts, once each
+_APPLY_QUEUED_INSERTS = text(
+    f"INSERT INTO {DOCUMENT_FTS_TABLE}(rowid, content) "
+    f"SELECT id, {CONTENT_FUNCTION}(content) FROM document "
+    f"WHERE id IN (SELECT document_id FROM {DOCUMENT_FTS_QUEUE} WHERE seq <= :last)"
+)
+
+
+class SearchIndexMissing(RuntimeError):
+    """The database predates the full-text index or its queue; DocumentRepository.rebuild_search_index() creates them."""
+
+
+def fts_phrase(words: str) -> str:
+    """Quote free text as one FTS5 phrase, so its punctuation is not read as query syntax."""
+    return '"' + words.replace('"', '""') + '"'
+
+
+class DocumentHit(NamedTuple):
+    document_id: int
+    filename: str
+    stock_id: Optional[int]
+    sector_id: Optional[int]
+    score: float  # negated bm25: higher is more relevant
+    snippet: str
+
+
+class DocumentRepository(BaseRepository):
+    """Document CRUD plus ranked keyword search through the SQLite FTS5 index."""
+    def __init__(self):
+        super().__init__(Document)
+
+    def search(self, query: str, limit: int = 20, stock_id: Optional[int] = None, sector_id: Optional[int] = None,
+               snippet_tokens: int = 12, session: Optional[Session] = None) -> List[DocumentHit]:
+        """
+        Documents matching the FTS5 `query` (e.g. 'goodwill AND impairment', '"goodwill impairment"', 'impair*'),
+        best bm25 first, with a highlighted [..] snippet. Use `fts_phrase()` for untrusted free text.
+        Read-only: writes from connections without the content function show up after `sync_search_index()`.
+        """
+        rank = func.bm25(_FTS)
+        stmt = (
+            select(Document.id, Document.filename, Document.stock_id, Document.sector_id, rank,
+                   func.snippet(_FTS, 0, '[', ']', '...', snippet_tokens))
+            .select_from(document_fts)
+            .join(Document, Document.id == document_fts.c.rowid)
+            .where(_FTS.op('MATCH')(query))
+            .order_by(rank)
+            .limit(limit)
+        )
+        if stock_id is not None:
+            stmt = stmt.where(Document.stock_id == stock_id)
+        if sector_id is not None:
+            stmt = stmt.where(Document.sector_id == sector_id)
+        with provide_session(session) as active_session:
+            try:
+                rows = active_session.execute(stmt).all()
+            except OperationalError as e:
+                self._require_search_index(active_session)
+                raise ValueError(f"Invalid full-text query {query!r}: {e.orig}") from e
+        return [DocumentHit(document_id, filename, stock, sector, -score, snippet)
+                for document_id, filename, stock, sector, score, snippet in rows]
+
+    def stream_content(self, document_id: int, chunk_size: int = STREAM_CHUNK_SIZE,
+                       session: Optional[Session] = None) -> Iterator[str]:
+        """
+        Yield the content of a document as text chunks, decompressing `chunk_size` bytes at a time.
+        On SQLite the blob is read incrementally, so neither the compressed nor the full text is held in memory.
+        """
+        with provide_session(session) as active_session:
+            kind = active_session.execute(
+                select(func.typeof(Document.__table__.c.content)).where(Document.id == document_id)
+            ).scalar()
+            if kind is None:
+                raise KeyError(f"Document {document_id} does not exist")
+            if kind == 'null':
+                return
+            if kind == 'text':
+                # Written before content was compressed
+                value = active_session.scalar(select(Document.content).where(Document.id == document_id))
+                for start in range(0, len(value), chunk_size):
+                    yield value[start:start + chunk_size]
+                return
+
+            decompressor = zlib.decompressobj()
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            for chunk in self._compressed_chunks(active_session, document_id, chunk_size):
+                piece = decoder.decode(decompressor.decompress(chunk))
+                if piece:
+                    yield piece
+            tail = decoder.decode(decompressor.flush(), final=True)
+            if tail:
+                yield tail
+
+    def compress_content(self, session: Optional[Session] = None) -> int:
+        """Compress content rows stored as plain text before compression was introduced. Returns rows rewritten."""
+        documents = Document.__table__
+        rewritten = 0
+        with provide_session(session) as active_session:
+            while True:
+                rows = active_session.execute(
+                    select(documents.c.id, documents.c.content)
+                    .where(func.typeof(documents.c.content) == 'text')
+                    .limit(DEFAULT_CHUNK_SIZE)
+                ).all()
+                if not rows:
+                    return rewritten
+                active_session.execute(
+                    update(documents).where(documents.c.id == bindparam('document_id')).values(content=bindparam('text')),
+                    [{'document_id': document_id, 'text': content} for document_id, content in rows],
+                )
+                rewritten += len(rows)
+
+    def sync_search_index(self, session: Optional[Session] = None) -> int:
+        """
+        Apply the writes queued by connections without the content function (e.g. plain sqlite3) to the index.
+        Inserts are indexed from `document`; the old text of a queued update or delete is gone by now, so
+        any of those re-index every document instead. Returns queued writes applied.
+        """
+        with provide_session(session) as active_session:
+            self._require_search_index(active_session)
+            last, pending, deletes = active_session.execute(text(
+                f"SELECT max(seq), count(*), count(*) FILTER (WHERE op = 'delete') FROM {DOCUMENT_FTS_QUEUE}"
+            )).one()
+            if not pending:
+                return 0
+            if deletes:
+                active_session.execute(text(f"INSERT INTO {DOCUMENT_FTS_TABLE}({DOCUMENT_FTS_TABLE}) VALUES ('rebuild')"))
+            else:
+                active_session.execute(_APPLY_QUEUED_INSERTS, {'last': last})
+            active_session.execute(text(f"DELETE FROM {DOCUMENT_FTS_QUEUE} WHERE seq <= :last"), {'last': last})
+            return pending
+
+    def rebuild_search_index(self, session: Optional[Session] = None) -> None:
+        """(Re)create the index, its view, queue and triggers (for databases created before them) and re-index all content."""
+        with provide_session(session) as active_session:
+            for statement in (*DOCUMENT_FTS_DROP, *DOCUMENT_FTS_DDL):
+                active_session.execute(text(statement))
+            active_session.execute(text(f"INSERT INTO {DOCUMENT_FTS_TABLE}({DOCUMENT_FTS_TABLE}) VALUES ('rebuild')"))
+
+    @staticmethod
+    def _require_search_index(session: Session) -> None:
+        found = set(session.scalars(
+            text("SELECT name FROM sqlite_master WHERE name IN (:index, :queue)"),
+            {'index': DOCUMENT_FTS_TABLE, 'queue': DOCUMENT_FTS_QUEUE},
+        ))
+        missing = sorted({DOCUMENT_FTS_TABLE, DOCUMENT_FTS_QUEUE} - found)
+        if missing:
+            raise SearchIndexMissing(f"Missing {', '.join(missing)}: run DocumentRepository.rebuild_search_index() "
+                                     "to create the full-text index for this database")
+
+    @staticmethod
+    def _compressed_chunks(session: Session, document_id: int, chunk_size: int) -> Iterator[bytes]:
+        connection = session.connection().connection.driver_connection
+        if isinstance(connection, sqlite3.Connection):
+            with connection.blobopen(Document.__tablename__, 'content', document_id, readonly=True) as blob:
+                while chunk := blob.read(chunk_size):
+                    yield chunk
+        else:
+            # Other drivers: fetch the raw blob, still decompressed chunk by chunk
+            content = type_coerce(Document.__table__.c.content, LargeBinary)
+            value = session.execute(select(content).where(Document.id == document_id)).scalar()
+            for start in range(0, len(value), chunk_size):
+                yield value[start:start + chunk_size]
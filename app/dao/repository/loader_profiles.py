@@ -0,0 +1,67 @@
+# app/dao/repository/loader_profiles.py
+from typing import Callable, Optional, Tuple, Type
+
+from sqlalchemy.orm import defer, joinedload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from app.dao.models import Document, Holding, Stock, User, UserPortfolio
+from app.dao.models.base import BaseModel
+
+
+class LoaderProfile:
+    """
+    A named set of eager-loading options for graphs rooted at `model`. The options are built on
+    first use: referencing relationships configures every mapper, which is too slow for import time.
+    """
+    def __init__(self, name: str, model: Type[BaseModel], build: Callable[[], Tuple[LoaderOption, ...]]):
+        self.name = name
+        self.model = model
+        self._build = build
+        self._options: Optional[Tuple[LoaderOption, ...]] = None
+
+    @property
+    def options(self) -> Tuple[LoaderOption, ...]:
+        if self._options is None:
+            self._options = tuple(self._build())
+        return self._options
+
+    def __repr__(self) -> str:
+        return f'LoaderProfile({self.name!r}, {self.model.__name__})'
+
+
+def _document_light() -> Tuple[LoaderOption, ...]:
+    # Heavy Document columns are only loaded when an attribute is touched
+    return defer(Document.content), defer(Document.embedding)
+
+
+# One query per level regardless of position count: portfolios, holdings (+ stock), sectors
+PORTFOLIO_SUMMARY = LoaderProfile('PORTFOLIO_SUMMARY', UserPortfolio, lambda: (
+    selectinload(UserPortfolio.holdings).joinedload(Holding.stock).selectinload(Stock.sectors),
+))
+
+PORTFOLIO_DETAIL = LoaderProfile('PORTFOLIO_DETAIL', UserPortfolio, lambda: (
+    *PORTFOLIO_SUMMARY.options,
+    selectinload(UserPortfolio.transactions),
+))
+
+USER_PORTFOLIOS = LoaderProfile('USER_PORTFOLIOS', User, lambda: (
+    selectinload(User.portfolios).selectinload(UserPortfolio.holdings).joinedload(Holding.stock),
+))
+
+# Everything about a stock except its (large) price history
+STOCK_DETAIL = LoaderProfile('STOCK_DETAIL', Stock, lambda: (
+    selectinload(Stock.sectors),
+    selectinload(Stock.dividends),
+    selectinload(Stock.historical_metrics),
+    selectinload(Stock.documents).options(*_document_light()),
+))
+
+DOCUMENT_LISTING = LoaderProfile('DOCUMENT_LISTING', Document, lambda: (
+    *_document_light(),
+    joinedload(Document.stock),
+    joinedload(Document.sector),
+))
+
+PROFILES = {profile.name: profile for profile in (
+    PORTFOLIO_SUMMARY, PORTFOLIO_DETAIL, USER_PORTFOLIOS, STOCK_DETAIL, DOCUMENT_LISTING,
+)}
@@ -0,0 +1,106 @@
+# app/dao/repository/temporal.py
+from datetime import datetime
+from typing import Callable, Dict, Optional, Type
+
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy_continuum import Operation, version_class, versioning_manager
+
+from app.dao.models.base import BaseModel
+from app.dao.repository.bulk_loader import DEFAULT_CHUNK_SIZE, chunked
+
+# Snapshot bucket of a transaction timestamp
+PERIODS: Dict[str, Callable[[datetime], tuple]] = {
+    'day': lambda issued_at: (issued_at.year, issued_at.month, issued_at.day),
+    'month': lambda issued_at: (issued_at.year, issued_at.month),
+    'quarter': lambda issued_at: (issued_at.year, (issued_at.month - 1) // 3),
+    'year': lambda issued_at: (issued_at.year,),
+}
+
+
+def transaction_at(session: Session, as_of: datetime) -> Optional[int]:
+    """Id of the last version transaction issued at or before `as_of` (None when history starts later)."""
+    transaction = versioning_manager.transaction_cls
+    return session.scalar(select(func.max(transaction.id)).where(transaction.issued_at <= as_of))
+
+
+def as_of_statement(model: Type[BaseModel], transaction_id: int) -> Select:
+    """
+    Versions of `model` valid right after `transaction_id`: created by it or earlier, not yet
+    superseded, and not deletions. Transaction ids are issued in time order, so comparing ids
+    replaces joining every version to its transaction's issued_at.
+    """
+    version = version_class(model)
+    return select(version).where(
+        version.transaction_id <= transaction_id,
+        or_(version.end_transaction_id.is_(None), version.end_transaction_id > transaction_id),
+        version.operation_type != Operation.DELETE,
+    )
+
+
+def compact_versions(session: Session, model: Type[BaseModel], before: datetime, period: str = 'month') -> int:
+    """
+    Thin the history of `model` older than `before` to one snapshot per entity and `period`: the
+    version in force at the end of each period is kept, the others deleted, and the kept versions'
+    end_transaction_id chained to the next kept one. As-of queries at period ends are unchanged;
+    within a compacted period they return the previous period's snapshot. Returns versions deleted.
+    """
+    try:
+        bucket = PERIODS[period]
+    except KeyError:
+        raise ValueError(f"Unknown period '{period}', expected one of {tuple(PERIODS)}") from None
+    cutoff = transaction_at(session, before)
+    if cutoff is None:
+        return 0
+    table = version_class(model).__table__
+    transactions = versioning_manager.transaction_cls.__table__
+    primary_key = [table.c[column.name] for column in model.__table__.primary_key]
+    rows = session.execute(
+        select(*primary_key, table.c.transaction_id, transactions.c.issued_at)
+        .join(transactions, transactions.c.id == table.c.transaction_id)
+        .where(table.c.transaction_id <= cutoff)
+        .order_by(*primary_key, table.c.transaction_id)
+    ).all()
+
+    removed, relinked = [], []
+    width = len(primary_key)
+    kept_previous = None  # (entity, transaction_id) of the last kept version
+    for position, row in enumerate(rows):
+        entity, transaction_id, issued_at = tuple(row[:width]), row[width], row[width + 1]
+        following = rows[position + 1] if position + 1 < len(rows) else None
+        last_in_bucket = (
+            following is None or tuple(following[:width]) != entity or bucket(following[width + 1]) != bucket(issued_at)
+        )
+        if not last_in_bucket:
+            removed.append((*entity, transaction_id))
+            continue
+        if kept_previous is not None and kept_previous[0] == entity:
+            relinked.append((*entity, kept_previous[1], transaction_id))
+        kept_previous = (entity, transaction_id)
+
+    key_names = [column.name for column in primary_key]
+    if removed:
+        drop = delete(table).where(
+            *[column == bindparam(f'_{column.name}') for column in primary_key],
+            table.c.transaction_id == bindparam('_transaction_id'),
+        )
+        for chunk in chunked(removed, DEFAULT_CHUNK_SIZE):
+            session.execute(drop, [
+                {**{f'_{name}': value for name, value in zip(key_names, key[:width])}, '_transaction_id': key[width]}
+                for key in chunk
+            ])
+    if relinked:
+        chain = (
+            update(table)
+            .where(*[column == bindparam(f'_{column.name}') for column in primary_key],
+                   table.c.transaction_id == bindparam('_transaction_id'))
+            .values(end_transaction_id=bindparam('_end_transaction_id'))
+        )
+        for chunk in chunked(relinked, DEFAULT_CHUNK_SIZE):
+            session.execute(chain, [
+                {**{f'_{name}': value for name, value in zip(key_names, key[:width])},
+                 '_transaction_id': key[width], '_end_transaction_id': key[width + 1]}
+                for key in chunk
+            ])
+    return len(removed)
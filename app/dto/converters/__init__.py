@@ -0,0 +1 @@
+from .base_converter import BaseConverter
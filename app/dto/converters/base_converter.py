@@ -0,0 +1,78 @@
+from functools import lru_cache
+from typing import Iterable, List, Mapping, Sequence, Type, Union
+from pydantic import BaseModel as PydanticBaseModel, TypeAdapter
+from app.dao.models.base import BaseModel
+
+
+@lru_cache(maxsize=None)
+def list_adapter(dto_class: Type[PydanticBaseModel]) -> TypeAdapter:
+    """One TypeAdapter per DTO class; building the validator is the expensive part."""
+    return TypeAdapter(List[dto_class])
+
+
+class BaseConverter:
+    """Converts between ORM and DTO objects"""
+    def __init__(self, data: Union[PydanticBaseModel, BaseModel], dto_class: Type[PydanticBaseModel], orm_class: Type[BaseModel]):
+        self.dto_class = dto_class
+        self.orm_class = orm_class
+        self.dto = None
+        self.orm = None
+        self.current_representation = None
+
+        # To create a intance which pressive the data
+        if isinstance(data, self.dto_class):
+            self.current_representation = "DTO"
+            self.dto = data
+            self.orm = BaseConverter.convert_to_orm(data, self.orm_class)
+        elif isinstance(data, self.orm_class):
+            self.current_representation = "ORM"
+            self.dto = BaseConverter.convert_to_transfer_model(data, self.dto_class)
+            self.orm = data
+
+    def toggle_model_form(self):
+        if self.current_representation == "DTO":
+            self.orm = BaseConverter.convert_to_orm(self.dto, self.orm_class)
+            self.current_representation = "ORM"
+        elif self.current_representation == "ORM":
+            self.dto = BaseConverter.convert_to_transfer_model(self.orm, self.dto_class)
+            self.current_representation = "DTO"
+        else:
+            raise Exception("Invalid Representation")
+
+    @staticmethod
+    def convert_to_orm(dto: PydanticBaseModel, model_class: Type[BaseModel]) -> BaseModel:
+        return model_class(**dto.model_dump())
+
+    @staticmethod
+    def convert_to_transfer_model(orm_obj: BaseModel, dto_class: Type[PydanticBaseModel]) -> PydanticBaseModel:
+        return dto_class.model_validate(orm_obj)
+
+    @staticmethod
+    def convert_many_to_dto(orm_objs: Iterable[BaseModel], dto_class: Type[PydanticBaseModel]) -> List[PydanticBaseModel]:
+        """Validate a whole result set in one call of the cached list validator."""
+        return list_adapter(dto_class).validate_python(list(orm_objs), from_attributes=True)
+
+    @staticmethod
+    def convert_many_to_orm(dtos: Sequence[PydanticBaseModel], model_class: Type[BaseModel]) -> List[BaseModel]:
+        return [model_class(**row) for row in BaseConverter.convert_many_to_rows(dtos)]
+
+    @staticmethod
+    def convert_many_to_rows(dtos: Sequence[PydanticBaseModel]) -> List[dict]:
+        """Plain dicts for BaseRepository.bulk_upsert / BulkLoader, skipping ORM objects altogether."""
+        if not dtos:
+            return []
+        return list_adapter(type(dtos[0])).dump_python(list(dtos))
+
+    @staticmethod
+    def convert_rows_to_dto(rows: Iterable[Mapping], dto_class: Type[PydanticBaseModel]) -> List[PydanticBaseModel]:
+        """
+        Read-only fast path: build DTOs straight from Core row mappings (`session.execute(stmt).mappings()`),
+        never creating ORM instances. Select the columns with `dto_columns`.
+        """
+        return list_adapter(dto_class).validate_python([dict(row) for row in rows])
+
+    @staticmethod
+    def dto_columns(dto_class: Type[PydanticBaseModel], model_class: Type[BaseModel]) -> list:
+        """Table columns backing the DTO's fields, for `select(*columns)`."""
+        table_columns = model_class.__table__.c
+        return [table_columns[name] for name in dto_class.model_fields if name in table_columns]
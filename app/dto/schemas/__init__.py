@@ -1,2 +1,3 @@
-from base_dto import BaseModelRepresentation
-from user_dto import UserDataTransfer, UserFromDB
\ No newline at end of file
+from .base_dto import BaseModelRepresentation
+from .user_dto import UserDataTransfer, UserFromDB
+from .historical_price_dto import HistoricalPriceDataTransfer
\ No newline at end of file
@@ -0,0 +1,12 @@
+from datetime import date
+from typing import Optional
+from .base_dto import BaseModelRepresentation
+
+class HistoricalPriceDataTransfer(BaseModelRepresentation):
+    """ Model for transferring a daily price bar. (DTO)"""
+    date: date
+    stock_id: int
+    open_price: Optional[float] = None
+    high_price: Optional[float] = None
+    low_price: Optional[float] = None
+    close_price: Optional[float] = None
@@ -1,5 +1,5 @@
 from datetime import datetime
-from schemas.base_dto import PydanticBaseModel
+from .base_dto import PydanticBaseModel
 
 class UserDataTransfer(PydanticBaseModel):
     """ Model for transferring User data. (DTO))"""
@@ -2,6 +2,16 @@
 # Streamlit will run this file when you run the command streamlit run main.py
 import os
 
+import pandas as pd
+import streamlit as st
+from sqlalchemy import select
+
+from app.dao.models import Stock
+from app.services.dashboard_data import DashboardData
+from app.services.session_manager import DatabaseManager
+from config.config import Config
+
+
 def main():
     current_pythonpath = os.environ.get('PYTHONPATH', '')  # Get the current PYTHONPATH or an empty string if not set
     new_path = "O:\\Documents\\Python_Projects\\stock_valuation"
@@ -11,6 +21,42 @@ def main():
         os.environ['PYTHONPATH'] = new_path + os.pathsep + current_pythonpath
 
     print(os.environ['PYTHONPATH'])
+    dashboard()
+
+
+@st.cache_resource
+def resources():
+    """One database manager and payload cache per process, kept across Streamlit reruns."""
+    return DatabaseManager(Config.DB_TEST), DashboardData()
+
+
+def dashboard():
+    """Portfolio, price chart and valuation views, rendered from cached DashboardData payloads."""
+    database, data = resources()
+    st.title("Stock valuation")
+    portfolio_id = int(st.sidebar.number_input("Portfolio", min_value=1, step=1))
+    ticker = st.sidebar.text_input("Ticker").strip().upper()
+
+    with database.get_session() as session:
+        holdings = data.portfolio(session, portfolio_id)
+        st.header("Portfolio")
+        columns = st.columns(3)
+        columns[0].metric("Market value", f"{float(holdings['total_market_value']):,.2f}")
+        columns[1].metric("Cost value", f"{float(holdings['total_cost_value']):,.2f}")
+        columns[2].metric("Unrealised P&L", f"{float(holdings['total_unrealised_pnl']):,.2f}")
+        st.dataframe(pd.DataFrame({name: values for name, values in holdings.items() if not name.startswith('total_')}))
+
+        stock_id = session.scalar(select(Stock.id).where(Stock.ticker_symbol == ticker)) if ticker else None
+        if stock_id is None:
+            return
+        chart = data.price_chart(session, ticker)
+        st.header(ticker)
+        st.line_chart(pd.DataFrame({'close': chart['close']}, index=pd.DatetimeIndex(chart['date'])))
+        st.caption(f"{chart['date'].size} of {int(chart['bars'])} bars shown")
+
+        st.subheader("Valuations")
+        st.dataframe(pd.DataFrame(data.valuations(session, stock_id)))
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
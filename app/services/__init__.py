@@ -1 +1 @@
-import DatabaseManager
\ No newline at end of file
+from .session_manager import DatabaseManager, AsyncDatabaseManager
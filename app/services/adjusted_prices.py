@@ -0,0 +1,202 @@
+# app/services/adjusted_prices.py
+from datetime import date, datetime
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.dao.models import Dividend, HistoricalPrice, PriceAdjustment, Stock, StockSplit
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, BulkLoader, chunked
+from app.services.price_store import PriceSeries, PriceStore
+from app.services.query_cache import written_tables
+from app.services.utils import FlushCollector, LRUCache
+
+DEFAULT_CACHE_SIZE = 5000
+
+# Tables the factors are computed from: dividend factors depend on the close before the ex-date
+_SOURCE_MODELS = (StockSplit, Dividend, HistoricalPrice)
+_SOURCE_TABLES = frozenset(model.__tablename__ for model in _SOURCE_MODELS)
+
+
+class AdjustmentFactors(NamedTuple):
+    """Step functions of the cumulative factors: bars before ex_dates[k] (and on/after ex_dates[k-1]) use index k."""
+    ex_dates: np.ndarray
+    split: np.ndarray  # len(ex_dates) + 1, last entry 1.0
+    total: np.ndarray
+
+    def expand(self, dates: np.ndarray, total_return: bool = True) -> np.ndarray:
+        """Per-bar factor vector for `dates`."""
+        factors = self.total if total_return else self.split
+        return factors[np.searchsorted(self.ex_dates, np.asarray(dates, dtype='datetime64[D]'), side='right')]
+
+
+_UNADJUSTED = AdjustmentFactors(np.empty(0, dtype='datetime64[D]'), np.ones(1), np.ones(1))
+
+
+def cumulative_factors(split_factors: np.ndarray, dividend_factors: np.ndarray):
+    """Products of each event's factor with every later one (events sorted by ex-date)."""
+    split = np.cumprod(split_factors[::-1])[::-1]
+    total = np.cumprod((split_factors * dividend_factors)[::-1])[::-1]
+    return split, total
+
+
+class AdjustedPrices:
+    """
+    Split- and dividend-adjusted OHLC series. Adjustment factors are computed per stock from
+    stock_split and dividend rows, persisted in price_adjustment and cached; an adjusted series is
+    the raw bars times the expanded factor vector. Split factors are 1 / ratio; dividend factors
+    are 1 - dividend / close on the last bar before the ex-date. Flushes and Core writes run through
+    a session (bulk price loads, price syncs) flag stocks whose splits, dividends or prices changed,
+    kept once the session commits, so `refresh()` recomputes only those stocks. Writes whose
+    parameters carry no stock_id (e.g. an UPDATE ... WHERE) must call `mark_dirty()`.
+    """
+    def __init__(self, store: Optional[PriceStore] = None, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.store = store
+        self._factors = LRUCache(cache_size)
+        self._dirty: Set[int] = set()
+        self._changes = FlushCollector(self._collect, self._apply, collect_statement=self._collect_statement)
+
+    def mark_dirty(self, stock_ids: Iterable[int]) -> None:
+        stock_ids = set(stock_ids)
+        self._dirty |= stock_ids
+        for stock_id in stock_ids:
+            self._factors.pop(stock_id)
+
+    def refresh(self, session: Session, stock_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute and persist factors of `stock_ids` (default: the dirty stocks). Returns rows written."""
+        pending = self._changes.pending(session)
+        targets = set(stock_ids) if stock_ids is not None else self._dirty | pending
+        if not targets:
+            return 0
+        rows = self._compute(session, targets)
+        table = PriceAdjustment.__table__
+        for stock_chunk in chunked(sorted(targets), MAX_BIND_PARAMS):
+            session.execute(delete(table).where(table.c.stock_id.in_(stock_chunk)))
+        written = BulkLoader(PriceAdjustment).load_rows(rows, session)
+
+        self._dirty -= targets
+        pending -= targets
+        for stock_id in targets:
+            self._factors.pop(stock_id)
+        return written
+
+    def rebuild(self, session: Session) -> int:
+        stock_ids = set(session.scalars(select(StockSplit.stock_id).distinct()))
+        stock_ids |= set(session.scalars(select(Dividend.stock_id).distinct()))
+        stock_ids |= set(session.scalars(select(PriceAdjustment.stock_id).distinct()))
+        return self.refresh(session, stock_ids)
+
+    def factors(self, session: Session, stock_id: int) -> AdjustmentFactors:
+        cached = self._factors.get(stock_id)
+        if cached is None:
+            rows = session.execute(
+                select(PriceAdjustment.ex_date, PriceAdjustment.cumulative_split, PriceAdjustment.cumulative_total)
+                .where(PriceAdjustment.stock_id == stock_id)
+                .order_by(PriceAdjustment.ex_date)
+            ).all()
+            if rows:
+                ex_dates, split, total = zip(*rows)
+                cached = AdjustmentFactors(np.array(ex_dates, dtype='datetime64[D]'),
+                                           np.append(np.array(split, dtype=float), 1.0),
+                                           np.append(np.array(total, dtype=float), 1.0))
+            else:
+                cached = _UNADJUSTED
+            self._factors.put(stock_id, cached)
+        return cached
+
+    def adjusted(self, session: Session, ticker: str, start: Optional[date] = None, end: Optional[date] = None,
+                 total_return: bool = True) -> PriceSeries:
+        """Adjusted bars of `ticker`: split-only, or split and dividend (`total_return`)."""
+        raw, stock_id = self._raw(session, ticker, start, end)
+        factor = self.factors(session, stock_id).expand(raw.date, total_return)
+        return PriceSeries(raw.date, raw.open * factor, raw.high * factor, raw.low * factor, raw.close * factor)
+
+    def _raw(self, session: Session, ticker: str, start: Optional[date], end: Optional[date]):
+        if self.store is not None and ticker in self.store.index:
+            return self.store.get(ticker, start, end), self.store.index[ticker]['stock_id']
+        stock_id = session.scalar(select(Stock.id).where(Stock.ticker_symbol == ticker))
+        if stock_id is None:
+            raise KeyError(f"Unknown ticker {ticker}")
+        stmt = (
+            select(HistoricalPrice.date, HistoricalPrice.open_price, HistoricalPrice.high_price,
+                   HistoricalPrice.low_price, HistoricalPrice.close_price)
+            .where(HistoricalPrice.stock_id == stock_id)
+            .order_by(HistoricalPrice.date)
+        )
+        if start is not None:
+            stmt = stmt.where(HistoricalPrice.date >= start)
+        if end is not None:
+            stmt = stmt.where(HistoricalPrice.date <= end)
+        rows = session.execute(stmt).all()
+        columns = zip(*rows) if rows else ((),) * 5
+        return PriceSeries(*(np.array(column, dtype=dtype) for column, dtype in
+                             zip(columns, ('datetime64[D]', float, float, float, float)))), stock_id
+
+    @staticmethod
+    def _compute(session: Session, stock_ids: Set[int]) -> List[dict]:
+        events = {}
+        for stock_chunk in chunked(sorted(stock_ids), MAX_BIND_PARAMS):
+            for stock_id, ex_date, ratio in session.execute(
+                select(StockSplit.stock_id, StockSplit.date, StockSplit.ratio).where(StockSplit.stock_id.in_(stock_chunk))
+            ):
+                entry = events.setdefault((stock_id, ex_date), [1.0, 1.0])
+                entry[0] /= ratio
+            previous_close = (
+                select(HistoricalPrice.close_price)
+                .where(HistoricalPrice.stock_id == Dividend.stock_id, HistoricalPrice.date < Dividend.date)
+                .order_by(HistoricalPrice.date.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+            for stock_id, ex_date, amount, close in session.execute(
+                select(Dividend.stock_id, Dividend.date, Dividend.dividend, previous_close)
+                .where(Dividend.stock_id.in_(stock_chunk), Dividend.date.is_not(None))
+            ):
+                # Without a prior close the dividend cannot be expressed as a price ratio
+                if close and amount:
+                    entry = events.setdefault((stock_id, ex_date), [1.0, 1.0])
+                    entry[1] *= 1.0 - amount / close
+
+        rows = []
+        updated_at = datetime.utcnow()
+        for stock_id in sorted(stock_ids):
+            keys = sorted(key for key in events if key[0] == stock_id)
+            if not keys:
+                continue
+            split_factors = np.array([events[key][0] for key in keys])
+            dividend_factors = np.array([events[key][1] for key in keys])
+            split, total = cumulative_factors(split_factors, dividend_factors)
+            rows.extend(
+                {'stock_id': stock_id, 'ex_date': ex_date, 'split_factor': split_factor, 'dividend_factor': dividend_factor,
+                 'cumulative_split': cumulative_split, 'cumulative_total': cumulative_total, 'updated_at': updated_at}
+                for (_, ex_date), split_factor, dividend_factor, cumulative_split, cumulative_total in zip(
+                    keys, split_factors.tolist(), dividend_factors.tolist(), split.tolist(), total.tolist())
+            )
+        return rows
+
+    def close(self) -> None:
+        """Stop following session writes."""
+        self._changes.close()
+
+    def _collect(self, session: Session) -> None:
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, _SOURCE_MODELS) and obj.stock_id is not None:
+                self._changes.pending(session).add(obj.stock_id)
+                self._factors.pop(obj.stock_id)
+
+    def _collect_statement(self, state: ORMExecuteState) -> None:
+        if written_tables(state.statement).isdisjoint(_SOURCE_TABLES):
+            return
+        parameters = state.parameters if isinstance(state.parameters, (list, tuple)) else [state.parameters or {}]
+        stock_ids = {params['stock_id'] for params in parameters if params.get('stock_id') is not None}
+        self._changes.pending(state.session).update(stock_ids)
+        for stock_id in stock_ids:
+            self._factors.pop(stock_id)
+
+    def _apply(self, stock_ids: Set[int]) -> None:
+        self._dirty |= stock_ids
+
+
+# Process-wide instance
+adjusted_prices = AdjustedPrices()
@@ -0,0 +1,252 @@
+# app/services/dashboard_data.py
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy_continuum import versioning_manager
+
+from app.dao.models import HistoricalPrice, PriceWatermark, Stock, ValuationModel
+from app.services.price_store import PriceStore, default_store_root
+from app.services.query_cache import written_tables
+from app.services.utils import LRUCache
+from app.services.valuations.mark_to_market import MarkToMarketEngine, PriceSnapshot
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_DISK_ENTRIES = 2000
+DEFAULT_CHART_POINTS = 500
+
+# Tables the payloads are built from
+PAYLOAD_TABLES = frozenset({'portfolio', 'holding', 'stocks', 'historical_price', 'price_watermark', 'valuation_model'})
+
+Payload = Dict[str, np.ndarray]
+
+_WRITES_KEY = 'dashboard_data.payload_writes'
+_write_generation = 0
+_last_write_ns = 0
+_write_lock = threading.Lock()
+
+
+def default_cache_root() -> str:
+    """Default disk tier: `dashboard_cache/` in the parent directory of `default_store_root()`."""
+    return os.path.join(os.path.dirname(default_store_root()), 'dashboard_cache')
+
+
+def downsample(values: np.ndarray, points: int) -> np.ndarray:
+    """
+    Indices of at most `points` samples that keep the shape of a series: the minimum and maximum
+    of equal-width buckets, plus the first and last sample.
+    """
+    size = values.size
+    if size <= points:
+        return np.arange(size)
+    buckets = max(1, (points - 2) // 2)
+    width = -(-size // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:size] = values
+    padded = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    present = ~np.isnan(padded)
+    lowest = np.where(present, padded, np.inf).argmin(axis=1) + offsets
+    highest = np.where(present, padded, -np.inf).argmax(axis=1) + offsets
+    indices = np.unique(np.concatenate([[0, size - 1], lowest, highest]))
+    return indices[indices < size]
+
+
+class DashboardData:
+    """
+    Payloads for the Streamlit views: a portfolio's marked holdings, downsampled price charts and a
+    stock's latest valuations. Each payload is a dict of NumPy arrays, cached in an in-process LRU
+    and as .npz files on disk (shared across processes and restarts), and keyed by a version token
+    read from the database in one aggregate SELECT: the last continuum transaction (ORM writes and
+    coalesced bulk loads), the count and latest updated_at of the price watermarks (price syncs,
+    including a lagging stock catching up) and the last valuation row (valuation runs). Any such
+    write yields new keys; stale entries age out.
+    Within the process, every ORM or Core write to PAYLOAD_TABLES also counts, when it executes and
+    again when its connection commits or rolls back: memory entries are keyed by that count, and disk
+    entries written before the latest such write are rebuilt rather than served.
+    """
+    def __init__(self, root: Optional[str] = None, maxsize: int = DEFAULT_CACHE_SIZE,
+                 max_disk_entries: int = DEFAULT_DISK_ENTRIES, store: Optional[PriceStore] = None,
+                 chart_points: int = DEFAULT_CHART_POINTS):
+        self.root = root or default_cache_root()
+        self.max_disk_entries = max_disk_entries
+        self.store = store
+        self.chart_points = chart_points
+        self._memory = LRUCache(maxsize)
+        self._generation = 0  # bumped by invalidate()
+        self.disk_hits = 0
+        self.builds = 0
+
+    def version(self, session: Session) -> Tuple:
+        """Data version token of the payload tables."""
+        transaction = versioning_manager.transaction_cls
+        return tuple(session.execute(select(
+            select(func.max(transaction.id)).scalar_subquery(),
+            select(func.max(ValuationModel.id)).scalar_subquery(),
+            select(func.count()).select_from(PriceWatermark).scalar_subquery(),
+            select(func.max(PriceWatermark.updated_at)).scalar_subquery(),
+        )).one())
+
+    def portfolio(self, session: Session, portfolio_id: int) -> Payload:
+        """Marked holdings of one portfolio (ticker, quantity, price, values, weight) and its totals."""
+        def build() -> Payload:
+            snapshot = PriceSnapshot.from_store(self.store) if self.store is not None else None
+            marks = MarkToMarketEngine(snapshot).revalue(session, [portfolio_id])
+            tickers = dict(session.execute(
+                select(Stock.id, Stock.ticker_symbol).where(Stock.id.in_(np.unique(marks.stock_ids).tolist()))
+            ).all())
+            totals = marks.portfolio_summary().get(portfolio_id, {'market_value': 0.0, 'cost_value': 0.0, 'unrealised_pnl': 0.0})
+            return {
+                'holding_id': marks.holding_ids, 'stock_id': marks.stock_ids,
+                'ticker': np.array([tickers.get(stock_id, '') for stock_id in marks.stock_ids.tolist()], dtype=str),
+                'quantity': marks.quantity, 'price': marks.price, 'market_value': marks.market_value,
+                'cost_value': marks.cost_value, 'unrealised_pnl': marks.unrealised_pnl, 'weight': marks.weight,
+                **{f'total_{name}': np.array(value) for name, value in totals.items()},
+            }
+        return self._payload(session, 'portfolio', (portfolio_id,), build)
+
+    def price_chart(self, session: Session, ticker: str, start: Optional[date] = None, end: Optional[date] = None,
+                    points: Optional[int] = None) -> Payload:
+        """Close series of `ticker` downsampled to at most `points` samples (min/max preserving)."""
+        points = points or self.chart_points
+
+        def build() -> Payload:
+            dates, closes = self._closes(session, ticker, start, end)
+            keep = downsample(closes, points)
+            return {'date': dates[keep], 'close': closes[keep], 'bars': np.array(dates.size)}
+        return self._payload(session, 'price_chart', (ticker, str(start), str(end), points), build)
+
+    def valuations(self, session: Session, stock_id: int) -> Payload:
+        """Latest valuation of `stock_id` per method."""
+        def build() -> Payload:
+            latest = (
+                select(func.max(ValuationModel.id))
+                .where(ValuationModel.stock_id == stock_id)
+                .group_by(ValuationModel.valuation_method)
+            )
+            rows = session.execute(
+                select(ValuationModel.id, ValuationModel.valuation_method, ValuationModel.valuation_date,
+                       ValuationModel.valuation_result)
+                .where(ValuationModel.id.in_(latest))
+                .order_by(ValuationModel.valuation_method)
+            ).all()
+            ids, methods, dates, results = zip(*rows) if rows else ((), (), (), ())
+            return {'valuation_id': np.array(ids, dtype=np.int64), 'method': np.array(methods, dtype=str),
+                    'valuation_date': np.array(dates, dtype='datetime64[s]'), 'result': np.array(results, dtype=float)}
+        return self._payload(session, 'valuations', (stock_id,), build)
+
+    def precompute(self, session: Session, portfolio_ids: Optional[Iterable[int]] = None,
+                   tickers: Optional[Iterable[str]] = None, stock_ids: Optional[Iterable[int]] = None) -> int:
+        """Build the default payloads ahead of the first interaction (e.g. after a batch job). Returns payloads built."""
+        built = self.builds
+        for portfolio_id in portfolio_ids or ():
+            self.portfolio(session, portfolio_id)
+        for ticker in tickers or ():
+            self.price_chart(session, ticker)
+        for stock_id in stock_ids or ():
+            self.valuations(session, stock_id)
+        return self.builds - built
+
+    def invalidate(self) -> None:
+        """Drop every cached payload, in memory and on disk."""
+        self._generation += 1
+        self._memory.clear()
+        for path in glob.glob(os.path.join(self.root, '*.npz')):
+            os.remove(path)
+
+    def stats(self) -> dict:
+        memory = self._memory.stats()
+        return {**memory, 'disk_hits': self.disk_hits, 'builds': self.builds}
+
+    def _payload(self, session: Session, kind: str, args: Sequence, build: Callable[[], Payload]) -> Payload:
+        writes, last_write_ns = _write_generation, _last_write_ns
+        version = (self._generation, *self.version(session))
+        key = (kind, tuple(args), writes, version)
+        payload = self._memory.get(key)
+        if payload is not None:
+            return payload
+        prefix = f'{kind}-{self._digest(args)}-'
+        path = os.path.join(self.root, f'{prefix}{self._digest(version)}.npz')
+        if os.path.exists(path) and os.stat(path).st_mtime_ns > last_write_ns:
+            with np.load(path) as archive:
+                payload = {name: archive[name] for name in archive.files}
+            self.disk_hits += 1
+        else:
+            payload = build()
+            self.builds += 1
+            self._save(path, prefix, payload)
+        self._memory.put(key, payload)
+        return payload
+
+    def _save(self, path: str, prefix: str, payload: Payload) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        # Older versions of the same payload can never be served again
+        for stale in glob.glob(os.path.join(self.root, f'{glob.escape(prefix)}*.npz')):
+            os.remove(stale)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as payload_file:
+            np.savez(payload_file, **payload)
+        os.replace(temporary, path)
+        entries = glob.glob(os.path.join(self.root, '*.npz'))
+        if len(entries) > self.max_disk_entries:
+            entries.sort(key=os.path.getmtime)
+            for oldest in entries[:len(entries) - self.max_disk_entries]:
+                os.remove(oldest)
+
+    def _closes(self, session: Session, ticker: str, start: Optional[date], end: Optional[date]):
+        if self.store is not None and ticker in self.store.index:
+            series = self.store.get(ticker, start, end)
+            return np.asarray(series.date), np.asarray(series.close)
+        stmt = (
+            select(HistoricalPrice.date, HistoricalPrice.close_price)
+            .join(Stock, Stock.id == HistoricalPrice.stock_id)
+            .where(Stock.ticker_symbol == ticker)
+            .order_by(HistoricalPrice.date)
+        )
+        if start is not None:
+            stmt = stmt.where(HistoricalPrice.date >= start)
+        if end is not None:
+            stmt = stmt.where(HistoricalPrice.date <= end)
+        rows = session.execute(stmt).all()
+        dates, closes = zip(*rows) if rows else ((), ())
+        return np.array(dates, dtype='datetime64[D]'), np.array(closes, dtype=float)
+
+    @staticmethod
+    def _digest(value) -> str:
+        return hashlib.sha1(json.dumps(value, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def _bump_writes() -> None:
+    global _write_generation, _last_write_ns
+    with _write_lock:
+        _write_generation += 1
+        _last_write_ns = time.time_ns()
+
+
+@event.listens_for(Engine, 'after_execute')
+def _after_execute(connection, clauseelement, multiparams, params, execution_options, result) -> None:
+    if not written_tables(clauseelement).isdisjoint(PAYLOAD_TABLES):
+        connection.info[_WRITES_KEY] = True
+        _bump_writes()
+
+
+@event.listens_for(Engine, 'commit')
+def _after_commit(connection) -> None:
+    # Payloads built from this connection's uncommitted rows were keyed by the earlier generation
+    if connection.info.pop(_WRITES_KEY, False):
+        _bump_writes()
+
+
+@event.listens_for(Engine, 'rollback')
+def _after_rollback(connection) -> None:
+    if connection.info.pop(_WRITES_KEY, False):
+        _bump_writes()
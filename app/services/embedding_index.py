@@ -0,0 +1,261 @@
+# app/services/embedding_index.py
+import os
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.dao.models import Document
+from app.dao.repository.bulk_loader import select_in
+from app.services.price_store import default_store_root
+from app.services.utils import FlushCollector
+
+EMBEDDING_DTYPE = np.dtype('<f4')
+SYNC_BATCH_SIZE = 10_000
+MISSING_ID = -1  # stock_id / sector_id of documents without one
+
+
+def default_index_root() -> str:
+    """Where saved indexes go by default: `embedding_index/` in the parent directory of `default_store_root()`."""
+    return os.path.join(os.path.dirname(default_store_root()), 'embedding_index')
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Zero-copy float32 view of a Document.embedding blob."""
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+
+
+def normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class SearchResult(NamedTuple):
+    document_ids: np.ndarray
+    scores: np.ndarray  # cosine similarity, descending
+
+
+class _Segment(NamedTuple):
+    vectors: np.ndarray
+    ids: np.ndarray
+    stock_ids: np.ndarray
+    sector_ids: np.ndarray
+    alive: np.ndarray
+
+
+class EmbeddingIndex:
+    """
+    Cosine top-k search over Document.embedding.
+    Unit-normalised float32 vectors live in a memory-mapped .npy matrix with parallel id, stock and
+    sector arrays. Changes are applied incrementally: additions go to an in-memory delta segment and
+    removals flip a tombstone, until `save()` compacts both into new files. Flushes record changed
+    documents (kept once the session commits) so `apply_changes()` can reload just those rows.
+    """
+    COLUMNS = ('vectors', 'ids', 'stock_ids', 'sector_ids')
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or default_index_root()
+        self._base: Optional[_Segment] = None
+        self._delta: Optional[_Segment] = None
+        self._changed: Set[int] = set()
+        self._changes = FlushCollector(self._collect, self._apply)
+
+    def __len__(self) -> int:
+        return sum(int(segment.alive.sum()) for segment in self._segments())
+
+    @property
+    def dimension(self) -> Optional[int]:
+        for segment in self._segments():
+            if segment.vectors.shape[0]:
+                return segment.vectors.shape[1]
+        return None
+
+    def sync(self, session: Session) -> int:
+        """Rebuild the files from every document with an embedding, streaming rows in batches."""
+        os.makedirs(self.root, exist_ok=True)
+        has_embedding = Document.embedding.is_not(None)
+        total = session.scalar(select(func.count()).select_from(Document).where(has_embedding))
+        first = session.scalar(select(Document.embedding).where(has_embedding).limit(1))
+        dimension = decode_embedding(first).size if first is not None else 0
+
+        temporary = {name: self._path(name) + '.tmp' for name in self.COLUMNS}
+        arrays = {
+            'vectors': open_memmap(temporary['vectors'], mode='w+', dtype=np.float32, shape=(total, dimension)),
+            **{name: open_memmap(temporary[name], mode='w+', dtype=np.int64, shape=(total,)) for name in self.COLUMNS[1:]},
+        }
+        stmt = (
+            select(Document.id, Document.stock_id, Document.sector_id, Document.embedding)
+            .where(has_embedding)
+            .order_by(Document.id)
+            .execution_options(yield_per=SYNC_BATCH_SIZE)
+        )
+        position = 0
+        for partition in session.execute(stmt).partitions():
+            ids, stock_ids, sector_ids, blobs = zip(*partition)
+            stop = position + len(ids)
+            arrays['vectors'][position:stop] = normalise(np.stack([self._decode(blob, dimension) for blob in blobs]))
+            arrays['ids'][position:stop] = ids
+            arrays['stock_ids'][position:stop] = [MISSING_ID if value is None else value for value in stock_ids]
+            arrays['sector_ids'][position:stop] = [MISSING_ID if value is None else value for value in sector_ids]
+            position = stop
+
+        for array in arrays.values():
+            array.flush()
+        del arrays
+        self._replace(temporary)
+        return total
+
+    def add(self, document_ids: Sequence[int], vectors: np.ndarray,
+            stock_ids: Optional[Sequence[Optional[int]]] = None, sector_ids: Optional[Sequence[Optional[int]]] = None) -> None:
+        """Insert or replace documents in the delta segment."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        dimension = self.dimension
+        if dimension is not None and vectors.shape[1] != dimension:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the index ({dimension})")
+        self.remove(document_ids)
+
+        def ids_or_missing(values):
+            if values is None:
+                return np.full(len(document_ids), MISSING_ID, dtype=np.int64)
+            return np.array([MISSING_ID if value is None else value for value in values], dtype=np.int64)
+
+        added = _Segment(normalise(vectors), np.asarray(document_ids, dtype=np.int64), ids_or_missing(stock_ids),
+                         ids_or_missing(sector_ids), np.ones(len(document_ids), dtype=bool))
+        if self._delta is None:
+            self._delta = added
+        else:
+            self._delta = _Segment(*(np.concatenate([old, new]) for old, new in zip(self._delta, added)))
+
+    def remove(self, document_ids: Iterable[int]) -> int:
+        """Tombstone documents wherever they are stored. Returns the number removed."""
+        document_ids = np.asarray(list(document_ids), dtype=np.int64)
+        removed = 0
+        for segment in self._segments():
+            hits = np.isin(segment.ids, document_ids) & segment.alive
+            segment.alive[hits] = False
+            removed += int(hits.sum())
+        return removed
+
+    def apply_changes(self, session: Session) -> Tuple[int, int]:
+        """Reload documents flushed since the last call (including uncommitted ones of `session`). Returns (added, removed)."""
+        changed = self._changed | self._changes.pop(session)
+        self._changed = set()
+        if not changed:
+            return 0, 0
+        rows = select_in(
+            session,
+            select(Document.id, Document.stock_id, Document.sector_id, Document.embedding).where(Document.embedding.is_not(None)),
+            [Document.id], [(document_id,) for document_id in sorted(changed)],
+        )
+        self.remove(changed)
+        ids = ()
+        if rows:
+            ids, stock_ids, sector_ids, blobs = zip(*rows)
+            dimension = self.dimension or decode_embedding(blobs[0]).size
+            self.add(ids, np.stack([self._decode(blob, dimension) for blob in blobs]), stock_ids, sector_ids)
+        # Deleted documents, or ones whose embedding was cleared, stay removed
+        return len(ids), len(changed - set(ids))
+
+    def search(self, queries: np.ndarray, k: int = 10, stock_id: Optional[int] = None,
+               sector_id: Optional[int] = None) -> List[SearchResult]:
+        """Top-`k` documents by cosine similarity for each row of `queries`, optionally restricted to a stock or sector."""
+        queries = normalise(np.atleast_2d(queries))
+        candidate_scores, candidate_ids = [], []
+        for segment in self._segments():
+            rows = segment.alive
+            if stock_id is not None:
+                rows = rows & (segment.stock_ids == stock_id)
+            if sector_id is not None:
+                rows = rows & (segment.sector_ids == sector_id)
+            selected = np.flatnonzero(rows)
+            if not selected.size:
+                continue
+            top = min(k, selected.size)
+            if 2 * selected.size >= rows.size:
+                # Mostly live rows: score the mapped matrix in place and mask the rest
+                scores = queries @ segment.vectors.T
+                scores[:, ~rows] = -np.inf
+                ids = segment.ids
+            else:
+                # Selective filter: gather just the candidate rows
+                scores = queries @ segment.vectors[selected].T
+                ids = segment.ids[selected]
+            best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            candidate_scores.append(np.take_along_axis(scores, best, axis=1))
+            candidate_ids.append(ids[best])
+
+        if not candidate_scores:
+            empty = SearchResult(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            return [empty for _ in range(queries.shape[0])]
+        scores = np.concatenate(candidate_scores, axis=1)
+        ids = np.concatenate(candidate_ids, axis=1)
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        return [SearchResult(row_ids, row_scores) for row_ids, row_scores in
+                zip(np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1))]
+
+    def save(self) -> int:
+        """Compact live base rows and the delta segment into new files. Returns the number of rows written."""
+        segments = [segment for segment in self._segments() if segment.vectors.shape[0]]
+        if not segments:
+            return 0
+        os.makedirs(self.root, exist_ok=True)
+        total = sum(int(segment.alive.sum()) for segment in segments)
+        dimension = segments[0].vectors.shape[1]
+        temporary = {name: self._path(name) + '.tmp' for name in self.COLUMNS}
+        arrays = {
+            'vectors': open_memmap(temporary['vectors'], mode='w+', dtype=np.float32, shape=(total, dimension)),
+            **{name: open_memmap(temporary[name], mode='w+', dtype=np.int64, shape=(total,)) for name in self.COLUMNS[1:]},
+        }
+        position = 0
+        for segment in segments:
+            alive = np.flatnonzero(segment.alive)
+            stop = position + alive.size
+            for name, column in zip(self.COLUMNS, segment):
+                arrays[name][position:stop] = column[alive]
+            position = stop
+        for array in arrays.values():
+            array.flush()
+        del arrays, segments
+        self._replace(temporary)
+        return total
+
+    def close(self) -> None:
+        """Stop following session writes; call `save()` first to keep unsaved changes on disk."""
+        self._changes.close()
+
+    def _segments(self) -> List[_Segment]:
+        if self._base is None and os.path.exists(self._path('ids')):
+            columns = [np.load(self._path(name), mmap_mode='r') for name in self.COLUMNS]
+            # Small id arrays are read into memory; the vector matrix stays mapped
+            self._base = _Segment(columns[0], *(np.array(column) for column in columns[1:]),
+                                  np.ones(columns[1].shape[0], dtype=bool))
+        return [segment for segment in (self._base, self._delta) if segment is not None]
+
+    def _replace(self, temporary: dict) -> None:
+        # Drop open maps so the files can be replaced (required on Windows)
+        self._base = None
+        self._delta = None
+        for name, path in temporary.items():
+            os.replace(path, self._path(name))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, f'{name}.npy')
+
+    @staticmethod
+    def _decode(blob: bytes, dimension: int) -> np.ndarray:
+        vector = decode_embedding(blob)
+        if vector.size != dimension:
+            raise ValueError(f"Embedding of {vector.size} floats, expected {dimension}")
+        return vector
+
+    def _collect(self, session: Session) -> None:
+        changed = [obj.id for obj in (*session.new, *session.dirty, *session.deleted)
+                   if isinstance(obj, Document) and obj.id is not None]
+        if changed:
+            self._changes.pending(session).update(changed)
+
+    def _apply(self, document_ids: Set[int]) -> None:
+        self._changed |= document_ids
@@ -0,0 +1,253 @@
+# app/services/price_analytics.py
+import math
+import warnings
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.dao.models import HistoricalPrice, Stock
+from app.dao.repository.bulk_loader import select_in
+from app.services.price_store import PriceStore
+from app.services.utils import LRUCache
+
+TRADING_DAYS = 252
+DEFAULT_WINDOWS = (21, 63, 252)
+DEFAULT_CACHE_SIZE = 100_000
+# Share of a window's daily returns that must be present for its statistics; missing bars are skipped
+DEFAULT_MIN_COVERAGE = 0.8
+# Upper bound on elements materialised at once when reducing a block of windows
+WINDOW_BLOCK_ELEMENTS = 2 ** 22
+
+
+class CloseMatrix:
+    """
+    Dense stocks x dates close matrix (NaN where a stock has no bar), with amortised appends.
+    Rows follow `tickers`; columns follow `dates`, which are strictly increasing.
+    """
+    def __init__(self, tickers: Sequence[str], stock_ids: Sequence[int], dates: np.ndarray, closes: np.ndarray):
+        self.tickers = list(tickers)
+        self.stock_ids = np.asarray(stock_ids, dtype=np.int64)
+        self._rows = {ticker: row for row, ticker in enumerate(self.tickers)}
+        self._dates = np.asarray(dates, dtype='datetime64[D]')
+        self._closes = np.asarray(closes, dtype=float)
+        self._size = self._dates.size
+
+    @classmethod
+    def from_store(cls, store: PriceStore, tickers: Optional[Iterable[str]] = None) -> 'CloseMatrix':
+        tickers = sorted(tickers if tickers is not None else store.tickers())
+        series = [store.get(ticker) for ticker in tickers]
+        dates = np.unique(np.concatenate([s.date for s in series])) if series else np.empty(0, 'datetime64[D]')
+        closes = np.full((len(tickers), dates.size), np.nan)
+        for row, s in enumerate(series):
+            closes[row, np.searchsorted(dates, s.date)] = s.close
+        return cls(tickers, [store.index[ticker]['stock_id'] for ticker in tickers], dates, closes)
+
+    @classmethod
+    def from_database(cls, session: Session, stock_ids: Optional[Iterable[int]] = None) -> 'CloseMatrix':
+        stmt = (
+            select(Stock.ticker_symbol, HistoricalPrice.stock_id, HistoricalPrice.date, HistoricalPrice.close_price)
+            .join(Stock, Stock.id == HistoricalPrice.stock_id)
+            .order_by(Stock.ticker_symbol, HistoricalPrice.date)
+        )
+        if stock_ids is None:
+            rows = session.execute(stmt).all()
+        else:
+            # Row order does not matter: the matrix is laid out by unique ticker and date
+            rows = select_in(session, stmt, [HistoricalPrice.stock_id], [(stock_id,) for stock_id in set(stock_ids)])
+        tickers, ids, dates, closes = (np.array(column) for column in zip(*rows)) if rows else ([], [], [], [])
+        unique_tickers, row = np.unique(np.asarray(tickers, dtype=str), return_inverse=True)
+        unique_dates, column = np.unique(np.asarray(dates, dtype='datetime64[D]'), return_inverse=True)
+        matrix = np.full((unique_tickers.size, unique_dates.size), np.nan)
+        matrix[row, column] = np.asarray(closes, dtype=float)
+        first = np.unique(row, return_index=True)[1]
+        return cls(unique_tickers.tolist(), np.asarray(ids, dtype=np.int64)[first], unique_dates, matrix)
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[:self._size]
+
+    @property
+    def closes(self) -> np.ndarray:
+        return self._closes[:, :self._size]
+
+    def row(self, ticker: str) -> int:
+        return self._rows[ticker]
+
+    def column_at(self, as_of) -> int:
+        """Column of the last date on or before `as_of` (-1 when before the first date)."""
+        return int(np.searchsorted(self.dates, np.datetime64(as_of, 'D'), side='right')) - 1
+
+    def append(self, day, closes: Mapping[str, float]) -> None:
+        """Add one date; tickers missing from `closes` get NaN. Capacity doubles, so appends are amortised O(stocks)."""
+        day = np.datetime64(day, 'D')
+        if self._size and day <= self._dates[self._size - 1]:
+            raise ValueError(f"{day} is not after the last date {self._dates[self._size - 1]}")
+        if self._size == self._closes.shape[1]:
+            capacity = max(1, 2 * self._size)
+            grown = np.full((len(self.tickers), capacity), np.nan)
+            grown[:, :self._size] = self.closes
+            self._closes = grown
+            self._dates = np.concatenate([self._dates[:self._size], np.empty(capacity - self._size, 'datetime64[D]')])
+        column = np.full(len(self.tickers), np.nan)
+        for ticker, close in closes.items():
+            column[self._rows[ticker]] = close
+        self._closes[:, self._size] = column
+        self._dates[self._size] = day
+        self._size += 1
+
+
+class RollingSnapshot(NamedTuple):
+    """Window statistics for one stock as of one date (NaN when the window has too few observations)."""
+    total_return: float
+    volatility: float  # annualised, from daily log returns
+    beta: float
+    max_drawdown: float  # most negative close / running peak - 1 within the window
+
+
+@dataclass
+class RollingMetrics:
+    """stocks x dates arrays of the rolling statistics; column t describes the window ending at dates[t]."""
+    window: int
+    dates: np.ndarray
+    total_return: np.ndarray
+    volatility: np.ndarray
+    beta: np.ndarray
+    max_drawdown: np.ndarray
+
+
+def log_returns(closes: np.ndarray) -> np.ndarray:
+    """Daily log returns aligned with `closes` columns (first column NaN)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(closes), axis=-1)
+    return np.concatenate([np.full(closes.shape[:-1] + (1,), np.nan), returns], axis=-1)
+
+
+def market_returns(returns: np.ndarray) -> np.ndarray:
+    """Equal-weighted mean of the available stock returns per date."""
+    present = ~np.isnan(returns)
+    counts = present.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, np.where(present, returns, 0.0).sum(axis=0) / counts, np.nan)
+
+
+def window_statistics(closes: np.ndarray, returns: np.ndarray, benchmark: np.ndarray, min_observations: int = 2) -> tuple:
+    """
+    Statistics over the last axis of window views: `closes` (..., w + 1), `returns` (..., w) and
+    `benchmark` (..., w) broadcastable against `returns`. Returns (total_return, volatility, beta, max_drawdown).
+    Missing values are skipped: the return runs from the first to the last close present, beta uses
+    the days where both series have a return, and windows with fewer than `min_observations`
+    returns are NaN.
+    """
+    present = ~np.isnan(closes)
+    first = np.take_along_axis(closes, present.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+    last = np.take_along_axis(closes, (closes.shape[-1] - 1 - present[..., ::-1].argmax(axis=-1))[..., None], axis=-1)[..., 0]
+    paired = ~np.isnan(returns) & ~np.isnan(benchmark)
+    stock, market = np.where(paired, returns, np.nan), np.where(paired, benchmark, np.nan)
+    enough = (~np.isnan(returns)).sum(axis=-1) >= min_observations
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN windows; masked below
+        total_return = last / first - 1.0
+        volatility = np.nanstd(returns, axis=-1, ddof=1) * np.sqrt(TRADING_DAYS)
+        market_deviation = market - np.nanmean(market, axis=-1, keepdims=True)
+        covariance = np.nanmean((stock - np.nanmean(stock, axis=-1, keepdims=True)) * market_deviation, axis=-1)
+        beta = covariance / np.nanmean(market_deviation ** 2, axis=-1)
+        max_drawdown = np.nanmin(closes / np.fmax.accumulate(closes, axis=-1) - 1.0, axis=-1)
+    beta = np.where(paired.sum(axis=-1) >= min_observations, beta, np.nan)
+    return tuple(np.where(enough, statistic, np.nan) for statistic in (total_return, volatility, beta, max_drawdown))
+
+
+class RollingAnalytics:
+    """
+    Rolling return, annualised volatility, beta and max drawdown for the whole universe.
+    `history()` evaluates every window of a CloseMatrix through strided sliding-window views,
+    in blocks of stocks so temporaries stay bounded. Point results are cached per
+    (ticker, window, as-of date); `append()` adds a day and computes only that day's windows
+    from the matrix tail. Beta is measured against `benchmark` (a ticker) or, by default,
+    the equal-weighted universe. Missing bars are skipped; a window needs at least `min_coverage`
+    of its daily returns (and two) for its statistics, otherwise they are NaN.
+    """
+    def __init__(self, closes: CloseMatrix, windows: Sequence[int] = DEFAULT_WINDOWS,
+                 benchmark: Optional[str] = None, cache_size: int = DEFAULT_CACHE_SIZE,
+                 min_coverage: float = DEFAULT_MIN_COVERAGE):
+        self.matrix = closes
+        self.windows = tuple(windows)
+        self.benchmark = benchmark
+        self.min_coverage = min_coverage
+        self._cache = LRUCache(cache_size)
+
+    def min_observations(self, window: int) -> int:
+        return max(2, math.ceil(self.min_coverage * window))
+
+    def history(self, window: int) -> RollingMetrics:
+        closes = self.matrix.closes
+        stocks, days = closes.shape
+        returns = log_returns(closes)
+        benchmark = self._benchmark(returns)
+        results = [np.full((stocks, days), np.nan) for _ in range(4)]
+        if days > window:
+            benchmark_windows = sliding_window_view(benchmark[1:], window)
+            block = max(1, WINDOW_BLOCK_ELEMENTS // ((days - window) * (window + 1)))
+            for start in range(0, stocks, block):
+                rows = slice(start, start + block)
+                statistics = window_statistics(
+                    sliding_window_view(closes[rows], window + 1, axis=1),
+                    sliding_window_view(returns[rows, 1:], window, axis=1),
+                    benchmark_windows[None, :, :],
+                    self.min_observations(window),
+                )
+                for result, statistic in zip(results, statistics):
+                    result[rows, window:] = statistic
+        return RollingMetrics(window, self.matrix.dates, *results)
+
+    def snapshot(self, ticker: str, window: int, as_of: Optional[date] = None) -> Optional[RollingSnapshot]:
+        """Cached statistics of `ticker` for the window ending at the last date on or before `as_of` (default: latest)."""
+        column = self.matrix.column_at(as_of) if as_of is not None else self.matrix.dates.size - 1
+        if column < 0:
+            return None
+        key = (ticker, window, self.matrix.dates[column].item())
+        cached = self._cache.get(key)
+        if cached is None:
+            row = self.matrix.row(ticker)
+            cached = RollingSnapshot(*(float(value[0]) for value in self._tail(column, window, rows=[row])))
+            self._cache.put(key, cached)
+        return cached
+
+    def append(self, day, closes: Mapping[str, float]) -> Dict[int, Dict[str, RollingSnapshot]]:
+        """Add one day of closes and cache every stock's statistics for that day in each configured window."""
+        self.matrix.append(day, closes)
+        column = self.matrix.dates.size - 1
+        as_of = self.matrix.dates[column].item()
+        computed = {}
+        for window in self.windows:
+            statistics = self._tail(column, window)
+            snapshots = {}
+            for ticker, values in zip(self.matrix.tickers, zip(*(statistic.tolist() for statistic in statistics))):
+                snapshots[ticker] = RollingSnapshot(*values)
+                self._cache.put((ticker, window, as_of), snapshots[ticker])
+            computed[window] = snapshots
+        return computed
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def _tail(self, column: int, window: int, rows: Optional[List[int]] = None) -> tuple:
+        """Statistics for the single window ending at `column`, reading only the last window + 1 columns."""
+        if column < window:
+            count = len(rows) if rows is not None else len(self.matrix.tickers)
+            return tuple(np.full(count, np.nan) for _ in range(4))
+        tail = self.matrix.closes[:, column - window:column + 1]
+        returns = log_returns(tail)[:, 1:]
+        benchmark = self._benchmark(returns)
+        if rows is not None:
+            tail, returns = tail[rows], returns[rows]
+        return window_statistics(tail, returns, benchmark[None, :], self.min_observations(window))
+
+    def _benchmark(self, returns: np.ndarray) -> np.ndarray:
+        if self.benchmark is not None:
+            return returns[self.matrix.row(self.benchmark)]
+        return market_returns(returns)
@@ -0,0 +1,148 @@
+# app/services/price_store.py
+import json
+import os
+from datetime import date
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.dao.models import HistoricalPrice, Stock
+from config import Config
+
+SYNC_BATCH_SIZE = 50_000
+
+
+def default_store_root() -> str:
+    """`price_store/` next to the SQLite database file (data/ when the URL has no file)."""
+    database = make_url(Config.DB_TEST).database or ''
+    return os.path.join(os.path.dirname(database) or 'data', 'price_store')
+
+
+class PriceSeries(NamedTuple):
+    """Read-only views into the memory-mapped columns for one stock."""
+    date: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+
+class PriceStore:
+    """
+    Columnar, memory-mapped mirror of the historical_price table.
+    Each column is one .npy file holding every bar sorted by (stock_id, date);
+    index.json maps ticker -> stock_id and the [start, stop) slice of its rows.
+    """
+    COLUMNS = {
+        'date': ('date', 'datetime64[D]'),
+        'open': ('open_price', 'float64'),
+        'high': ('high_price', 'float64'),
+        'low': ('low_price', 'float64'),
+        'close': ('close_price', 'float64'),
+    }
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or default_store_root()
+        self._columns: Dict[str, np.ndarray] = {}
+        self._index: Optional[Dict[str, dict]] = None
+
+    def get(self, ticker: str, start: Optional[date] = None, end: Optional[date] = None) -> PriceSeries:
+        """Bars for `ticker` between `start` and `end` (inclusive) as zero-copy views."""
+        try:
+            entry = self.index[ticker]
+        except KeyError:
+            raise KeyError(f"No prices stored for ticker {ticker}") from None
+        lower, upper = entry['start'], entry['stop']
+        dates = self._column('date')[lower:upper]
+        if start is not None:
+            lower += int(np.searchsorted(dates, np.datetime64(start, 'D'), side='left'))
+        if end is not None:
+            upper = entry['start'] + int(np.searchsorted(dates, np.datetime64(end, 'D'), side='right'))
+        return PriceSeries(*(self._column(name)[lower:upper] for name in self.COLUMNS))
+
+    @property
+    def index(self) -> Dict[str, dict]:
+        if self._index is None:
+            path = os.path.join(self.root, self.INDEX_FILE)
+            if os.path.exists(path):
+                with open(path) as index_file:
+                    self._index = json.load(index_file)
+            else:
+                self._index = {}
+        return self._index
+
+    def tickers(self) -> list:
+        return list(self.index)
+
+    def latest(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(stock_ids, last close, last date) of every stored stock, sorted by stock id."""
+        entries = sorted(self.index.values(), key=lambda entry: entry['stock_id'])
+        if not entries:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype='datetime64[D]')
+        last_rows = np.array([entry['stop'] - 1 for entry in entries], dtype=np.int64)
+        return (
+            np.array([entry['stock_id'] for entry in entries], dtype=np.int64),
+            np.asarray(self._column('close')[last_rows]),
+            np.asarray(self._column('date')[last_rows]),
+        )
+
+    def sync(self, session: Session) -> int:
+        """Rebuild every column from the database, streaming rows in batches. Returns the number of bars."""
+        os.makedirs(self.root, exist_ok=True)
+        tickers = dict(session.execute(select(Stock.id, Stock.ticker_symbol)).all())
+        total = session.scalar(select(func.count()).select_from(HistoricalPrice))
+
+        temporary = {name: self._path(name) + '.tmp' for name in self.COLUMNS}
+        arrays = {
+            name: open_memmap(temporary[name], mode='w+', dtype=dtype, shape=(total,))
+            for name, (_, dtype) in self.COLUMNS.items()
+        }
+        stmt = (
+            select(HistoricalPrice.stock_id, *(getattr(HistoricalPrice, column) for column, _ in self.COLUMNS.values()))
+            .order_by(HistoricalPrice.stock_id, HistoricalPrice.date)
+            .execution_options(yield_per=SYNC_BATCH_SIZE)
+        )
+
+        index: Dict[str, dict] = {}
+        position = 0
+        for partition in session.execute(stmt).partitions():
+            stock_ids, *values = zip(*partition)
+            stop = position + len(stock_ids)
+            for name, column in zip(self.COLUMNS, values):
+                arrays[name][position:stop] = np.array(column, dtype=self.COLUMNS[name][1])
+
+            ids = np.asarray(stock_ids)
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            ends = np.r_[starts[1:], len(ids)]
+            for stock_id, first, last in zip(ids[starts].tolist(), starts.tolist(), ends.tolist()):
+                entry = index.setdefault(tickers[stock_id], {'stock_id': stock_id, 'start': position + first})
+                entry['stop'] = position + last
+            position = stop
+
+        for array in arrays.values():
+            array.flush()
+        del arrays
+        self._close()
+        for name, path in temporary.items():
+            os.replace(path, self._path(name))
+        with open(os.path.join(self.root, self.INDEX_FILE), 'w') as index_file:
+            json.dump(index, index_file)
+        return total
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = np.load(self._path(name), mmap_mode='r')
+        return self._columns[name]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, f'{name}.npy')
+
+    def _close(self) -> None:
+        """Drop open maps so the files can be replaced (required on Windows)."""
+        self._columns = {}
+        self._index = None
@@ -0,0 +1,170 @@
+# app/services/price_sync.py
+import csv
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.dao.models import HistoricalPrice, PriceWatermark, Stock
+from app.dao.repository.bulk_loader import HistoricalPriceBulkLoader, select_in, upsert_statement
+
+
+@dataclass
+class PriceGap:
+    """Business days with no bar between `after` and `before` (both exclusive)."""
+    ticker: str
+    after: date
+    before: date
+    missing_days: int
+
+
+@dataclass
+class SkippedRow:
+    """Feed row left out of a sync because a field is empty or malformed."""
+    ticker: str
+    line: int
+    reason: str
+
+
+@dataclass
+class SyncReport:
+    loaded: Dict[str, int] = field(default_factory=dict)
+    gaps: List[PriceGap] = field(default_factory=list)
+    unknown_tickers: List[str] = field(default_factory=list)
+    skipped_rows: List[SkippedRow] = field(default_factory=list)
+
+    @property
+    def total_loaded(self) -> int:
+        return sum(self.loaded.values())
+
+
+class PriceSync:
+    """
+    Incremental historical_price refresh from a directory of feed files.
+    Each `<TICKER>.csv` holds date,open,high,low,close rows; only bars after the
+    stock's price_watermark are loaded, so a refresh costs time proportional to new data.
+    """
+    FEED_SUFFIX = '.csv'
+
+    def __init__(self, feed_dir: str, loader: Optional[HistoricalPriceBulkLoader] = None):
+        self.feed_dir = feed_dir
+        self.loader = loader or HistoricalPriceBulkLoader()
+
+    def run(self, session: Session) -> SyncReport:
+        report = SyncReport()
+        feeds = self.feed_files()
+        stock_ids = dict(select_in(
+            session, select(Stock.ticker_symbol, Stock.id), [Stock.ticker_symbol], [(ticker,) for ticker in feeds]
+        ))
+        report.unknown_tickers = sorted(set(feeds) - set(stock_ids))
+        watermarks = self.watermarks(session, stock_ids.values())
+
+        new_marks = {}
+        for ticker, stock_id in stock_ids.items():
+            bars = read_feed(feeds[ticker], ticker, report.skipped_rows)
+            last_date = watermarks.get(stock_id)
+            if last_date is not None:
+                bars = {name: values[bars['date'] > np.datetime64(last_date, 'D')] for name, values in bars.items()}
+            if not bars['date'].size:
+                continue
+
+            report.gaps.extend(find_gaps(ticker, bars['date'], last_date))
+            report.loaded[ticker] = self.loader.load_ohlc(
+                stock_id, bars['date'], bars['open'], bars['high'], bars['low'], bars['close'], session
+            )
+            new_marks[stock_id] = bars['date'].max().item()
+
+        self.advance_watermarks(session, new_marks)
+        return report
+
+    def feed_files(self) -> Dict[str, str]:
+        """Ticker -> path for every feed file in the directory."""
+        return {
+            name[:-len(self.FEED_SUFFIX)].upper(): os.path.join(self.feed_dir, name)
+            for name in os.listdir(self.feed_dir)
+            if name.lower().endswith(self.FEED_SUFFIX)
+        }
+
+    @staticmethod
+    def watermarks(session: Session, stock_ids: Iterable[int]) -> Dict[int, date]:
+        """
+        Last loaded date per stock from price_watermark (a primary-key read).
+        Stocks with prices but no watermark yet are seeded once with a grouped MAX(date).
+        """
+        stock_ids = list(stock_ids)
+        marks = dict(select_in(
+            session, select(PriceWatermark.stock_id, PriceWatermark.last_date), [PriceWatermark.stock_id],
+            [(stock_id,) for stock_id in stock_ids],
+        ))
+        unseeded = [stock_id for stock_id in stock_ids if stock_id not in marks]
+        if unseeded:
+            seeded = dict(select_in(
+                session, select(HistoricalPrice.stock_id, func.max(HistoricalPrice.date)).group_by(HistoricalPrice.stock_id),
+                [HistoricalPrice.stock_id], [(stock_id,) for stock_id in unseeded],
+            ))
+            PriceSync.advance_watermarks(session, seeded)
+            marks.update(seeded)
+        return marks
+
+    @staticmethod
+    def advance_watermarks(session: Session, marks: Dict[int, date]) -> None:
+        if not marks:
+            return
+        table = PriceWatermark.__table__
+        stmt = upsert_statement(table, ['stock_id'], ['stock_id', 'last_date', 'updated_at'], session.get_bind().dialect.name)
+        # onupdate does not fire for ON CONFLICT DO UPDATE, so the timestamp is set explicitly
+        updated_at = datetime.utcnow()
+        session.execute(stmt, [
+            {'stock_id': stock_id, 'last_date': last_date, 'updated_at': updated_at} for stock_id, last_date in marks.items()
+        ])
+
+
+FEED_COLUMNS = ('date', 'open', 'high', 'low', 'close')
+
+
+def read_feed(path: str, ticker: str = '', skipped: Optional[List[SkippedRow]] = None) -> Dict[str, np.ndarray]:
+    """
+    Parse a feed file into date-sorted column arrays.
+    Rows with an empty or malformed field are left out and appended to `skipped` (when given).
+    """
+    rows = []
+    with open(path, newline='') as feed:
+        reader = csv.DictReader(feed)
+        for row in reader:
+            values = [(row.get(name) or '').strip() for name in FEED_COLUMNS]
+            empty = [name for name, value in zip(FEED_COLUMNS, values) if not value]
+            if empty:
+                reason = f"empty {', '.join(empty)}"
+            else:
+                try:
+                    rows.append((np.datetime64(values[0], 'D'), *(float(value) for value in values[1:])))
+                    continue
+                except ValueError as exc:
+                    reason = str(exc)
+            if skipped is not None:
+                skipped.append(SkippedRow(ticker, reader.line_num, reason))
+    dates, opens, highs, lows, closes = zip(*rows) if rows else ((), (), (), (), ())
+    bars = {
+        'date': np.array(dates, dtype='datetime64[D]'),
+        'open': np.array(opens, dtype=float),
+        'high': np.array(highs, dtype=float),
+        'low': np.array(lows, dtype=float),
+        'close': np.array(closes, dtype=float),
+    }
+    order = np.argsort(bars['date'], kind='stable')
+    return {name: values[order] for name, values in bars.items()}
+
+
+def find_gaps(ticker: str, dates: np.ndarray, last_date: Optional[date] = None) -> List[PriceGap]:
+    """Missing business days between consecutive bars, starting from the previous watermark."""
+    if last_date is not None:
+        dates = np.r_[np.datetime64(last_date, 'D'), dates]
+    missing = np.busday_count(dates[:-1] + 1, dates[1:])
+    return [
+        PriceGap(ticker, dates[i].item(), dates[i + 1].item(), int(missing[i]))
+        for i in np.flatnonzero(missing > 0)
+    ]
@@ -0,0 +1,247 @@
+# app/services/query_cache.py
+import re
+import threading
+import time
+import weakref
+from typing import Any, Callable, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql import Select, visitors
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.expression import TableClause
+
+from app.dao.models.base import BaseModel
+from app.services.utils import FlushCollector, LRUCache
+
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_TTL_SECONDS = 60.0
+
+# Tokens of hand-written SQL: comments and string literals (skipped), quoted or bare names, punctuation
+_SQL_TOKEN = re.compile(r"""--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|"((?:[^"]|"")+)"|`([^`]+)`|\[([^\]]+)\]|(\w+)|(\S)""",
+                        re.DOTALL)
+# Words that end a table reference rather than alias it
+_CLAUSE_WORDS = frozenset({
+    'where', 'group', 'order', 'having', 'limit', 'offset', 'union', 'intersect', 'except', 'window',
+    'join', 'inner', 'left', 'right', 'full', 'outer', 'cross', 'natural', 'on', 'using', 'returning',
+    'indexed', 'not', 'as',
+})
+# Target table of hand-written INSERT / UPDATE / DELETE / REPLACE statements
+_WRITE_PATTERN = re.compile(r'^\s*(?:insert|replace|update|delete)\b(?:\s+or\s+\w+)?(?:\s+into|\s+from)?\s+["`\[]?(\w+)',
+                            re.IGNORECASE)
+
+_caches: 'weakref.WeakSet[QueryCache]' = weakref.WeakSet()
+_caches_lock = threading.Lock()
+
+
+def statement_key(statement: Select) -> Tuple[str, Tuple]:
+    """Compiled SQL text plus sorted bound parameters."""
+    compiled = statement.compile()
+    return str(compiled), tuple(sorted((name, repr(value)) for name, value in compiled.params.items()))
+
+
+def statement_tables(statement: Select, known_tables: Optional[Iterable[str]] = None) -> Optional[FrozenSet[str]]:
+    """
+    Every table `statement` reads, from its joins, CTEs and subqueries alike; None when that cannot be
+    told (embedded textual SQL, or a table outside `known_tables`, by default the models' tables), in
+    which case the result must not be cached.
+    """
+    tables = set()
+    for element in visitors.iterate(statement):
+        if isinstance(element, TextClause):
+            return None
+        if isinstance(element, TableClause):
+            tables.add(element.name)
+    return _known(tables, known_tables)
+
+
+def sql_key(sql: str) -> str:
+    """The exact SQL text: folding case or whitespace would merge queries that differ in a string literal."""
+    return sql
+
+
+def sql_tables(sql: str, known_tables: Optional[Iterable[str]] = None) -> Optional[FrozenSet[str]]:
+    """
+    Tables read by a hand-written SELECT: every name after FROM or JOIN (comma-separated lists included)
+    at any nesting level, less the names its WITH clause defines. None when a reference is not a plain
+    table of `known_tables` (views, table-valued functions, unknown names): such results are not cached.
+    """
+    tokens = _sql_tokens(sql)
+    ctes = {tokens[i] for i in range(len(tokens) - 2) if _is_cte(tokens, i)}
+    tables = set()
+    i = 0
+    while i < len(tokens):
+        if tokens[i] not in ('from', 'join'):
+            i += 1
+            continue
+        i += 1
+        while i < len(tokens):
+            if tokens[i] == '(':  # subquery: its own FROM clauses are read as the scan goes on
+                break
+            name = tokens[i]
+            i += 1
+            while i + 1 < len(tokens) and tokens[i] == '.':  # schema-qualified name
+                name = tokens[i + 1]
+                i += 2
+            if i < len(tokens) and tokens[i] == '(':
+                return None  # table-valued function
+            tables.add(name)
+            if i < len(tokens) and tokens[i] == 'as':
+                i += 1
+            if i < len(tokens) and tokens[i] not in _CLAUSE_WORDS and tokens[i].isidentifier():
+                i += 1  # alias
+            if i < len(tokens) and tokens[i] == ',':
+                i += 1
+                continue
+            break
+    return _known(tables - ctes, known_tables)
+
+
+def written_tables(statement) -> FrozenSet[str]:
+    """Tables written by a Core INSERT / UPDATE / DELETE or a textual write statement (empty for reads)."""
+    if isinstance(statement, (str, TextClause)):
+        match = _WRITE_PATTERN.match(getattr(statement, 'text', statement))
+        return frozenset((match.group(1).lower(),)) if match else frozenset()
+    if getattr(statement, 'is_dml', False):
+        return frozenset((statement.table.name,)) if hasattr(statement.table, 'name') else frozenset()
+    return frozenset()
+
+
+def _sql_tokens(sql: str) -> List[str]:
+    tokens = []
+    for match in _SQL_TOKEN.finditer(sql):
+        quoted = match.group(1) or match.group(2) or match.group(3)
+        if quoted is not None:
+            tokens.append(quoted.replace('""', '"').lower())
+        elif match.group(4) is not None:
+            tokens.append(match.group(4).lower())
+        elif match.group(5) is not None:
+            tokens.append(match.group(5))
+        elif match.group(0).startswith("'"):
+            tokens.append("''")
+    return tokens
+
+
+def _is_cte(tokens: List[str], i: int) -> bool:
+    """`tokens[i]` names a common table expression: name [(columns)] AS [NOT] [MATERIALIZED] ( ..."""
+    j = i + 1
+    if tokens[j] == '(':
+        depth = 0
+        while j < len(tokens):
+            depth += {'(': 1, ')': -1}.get(tokens[j], 0)
+            j += 1
+            if not depth:
+                break
+    if j >= len(tokens) or tokens[j] != 'as':
+        return False
+    j += 1
+    while j < len(tokens) and tokens[j] in ('not', 'materialized'):
+        j += 1
+    return j < len(tokens) and tokens[j] == '(' and i > 0 and tokens[i - 1] in ('with', 'recursive', ',')
+
+
+def _known(tables: Set[str], known_tables: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    known = set(known_tables) if known_tables is not None else BaseModel.metadata.tables.keys()
+    return frozenset(tables) if tables and all(name in known for name in tables) else None
+
+
+class QueryCache:
+    """
+    TTL- and size-bounded cache of query results.
+    Every entry records the tables it read. Writes to one of those tables drop the entry when
+    they execute: ORM flushes and Core or textual INSERT / UPDATE / DELETE statements alike
+    (bulk loaders, upserts, price syncs). Writes made through a session drop it again when that
+    session commits or rolls back, since readers may have re-cached rows in between.
+    """
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self._writes = FlushCollector(self._after_flush, self.invalidate_tables, discard=self.invalidate_tables)
+        with _caches_lock:
+            _caches.add(self)
+
+    def get_or_load(self, key: Hashable, tables: Iterable[str], loader: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, _, value = entry
+            if expires_at > time.monotonic():
+                self.hits += 1
+                return value
+            self._entries.pop(key)
+            self.expired += 1
+        self.misses += 1
+        value = loader()
+        self._entries.put(key, (time.monotonic() + self.ttl, frozenset(tables), value))
+        return value
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """Drop every entry that read any of `tables`."""
+        tables = set(tables)
+        if not tables:
+            return 0
+        removed = self._entries.discard_where(lambda _, entry: not entry[1].isdisjoint(tables))
+        self.invalidated += removed
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def close(self) -> None:
+        """Stop following database writes."""
+        self._writes.close()
+        with _caches_lock:
+            _caches.discard(self)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'expired': self.expired,
+            'invalidated': self.invalidated,
+        }
+
+    @staticmethod
+    def _written_tables(session: Session) -> Set[str]:
+        tables = set()
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            mapper = getattr(obj, '__mapper__', None)
+            if mapper is None:
+                continue
+            tables.update(table.name for table in mapper.tables)
+            # Collection changes write the association table, not the mapped one
+            tables.update(rel.secondary.name for rel in mapper.relationships if rel.secondary is not None)
+        return tables
+
+    def _after_flush(self, session: Session) -> None:
+        # The flush's statements already invalidated through the engine hook; recheck on commit
+        self._writes.pending(session).update(self._written_tables(session))
+
+
+def _live_caches() -> list:
+    with _caches_lock:
+        return list(_caches)
+
+
+@event.listens_for(Engine, 'after_execute')
+def _after_execute(connection, clauseelement, multiparams, params, execution_options, result) -> None:
+    tables = written_tables(clauseelement)
+    if tables:
+        for cache in _live_caches():
+            cache.invalidate_tables(tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _do_orm_execute(state: ORMExecuteState) -> None:
+    # Core writes run through a session are invalidated again when it commits or rolls back
+    tables = written_tables(state.statement)
+    if tables:
+        for cache in _live_caches():
+            cache._writes.pending(state.session).update(tables)
@@ -0,0 +1,125 @@
+# app/services/query_executor.py
+from typing import Dict, Iterator, List, Optional, Sequence, Type
+
+from sqlalchemy import func, select, text, tuple_
+
+from app.dao.models.base import BaseModel
+from app.services.query_cache import QueryCache, sql_key, sql_tables, statement_key, statement_tables
+from app.services.session_manager import DatabaseManager
+
+DEFAULT_STREAM_BATCH_SIZE = 1000
+
+
+class DatabaseQueryExecutor:
+    """Handles direct SQL queries and their results."""
+    # only SELECT statements
+    # Selected “Known” Functions These are GenericFunction class sqlalchemy.sql.functions.
+    # array_agg Support for the ARRAY_AGG function.
+    # min The SQL MIN() aggregate function.
+
+    def __init__(self, db_manager: DatabaseManager, cache: Optional[QueryCache] = None):
+        self._db_manager = db_manager
+        # Opt-in: cached results are shared between callers and must be treated as read-only
+        self._cache = cache
+
+    def execute_select(self, select_statement: str) -> List[dict]:
+        def load():
+            with self._db_manager.get_session() as session:
+                result = session.execute(text(select_statement))
+                return [dict(row._mapping) for row in result]
+
+        tables = sql_tables(select_statement) if self._cache is not None else None
+        if tables is None:
+            return load()
+        return self._cache.get_or_load(('execute_select', sql_key(select_statement)), tables, load)
+
+    def retrieve_all_entries(self, model: Type[BaseModel]) -> List[BaseModel]:
+        with self._db_manager.get_session() as session:
+            return session.query(model).all()
+
+    def retrieve_entries_pagination(self, model: Type[BaseModel], page: int = 1, items_per_page: int = 10) -> List[BaseModel]:
+        """OFFSET/LIMIT paging for small tables and UI pages; use stream_entries to walk large tables."""
+        offset = (page - 1) * items_per_page
+        with self._db_manager.get_session() as session:
+            return session.query(model).offset(offset).limit(items_per_page).all()
+
+    def stream_entries(self, model: Type[BaseModel], filters: Optional[Dict] = None,
+                       batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+                       order_by: Optional[Sequence[str]] = None) -> Iterator[List[BaseModel]]:
+        """
+        Yield batches of entries using keyset (seek) pagination.
+        Each page starts after the last key of the previous one (WHERE (cols) > (last) ORDER BY cols LIMIT n),
+        so page N costs the same as page 1. `order_by` must be unique, e.g. ('stock_id', 'date');
+        it defaults to the primary key. Batches are expunged once consumed, keeping memory flat.
+        """
+        order_columns = [getattr(model, name) for name in order_by] if order_by else list(model.__mapper__.primary_key)
+        seek_key = order_columns[0] if len(order_columns) == 1 else tuple_(*order_columns)
+        base_statement = (
+            select(model)
+            .filter_by(**(filters or {}))
+            .order_by(*order_columns)
+            .limit(batch_size)
+            .execution_options(yield_per=batch_size)
+        )
+        with self._db_manager.get_session() as session:
+            last_key = None
+            while True:
+                statement = base_statement
+                if last_key is not None:
+                    statement = statement.where(seek_key > (last_key[0] if len(last_key) == 1 else tuple_(*last_key)))
+                batch = session.scalars(statement).all()
+                if not batch:
+                    return
+                yield batch
+                last_key = tuple(getattr(batch[-1], column.key) for column in order_columns)
+                session.expunge_all()
+                if len(batch) < batch_size:
+                    return
+
+    def retrieve_entry_by_id(self, model: Type[BaseModel], record_id: int) -> BaseModel:
+        with self._db_manager.get_session() as session:
+            return session.get(model, record_id)
+
+    def retrieve_entries_by_conditions(self, model: Type[BaseModel], conditions: Dict) -> List[BaseModel]:
+        statement = select(model).filter_by(**conditions)
+
+        def load():
+            with self._db_manager.get_session() as session:
+                entries = session.scalars(statement).all()
+                # Detach with attributes loaded so the entries outlive the session
+                session.expunge_all()
+                return entries
+
+        return self._cached(statement, load)
+
+    def count_entries_with_conditions(self, model: Type[BaseModel], conditions: Dict = None) -> int:
+        statement = select(func.count()).select_from(model).filter_by(**(conditions or {}))
+
+        def load():
+            with self._db_manager.get_session() as session:
+                return session.scalar(statement)
+
+        return self._cached(statement, load)
+
+    def does_entry_exist(self, model: Type[BaseModel], conditions: Dict) -> bool:
+        with self._db_manager.get_session() as session:
+            return session.query(model).filter_by(**conditions).first() is not None
+
+    def retrieve_model_columns(self, model: Type[BaseModel]) -> List[str]:
+        mapper = model.__mapper__
+        return [column.key for column in mapper.columns]
+
+    def joined_tables_by_id(self, model_1: Type[BaseModel], model_2: Type[BaseModel]) -> List[BaseModel]:
+        statment = select(model_1, model_2).join(model_2, model_1.id == model_2.id)
+        with self._db_manager.get_session() as session:
+            return session.execute(statment).all()
+
+    def cache_stats(self) -> Optional[dict]:
+        return self._cache.stats() if self._cache is not None else None
+
+    def _cached(self, statement, load):
+        # Results whose tables cannot all be identified would never be invalidated
+        tables = statement_tables(statement) if self._cache is not None else None
+        if tables is None:
+            return load()
+        return self._cache.get_or_load(statement_key(statement), tables, load)
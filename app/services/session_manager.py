@@ -1,8 +1,23 @@
-from contextlib import contextmanager
-from typing import Iterator
+from contextlib import contextmanager, asynccontextmanager
+from typing import Iterator, AsyncIterator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session as SessionLocal
 
+# Async drivers used in place of the default DBAPI for each backend
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+def async_database_url(database_url: str) -> str:
+    """Swap the driver of a sync URL (Config.DB_TEST / Config.DB_HOST) for its async counterpart."""
+    url = make_url(database_url)
+    if url.get_backend_name() not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{url.get_backend_name()}'")
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
 class DatabaseManager:
     """Manages the database connection and provides sessions."""
     def __init__(self, database_url: str):
@@ -21,3 +36,26 @@ class DatabaseManager:
             raise
         finally:
             session.close()
+
+class AsyncDatabaseManager:
+    """Manages an async database connection and provides async sessions."""
+    def __init__(self, database_url: str):
+        self.engine = create_async_engine(async_database_url(database_url))
+        # Objects stay usable after commit; there is no implicit lazy IO in async code
+        self.SessionLocal = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def get_session(self) -> AsyncIterator[AsyncSession]:
+        """Provide an async session for database interactions."""
+        session = self.SessionLocal()
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
@@ -0,0 +1,139 @@
+# app/services/symbol_cache.py
+from collections import defaultdict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+
+from app.dao.models import Sector, Stock
+from app.dao.models.stock_sector import stock_sector_association
+from app.services.utils import FlushCollector, LRUCache
+
+DEFAULT_CACHE_SIZE = 20_000
+
+
+class StockIdentity(NamedTuple):
+    id: int
+    ticker_symbol: str
+    company_name: Optional[str]
+    sector_ids: Tuple[int, ...]
+
+
+class SymbolCache:
+    """
+    Bounded ticker -> id and id -> StockIdentity cache shared by ingest and valuation paths.
+    Stock and Sector changes flushed through the ORM drop the affected entries at flush time, so
+    the writing session reads its own changes, and again when it commits (other sessions may have
+    re-cached the old rows meanwhile) or rolls back (its own reads may have cached rolled-back
+    rows). Core bulk writes to `stocks` must call `invalidate()`.
+    """
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self._ids = LRUCache(maxsize)
+        self._identities = LRUCache(maxsize)
+        self._changes = FlushCollector(self._collect, self._forget, discard=self._forget)
+
+    def warm(self, session: Session) -> int:
+        """Load every stock (with its sector ids) in a single query. Returns the number cached."""
+        identities = self._load(session)
+        for identity in identities:
+            self._remember(identity)
+        return len(identities)
+
+    def resolve(self, ticker_symbol: str, session: Session) -> Optional[int]:
+        return self.resolve_many([ticker_symbol], session).get(ticker_symbol)
+
+    def resolve_many(self, ticker_symbols: Iterable[str], session: Session) -> Dict[str, int]:
+        """Ticker -> id for every known ticker; all misses are fetched with one query."""
+        resolved, missing = {}, []
+        for ticker in ticker_symbols:
+            stock_id = self._ids.get(ticker)
+            if stock_id is None:
+                missing.append(ticker)
+            else:
+                resolved[ticker] = stock_id
+        if missing:
+            for identity in self._load(session, Stock.ticker_symbol.in_(missing)):
+                self._remember(identity)
+                resolved[identity.ticker_symbol] = identity.id
+        return resolved
+
+    def identity(self, stock_id: int, session: Session) -> Optional[StockIdentity]:
+        identity = self._identities.get(stock_id)
+        if identity is None:
+            loaded = self._load(session, Stock.id == stock_id)
+            if not loaded:
+                return None
+            identity = loaded[0]
+            self._remember(identity)
+        return identity
+
+    def invalidate(self, stock_id: Optional[int] = None, ticker_symbol: Optional[str] = None) -> None:
+        """Drop one stock's entries, or everything when called without arguments."""
+        if stock_id is None and ticker_symbol is None:
+            self._ids.clear()
+            self._identities.clear()
+            return
+        if stock_id is not None:
+            identity = self._identities.pop(stock_id)
+            if identity is not None:
+                self._ids.pop(identity.ticker_symbol)
+            else:
+                self._ids.discard_where(lambda _, cached_id: cached_id == stock_id)
+        if ticker_symbol is not None:
+            self._ids.pop(ticker_symbol)
+
+    def stats(self) -> dict:
+        return {'ids': self._ids.stats(), 'identities': self._identities.stats()}
+
+    def close(self) -> None:
+        """Stop following session writes."""
+        self._changes.close()
+
+    def _remember(self, identity: StockIdentity) -> None:
+        self._ids.put(identity.ticker_symbol, identity.id)
+        self._identities.put(identity.id, identity)
+
+    @staticmethod
+    def _load(session: Session, *conditions) -> list:
+        stmt = (
+            select(Stock.id, Stock.ticker_symbol, Stock.company_name, stock_sector_association.c.sector_id)
+            .outerjoin(stock_sector_association, stock_sector_association.c.stock_id == Stock.id)
+            .where(*conditions)
+        )
+        stocks, sectors = {}, defaultdict(list)
+        for stock_id, ticker, company_name, sector_id in session.execute(stmt):
+            stocks[stock_id] = (ticker, company_name)
+            if sector_id is not None:
+                sectors[stock_id].append(sector_id)
+        return [
+            StockIdentity(stock_id, ticker, company_name, tuple(sorted(sectors[stock_id])))
+            for stock_id, (ticker, company_name) in stocks.items()
+        ]
+
+    def _collect(self, session: Session) -> None:
+        changes = set()
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, Stock):
+                # A renamed stock must also release its previous ticker
+                changes.update(('ticker', ticker) for ticker in inspect(obj).attrs.ticker_symbol.history.sum())
+                if obj.id is not None:
+                    changes.add(('stock', obj.id))
+            elif isinstance(obj, Sector):
+                # Sector membership lives on every member identity
+                changes.add(('sectors', None))
+        if changes:
+            self._forget(changes)
+            self._changes.pending(session).update(changes)
+
+    def _forget(self, changes: set) -> None:
+        for kind, value in changes:
+            if kind == 'ticker':
+                self._ids.pop(value)
+            elif kind == 'stock':
+                self.invalidate(stock_id=value)
+            else:
+                self._identities.clear()
+
+
+# Process-wide instance
+symbol_cache = SymbolCache()
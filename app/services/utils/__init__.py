@@ -0,0 +1,2 @@
+from .lru_cache import LRUCache
+from .flush_collector import FlushCollector
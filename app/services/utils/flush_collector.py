@@ -0,0 +1,88 @@
+# app/services/utils/flush_collector.py
+import itertools
+import threading
+import weakref
+from typing import Any, Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+_collectors: 'weakref.WeakSet[FlushCollector]' = weakref.WeakSet()
+_lock = threading.Lock()
+_keys = itertools.count()
+
+
+class FlushCollector:
+    """
+    Gathers what ORM flushes change, per session, and hands it over once that session commits.
+    `collect(session)` runs after every flush and adds to `pending(session)`; the pending changes
+    go to `apply` on commit and to `discard` (if given) on rollback. `collect_statement(state)`, if
+    given, sees every statement run through a session as well, for Core writes that bypass the flush.
+    One set of Session listeners,
+    registered at import, serves every live collector: collectors are held weakly, and `close()`
+    detaches one immediately.
+    """
+    def __init__(self, collect: Callable[[Session], None], apply: Callable[[Any], None],
+                 discard: Optional[Callable[[Any], None]] = None, factory: Callable[[], Any] = set,
+                 collect_statement: Optional[Callable[[ORMExecuteState], None]] = None):
+        self._collect = collect
+        self._collect_statement = collect_statement
+        self._apply = apply
+        self._discard = discard
+        self._factory = factory
+        self._key = ('flush_collector', next(_keys))
+        with _lock:
+            _collectors.add(self)
+
+    def pending(self, session: Session) -> Any:
+        """Changes `session` has flushed but not committed yet (created empty on first use)."""
+        return session.info.setdefault(self._key, self._factory())
+
+    def pop(self, session: Session) -> Any:
+        """Take the pending changes of `session` out of it, e.g. once they have been handled early."""
+        pending = session.info.pop(self._key, None)
+        return pending if pending is not None else self._factory()
+
+    def close(self) -> None:
+        with _lock:
+            _collectors.discard(self)
+
+    def _after_commit(self, session: Session) -> None:
+        pending = session.info.pop(self._key, None)
+        if pending is not None:
+            self._apply(pending)
+
+    def _after_rollback(self, session: Session) -> None:
+        pending = session.info.pop(self._key, None)
+        if pending is not None and self._discard is not None:
+            self._discard(pending)
+
+
+def _live() -> list:
+    with _lock:
+        return list(_collectors)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session: Session, flush_context) -> None:
+    for collector in _live():
+        collector._collect(session)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _do_orm_execute(state: ORMExecuteState) -> None:
+    for collector in _live():
+        if collector._collect_statement is not None:
+            collector._collect_statement(state)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session: Session) -> None:
+    for collector in _live():
+        collector._after_commit(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session: Session) -> None:
+    for collector in _live():
+        collector._after_rollback(session)
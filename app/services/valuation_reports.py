@@ -0,0 +1,229 @@
+# app/services/valuation_reports.py
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.dao.models import Stock, ValuationModel
+from app.services.price_store import default_store_root
+from app.services.utils import LRUCache
+
+DEFAULT_CHUNK_SIZE = 256  # valuations per chunk; the unit of lazy reads
+DEFAULT_WORKERS = 2
+OPEN_BATCHES = 32  # batch files whose index is kept open
+EXPORT_FORMATS = ('csv', 'excel')
+_KEY_SEPARATOR = '#'
+
+
+def default_report_root() -> str:
+    """Default root of batch files: a `valuation_reports/` sibling of the `default_store_root()` directory."""
+    return os.path.join(os.path.dirname(default_store_root()), 'valuation_reports')
+
+
+def report_path(batch_path: str, valuation_id: int) -> str:
+    """ValuationModel.file_path of one report inside a batch file."""
+    return f'{batch_path}{_KEY_SEPARATOR}{valuation_id}'
+
+
+def split_report_path(file_path: str) -> Tuple[str, int]:
+    batch_path, _, valuation_id = file_path.rpartition(_KEY_SEPARATOR)
+    if not batch_path:
+        raise ValueError(f"{file_path} is not a columnar report path")
+    return batch_path, int(valuation_id)
+
+
+class ReportBatch(NamedTuple):
+    path: str
+    file_paths: Dict[int, str]  # valuation id -> ValuationModel.file_path
+    future: Future
+
+
+class _BatchIndex(NamedTuple):
+    archive: object  # numpy NpzFile, members are read on access
+    valuation_ids: np.ndarray  # sorted
+    row_offsets: np.ndarray  # len(valuation_ids) + 1
+    columns: Tuple[str, ...]
+    chunk_size: int
+
+
+class ReportStore:
+    """
+    Columnar valuation reports. A report is a small table (named 1-D columns of equal length) per
+    valuation; a batch of reports is one compressed .npz whose members are each column split into
+    chunks of `chunk_size` valuations, plus a sorted valuation id index and row offsets. Reading
+    one column of one valuation decompresses a single chunk of that column only.
+    Batches are written on a thread pool; reads of a batch still being written wait for it.
+    ValuationModel.file_path stores `<batch file>#<valuation id>`, set by `finalize()` only for
+    batches already on disk; CSV or Excel files are produced on demand by `export()`.
+    """
+    def __init__(self, root: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 workers: int = DEFAULT_WORKERS):
+        self.root = root or default_report_root()
+        self.chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='valuation-report')
+        self._pending: Dict[str, Future] = {}
+        self._written: Dict[int, str] = {}  # valuation id -> file_path of written batches not yet recorded
+        self._lock = threading.Lock()
+        self._batches = LRUCache(OPEN_BATCHES, on_evict=lambda path, index: index.archive.close())
+
+    def submit(self, reports: Mapping[int, Mapping[str, np.ndarray]]) -> ReportBatch:
+        """Queue one batch file holding `reports` (valuation id -> columns) and return its paths at once."""
+        if not reports:
+            raise ValueError("No reports to write")
+        members = self._members(reports)
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, f'reports-{uuid.uuid4().hex}.npz')
+        # Only compression and the file write happen off the caller's thread
+        future = self._executor.submit(self._write, path, members)
+        with self._lock:
+            self._pending[path] = future
+        file_paths = {valuation_id: report_path(path, valuation_id) for valuation_id in members['valuation_ids'].tolist()}
+        future.add_done_callback(lambda done: self._forget(path, file_paths, done))
+        return ReportBatch(path, file_paths, future)
+
+    def wait(self) -> None:
+        """Block until every queued batch is written, re-raising the first write error."""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.result()
+
+    def finalize(self, session: Session) -> int:
+        """
+        Record ValuationModel.file_path for every batch written since the last call, without waiting
+        for batches still being written (call `wait()` first to include them). Returns reports linked.
+        """
+        with self._lock:
+            written, self._written = self._written, {}
+        try:
+            record_report_paths(session, written)
+        except Exception:
+            with self._lock:
+                self._written.update(written)
+            raise
+        return len(written)
+
+    def close(self) -> None:
+        """Finish queued writes and close the open batch files."""
+        self._executor.shutdown(wait=True)
+        self._batches.clear()
+
+    def read(self, file_path: str, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Columns (default: all) of the report stored at `file_path`."""
+        batch_path, valuation_id = split_report_path(file_path)
+        index = self._index(batch_path)
+        position = int(np.searchsorted(index.valuation_ids, valuation_id))
+        if position == index.valuation_ids.size or index.valuation_ids[position] != valuation_id:
+            raise KeyError(f"No report for valuation {valuation_id} in {batch_path}")
+        chunk = position // index.chunk_size
+        chunk_start = index.row_offsets[chunk * index.chunk_size]
+        start, stop = index.row_offsets[position] - chunk_start, index.row_offsets[position + 1] - chunk_start
+        return {name: index.archive[f'{name}.{chunk}'][start:stop] for name in self._columns(index, columns)}
+
+    def read_column(self, batch_path: str, column: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(valuation_ids, row_offsets, values) of one column over a whole batch, for cross-valuation comparisons."""
+        index = self._index(batch_path)
+        self._columns(index, [column])
+        chunks = -(-index.valuation_ids.size // index.chunk_size)
+        values = np.concatenate([index.archive[f'{column}.{chunk}'] for chunk in range(chunks)])
+        return index.valuation_ids, index.row_offsets, values
+
+    def export(self, session: Session, valuation_id: int, directory: str, fmt: str = 'csv') -> str:
+        """Write one report as `<stock_symbol>_<valuation_method>_<valuation_date>.csv` (or .xlsx); returns the path."""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt}; expected one of {EXPORT_FORMATS}")
+        import pandas as pd  # only needed for exports
+
+        row = session.execute(
+            select(ValuationModel.file_path, ValuationModel.valuation_method, ValuationModel.valuation_date, Stock.ticker_symbol)
+            .outerjoin(Stock, Stock.id == ValuationModel.stock_id)
+            .where(ValuationModel.id == valuation_id)
+        ).one_or_none()
+        if row is None or row.file_path is None:
+            raise KeyError(f"Valuation {valuation_id} has no stored report")
+        frame = pd.DataFrame(self.read(row.file_path))
+        name = f'{row.ticker_symbol}_{row.valuation_method}_{row.valuation_date:%Y-%m-%d}'
+        os.makedirs(directory, exist_ok=True)
+        if fmt == 'csv':
+            path = os.path.join(directory, f'{name}.csv')
+            frame.to_csv(path, index=False)
+        else:
+            path = os.path.join(directory, f'{name}.xlsx')
+            frame.to_excel(path, index=False)
+        return path
+
+    def _members(self, reports: Mapping[int, Mapping[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Archive members of a batch: the index arrays and every column split into chunks (copies of the inputs)."""
+        valuation_ids = np.array(sorted(reports), dtype=np.int64)
+        ordered = [reports[valuation_id] for valuation_id in valuation_ids.tolist()]
+        columns = tuple(ordered[0])
+        lengths = []
+        for valuation_id, report in zip(valuation_ids.tolist(), ordered):
+            if tuple(report) != columns:
+                raise ValueError(f"Report of valuation {valuation_id} has columns {tuple(report)}, expected {columns}")
+            sizes = {np.size(values) for values in report.values()}
+            if len(sizes) != 1:
+                raise ValueError(f"Columns of the report of valuation {valuation_id} differ in length")
+            lengths.append(sizes.pop())
+        row_offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+
+        members = {'valuation_ids': valuation_ids, 'row_offsets': row_offsets,
+                   'columns': np.array(columns), 'chunk_size': np.array(self.chunk_size)}
+        for name in columns:
+            values = np.concatenate([np.ravel(report[name]) for report in ordered])
+            for chunk, first in enumerate(range(0, valuation_ids.size, self.chunk_size)):
+                last = min(first + self.chunk_size, valuation_ids.size)
+                members[f'{name}.{chunk}'] = values[row_offsets[first]:row_offsets[last]]
+        return members
+
+    @staticmethod
+    def _write(path: str, members: Dict[str, np.ndarray]) -> None:
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as batch_file:
+            np.savez_compressed(batch_file, **members)
+        os.replace(temporary, path)
+
+    def _index(self, batch_path: str) -> _BatchIndex:
+        with self._lock:
+            pending = self._pending.get(batch_path)
+        if pending is not None:
+            pending.result()
+        index = self._batches.get(batch_path)
+        if index is None:
+            archive = np.load(batch_path)
+            index = _BatchIndex(archive, archive['valuation_ids'], archive['row_offsets'],
+                                tuple(archive['columns'].tolist()), int(archive['chunk_size']))
+            self._batches.put(batch_path, index)
+        return index
+
+    @staticmethod
+    def _columns(index: _BatchIndex, columns: Optional[Iterable[str]]) -> List[str]:
+        if columns is None:
+            return list(index.columns)
+        unknown = set(columns) - set(index.columns)
+        if unknown:
+            raise KeyError(f"Unknown report columns {sorted(unknown)}")
+        return list(columns)
+
+    def _forget(self, path: str, file_paths: Dict[int, str], future: Future) -> None:
+        # Failed writes stay pending so wait() and reads of the batch re-raise the error
+        if future.exception() is None:
+            with self._lock:
+                self._pending.pop(path, None)
+                self._written.update(file_paths)
+
+
+def record_report_paths(session: Session, file_paths: Mapping[int, str]) -> None:
+    """Point ValuationModel.file_path of each valuation at its stored report (see ReportStore.finalize)."""
+    if not file_paths:
+        return
+    table = ValuationModel.__table__
+    session.execute(
+        update(table).where(table.c.id == bindparam('valuation_id')).values(file_path=bindparam('path')),
+        [{'valuation_id': valuation_id, 'path': path} for valuation_id, path in file_paths.items()],
+    )
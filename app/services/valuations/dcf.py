@@ -0,0 +1,241 @@
+# app/services/valuations/dcf.py
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.dao.models import HistoricalMetrics, ValuationModel
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, BulkLoader, chunked
+from app.services.valuation_reports import ReportStore
+from app.services.valuations.memo import ValuationMemo, memo_key
+
+DCF_METHOD = 'DCF'
+QUARTERS_PER_YEAR = 4
+
+
+@dataclass(frozen=True)
+class DCFParameters:
+    """Universe-wide inputs; stored as the `parameters` JSON of every ValuationModel row."""
+    discount_rate: float = 0.09
+    terminal_growth: float = 0.025
+    projection_years: int = 5
+    default_growth: float = 0.03  # used when there is no prior year of revenue
+    min_growth: float = -0.10
+    max_growth: float = 0.25
+    lookback_quarters: int = 8
+
+    def __post_init__(self):
+        if self.discount_rate <= self.terminal_growth:
+            raise ValueError("discount_rate must exceed terminal_growth")
+        if self.lookback_quarters < QUARTERS_PER_YEAR:
+            raise ValueError(f"lookback_quarters must cover at least {QUARTERS_PER_YEAR} quarters")
+
+
+@dataclass
+class MetricsMatrix:
+    """Quarterly metrics as stocks x quarters matrices, column 0 being the latest quarter (NaN padded)."""
+    stock_ids: np.ndarray
+    dates: np.ndarray
+    revenue: np.ndarray
+    net_income: np.ndarray
+    shares_outstanding: np.ndarray
+
+    @classmethod
+    def load(cls, session: Session, quarters: int, stock_ids: Optional[Iterable[int]] = None) -> 'MetricsMatrix':
+        """The latest `quarters` rows per stock in one windowed query (one per MAX_BIND_PARAMS stocks when `stock_ids` is given)."""
+        if stock_ids is None:
+            rows = session.execute(cls._latest_rows(quarters)).all()
+        else:
+            # Chunks of sorted ids keep the rows sorted by stock id; the recency bound takes one parameter
+            rows = [row for chunk in chunked(sorted(set(stock_ids)), MAX_BIND_PARAMS - 1)
+                    for row in session.execute(cls._latest_rows(quarters, chunk))]
+
+        ids, dates, revenue, net_income, shares, recency = (
+            np.array(column, dtype=dtype) for column, dtype in zip(
+                zip(*rows) if rows else ((),) * 6,
+                (np.int64, 'datetime64[D]', float, float, float, np.int64),
+            )
+        )
+        unique_ids, row = np.unique(ids, return_inverse=True)
+        column = recency - 1
+
+        def matrix(values, fill=np.nan, dtype=float):
+            out = np.full((unique_ids.size, quarters), fill, dtype=dtype)
+            out[row, column] = values
+            return out
+
+        return cls(unique_ids, matrix(dates, np.datetime64('NaT'), 'datetime64[D]'),
+                   matrix(revenue), matrix(net_income), matrix(shares))
+
+    @staticmethod
+    def _latest_rows(quarters: int, stock_ids: Optional[Iterable[int]] = None):
+        recency = func.row_number().over(
+            partition_by=HistoricalMetrics.stock_id, order_by=HistoricalMetrics.date.desc()
+        ).label('recency')
+        ranked = select(HistoricalMetrics.stock_id, HistoricalMetrics.date, HistoricalMetrics.revenue,
+                        HistoricalMetrics.net_income, HistoricalMetrics.shares_outstanding, recency)
+        if stock_ids is not None:
+            ranked = ranked.where(HistoricalMetrics.stock_id.in_(list(stock_ids)))
+        ranked = ranked.subquery()
+        return select(ranked).where(ranked.c.recency <= quarters).order_by(ranked.c.stock_id, ranked.c.recency)
+
+    def take(self, rows: np.ndarray) -> 'MetricsMatrix':
+        """The stocks selected by `rows` (a boolean mask or positions)."""
+        return MetricsMatrix(self.stock_ids[rows], self.dates[rows], self.revenue[rows],
+                             self.net_income[rows], self.shares_outstanding[rows])
+
+    def fingerprints(self) -> Dict[int, list]:
+        """Per stock, every value a valuation reads, in quarter order: any edit of an input changes it."""
+        return {
+            stock_id: [dates, revenue, net_income, shares]
+            for stock_id, dates, revenue, net_income, shares in zip(
+                self.stock_ids.tolist(), self.dates.tolist(), self.revenue.tolist(),
+                self.net_income.tolist(), self.shares_outstanding.tolist(),
+            )
+        }
+
+
+@dataclass
+class DCFResult:
+    """Per-stock DCF outputs aligned with `stock_ids`; `value_per_share` is NaN where the model does not apply."""
+    stock_ids: np.ndarray
+    as_of: np.ndarray
+    base_cash_flow: np.ndarray
+    revenue: np.ndarray
+    shares_outstanding: np.ndarray
+    growth: np.ndarray
+    enterprise_value: np.ndarray
+    value_per_share: np.ndarray
+    parameters: DCFParameters = field(default_factory=DCFParameters)
+
+    @property
+    def valid(self) -> np.ndarray:
+        return np.isfinite(self.value_per_share)
+
+    def rows(self, valuation_date: Optional[datetime] = None) -> List[dict]:
+        """ValuationModel rows for every stock with a usable valuation."""
+        valuation_date = valuation_date or datetime.utcnow()
+        parameters = json.dumps(asdict(self.parameters), sort_keys=True)
+        valid = self.valid
+        return [
+            {
+                'stock_id': stock_id,
+                'valuation_date': valuation_date,
+                'valuation_method': DCF_METHOD,
+                'valuation_result': value,
+                'assumptions': json.dumps({
+                    'as_of': str(as_of), 'base_cash_flow': base, 'revenue': revenue, 'shares_outstanding': shares,
+                    'growth': growth, 'present_value': present_value,
+                }, sort_keys=True),
+                'parameters': parameters,
+            }
+            for stock_id, as_of, base, revenue, shares, growth, present_value, value in zip(
+                self.stock_ids[valid].tolist(), self.as_of[valid], self.base_cash_flow[valid].tolist(),
+                self.revenue[valid].tolist(), self.shares_outstanding[valid].tolist(), self.growth[valid].tolist(),
+                self.enterprise_value[valid].tolist(), self.value_per_share[valid].tolist(),
+            )
+        ]
+
+    def projections(self) -> Dict[str, np.ndarray]:
+        """Year-by-year projection of every valid stock: valid stocks x projection_years matrices."""
+        p = self.parameters
+        valid = self.valid
+        years = np.arange(1, p.projection_years + 1)
+        growth = self.growth[valid, None] + (p.terminal_growth - self.growth[valid, None]) * (years / p.projection_years)
+        cash_flow = self.base_cash_flow[valid, None] * np.cumprod(1.0 + growth, axis=1)
+        discount = (1.0 + p.discount_rate) ** -years
+        return {
+            'year': np.broadcast_to(years, growth.shape),
+            'growth': growth,
+            'cash_flow': cash_flow,
+            'discount_factor': np.broadcast_to(discount, growth.shape),
+            'present_value': cash_flow * discount,
+        }
+
+
+class DCFEngine:
+    """
+    Discounted cash flow valuation of the whole universe in one vectorised pass.
+    Trailing-twelve-month net income is the cash flow proxy (the metrics carry no cash flow column);
+    year-over-year TTM revenue growth fades linearly to the terminal rate over the projection,
+    and a Gordon terminal value closes the horizon. Stocks with fewer than four quarters,
+    non-positive earnings or no share count get NaN and are not written.
+    """
+    def __init__(self, parameters: Optional[DCFParameters] = None):
+        self.parameters = parameters or DCFParameters()
+
+    def value(self, session: Session, stock_ids: Optional[Iterable[int]] = None) -> DCFResult:
+        return self.value_matrix(MetricsMatrix.load(session, self.parameters.lookback_quarters, stock_ids))
+
+    def value_matrix(self, metrics: MetricsMatrix) -> DCFResult:
+        p = self.parameters
+        year = slice(0, QUARTERS_PER_YEAR)
+        prior_year = slice(QUARTERS_PER_YEAR, 2 * QUARTERS_PER_YEAR)
+
+        # Sums are NaN unless all four quarters are present
+        ttm_income = metrics.net_income[:, year].sum(axis=1)
+        ttm_revenue = metrics.revenue[:, year].sum(axis=1)
+        prior_revenue = metrics.revenue[:, prior_year].sum(axis=1) if metrics.revenue.shape[1] >= 2 * QUARTERS_PER_YEAR \
+            else np.full(ttm_revenue.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.where(prior_revenue > 0, ttm_revenue / prior_revenue - 1.0, p.default_growth)
+        growth = np.clip(np.where(np.isfinite(growth), growth, p.default_growth), p.min_growth, p.max_growth)
+
+        # stocks x years growth path, fading from each stock's rate to the terminal rate
+        fade = np.arange(1, p.projection_years + 1) / p.projection_years
+        path = growth[:, None] + (p.terminal_growth - growth[:, None]) * fade[None, :]
+        cash_flows = ttm_income[:, None] * np.cumprod(1.0 + path, axis=1)
+        discount = (1.0 + p.discount_rate) ** -np.arange(1, p.projection_years + 1)
+        terminal = cash_flows[:, -1] * (1.0 + p.terminal_growth) / (p.discount_rate - p.terminal_growth)
+        present_value = cash_flows @ discount + terminal * discount[-1]
+
+        shares = metrics.shares_outstanding[:, 0]
+        usable = (ttm_income > 0) & (shares > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value_per_share = np.where(usable, present_value / shares, np.nan)
+
+        return DCFResult(metrics.stock_ids, metrics.dates[:, 0], ttm_income, ttm_revenue, shares, growth,
+                         np.where(usable, present_value, np.nan), value_per_share, p)
+
+    def run(self, session: Session, stock_ids: Optional[Iterable[int]] = None,
+            reports: Optional[ReportStore] = None, memo: Optional[ValuationMemo] = None) -> List[int]:
+        """
+        Value the universe and bulk-insert one ValuationModel row per valued stock; returns their ids ordered by stock id.
+        With `reports`, each valuation's projection is written as a columnar report in the background;
+        file_path is set once the batch is on disk, by this or a later run or by `reports.finalize()`.
+        With `memo`, stocks whose parameters and metrics are unchanged since a memoised run are not
+        valued again: the existing valuation id is returned for them instead of a new row.
+        """
+        metrics = MetricsMatrix.load(session, self.parameters.lookback_quarters, stock_ids)
+        keys, cached = {}, {}
+        if memo is not None:
+            parameters = asdict(self.parameters)
+            # The fingerprint is exactly the metrics value_matrix reads for the stock
+            keys = {stock_id: memo_key(DCF_METHOD, parameters, None, fingerprint)
+                    for stock_id, fingerprint in metrics.fingerprints().items()}
+            cached = memo.lookup(session, keys)
+            metrics = metrics.take(~np.isin(metrics.stock_ids, list(cached)))
+
+        result = self.value_matrix(metrics)
+        rows = result.rows()
+        # Each run appends new valuations rather than updating earlier ones, so there is nothing to version
+        ids = BulkLoader(ValuationModel, versioning='skip').load_rows_returning(rows, session) if rows else []
+        if reports is not None and ids:
+            projections = result.projections()
+            reports.submit({
+                valuation_id: {name: values[row] for name, values in projections.items()}
+                for row, valuation_id in enumerate(ids)
+            })
+        if reports is not None:
+            # Links batches that are already on disk, this run's or earlier ones; never waits
+            reports.finalize(session)
+
+        valued = dict(zip(result.stock_ids[result.valid].tolist(), ids))
+        if memo is not None:
+            memo.store(session, DCF_METHOD, {stock_id: (keys[stock_id], valuation_id) for stock_id, valuation_id in valued.items()})
+            valued.update(cached)
+        return [valued[stock_id] for stock_id in sorted(valued)]
@@ -0,0 +1,276 @@
+# app/services/valuations/ledger_replay.py
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.dao.models import Holding, HoldingCheckpoint, Transaction
+from app.dao.repository.bulk_loader import DEFAULT_CHUNK_SIZE, MAX_BIND_PARAMS, chunked, select_in
+
+# Portfolios checkpoint once this many trades have been replayed past their last checkpoint
+DEFAULT_CHECKPOINT_EVERY = 500
+_OPEN = 'OPEN'  # synthetic row carrying a checkpointed position into the replay
+
+
+@dataclass
+class LedgerPositions:
+    """Position state per (portfolio, stock), sorted by portfolio then stock, after one replay."""
+    portfolio_ids: np.ndarray
+    stock_ids: np.ndarray
+    quantity: np.ndarray
+    cost_value: np.ndarray
+    average_cost: np.ndarray
+    realised_pnl: np.ndarray
+    as_of_date: np.ndarray
+    cursors: Dict[int, int]  # portfolio_id -> id of the last replayed transaction
+    new_trades: Dict[int, int]  # portfolio_id -> transactions replayed past the checkpoint
+
+    def position(self, portfolio_id: int, stock_id: int) -> Optional[dict]:
+        found = np.flatnonzero((self.portfolio_ids == portfolio_id) & (self.stock_ids == stock_id))
+        if not found.size:
+            return None
+        row = found[0]
+        return {
+            'quantity': float(self.quantity[row]),
+            'cost_value': float(self.cost_value[row]),
+            'average_cost': float(self.average_cost[row]),
+            'realised_pnl': float(self.realised_pnl[row]),
+        }
+
+
+def _affine_scan(ratio: np.ndarray, added: np.ndarray) -> np.ndarray:
+    """
+    x_t = ratio_t * x_{t-1} + added_t (x_{-1} = 0) for every t, as a prefix scan: log2(n) vectorised
+    steps, each composing every map x -> a*x + b with the one `shift` rows before it. A ratio of 0
+    restarts the recurrence exactly, without subtracting offsets from a longer running total.
+    """
+    a, b = np.array(ratio, dtype=float), np.array(added, dtype=float)
+    shift = 1
+    while shift < b.size:
+        b[shift:] = a[shift:] * b[:-shift] + b[shift:]
+        a[shift:] = a[shift:] * a[:-shift]
+        shift *= 2
+    return b
+
+
+def _segment_cumsum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Running sum that restarts wherever `starts` is True."""
+    return _affine_scan(np.where(starts, 0.0, 1.0), values)
+
+
+def _lot_cost(ratio: np.ndarray, added: np.ndarray, lot_start: np.ndarray) -> np.ndarray:
+    """cost_t = ratio_t * cost_{t-1} + added_t, restarting at every lot."""
+    return _affine_scan(np.where(lot_start, 0.0, ratio), added)
+
+
+class LedgerReplayEngine:
+    """
+    Rebuilds positions and average cost basis from the transaction ledger with vectorised,
+    per-(portfolio, stock) cumulative operations instead of a Python loop per trade.
+
+    BUY adds shares at price plus fees, STOCK_SPLIT adds shares at zero cost, SELL removes shares
+    at the running average cost (booking realised P&L net of fees) and DIVIDEND leaves the position
+    unchanged. Replays resume from each portfolio's latest HoldingCheckpoint; a portfolio with a new
+    trade dated before its checkpoint is rebuilt from its first trade. Edits or deletions of
+    already checkpointed trades are not detected and need `full=True`.
+    """
+    def __init__(self, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY):
+        self.checkpoint_every = checkpoint_every
+
+    def update(self, session: Session, portfolio_ids: Optional[Iterable[int]] = None) -> LedgerPositions:
+        """Replay new trades, checkpoint portfolios that are due and derive their Holding rows."""
+        positions = self.replay(session, portfolio_ids)
+        self.checkpoint(session, positions)
+        self.sync_holdings(session, positions)
+        return positions
+
+    def replay(self, session: Session, portfolio_ids: Optional[Iterable[int]] = None, full: bool = False) -> LedgerPositions:
+        portfolio_ids = list(portfolio_ids) if portfolio_ids is not None else None
+        states, trades = self._load(session, portfolio_ids, rebuild=None if not full else set())
+        if not full and trades and states:
+            # A new trade dated before the checkpoint invalidates it for that portfolio
+            checkpointed_at = {}
+            for state in states:
+                checkpointed_at[state.portfolio_id] = max(state.as_of_date, checkpointed_at.get(state.portfolio_id, state.as_of_date))
+            backdated = {trade.portfolio_id for trade in trades
+                         if trade.portfolio_id in checkpointed_at and trade.transaction_date < checkpointed_at[trade.portfolio_id]}
+            if backdated:
+                if portfolio_ids is None:
+                    # Name the portfolios so the rebuild set is bound per chunk of them
+                    portfolio_ids = sorted({state.portfolio_id for state in states} | {trade.portfolio_id for trade in trades})
+                states, trades = self._load(session, portfolio_ids, rebuild=backdated)
+        return self._compute(states, trades)
+
+    def checkpoint(self, session: Session, positions: LedgerPositions, force: bool = False) -> int:
+        """Persist the positions of every portfolio that is due (or that has any new trade when `force`)."""
+        threshold = 1 if force else self.checkpoint_every
+        due = [portfolio_id for portfolio_id, count in positions.new_trades.items() if count >= threshold]
+        rows = [
+            {
+                'portfolio_id': portfolio_id,
+                'stock_id': stock_id,
+                'last_transaction_id': positions.cursors[portfolio_id],
+                'as_of_date': as_of_date,
+                'quantity': quantity,
+                'cost_value': cost_value,
+                'realised_pnl': realised_pnl,
+            }
+            for portfolio_id, stock_id, as_of_date, quantity, cost_value, realised_pnl in zip(
+                positions.portfolio_ids.tolist(), positions.stock_ids.tolist(), positions.as_of_date.tolist(),
+                positions.quantity.tolist(), positions.cost_value.tolist(), positions.realised_pnl.tolist(),
+            )
+            if portfolio_id in due
+        ]
+        for chunk in chunked(rows, DEFAULT_CHUNK_SIZE):
+            session.execute(insert(HoldingCheckpoint), list(chunk))
+        for portfolio_id in due:
+            positions.new_trades[portfolio_id] = 0
+        return len(rows)
+
+    def sync_holdings(self, session: Session, positions: LedgerPositions) -> None:
+        """Make Holding rows of the replayed portfolios match the ledger; closed positions are removed."""
+        portfolios = list(positions.cursors)
+        if not portfolios:
+            return
+        existing: Dict[tuple, Holding] = {}
+        holdings = [row[0] for row in select_in(session, select(Holding), [Holding.portfolio_id],
+                                                [(portfolio_id,) for portfolio_id in portfolios])]
+        for holding in sorted(holdings, key=lambda holding: holding.id):
+            key = (holding.portfolio_id, holding.stock_id)
+            if key in existing:
+                session.delete(holding)  # duplicate of a position the ledger tracks once
+            else:
+                existing[key] = holding
+
+        for portfolio_id, stock_id, quantity, average_cost, as_of_date in zip(
+            positions.portfolio_ids.tolist(), positions.stock_ids.tolist(), positions.quantity.tolist(),
+            positions.average_cost.tolist(), positions.as_of_date.tolist(),
+        ):
+            holding = existing.pop((portfolio_id, stock_id), None)
+            if quantity <= 0:
+                if holding is not None:
+                    session.delete(holding)
+                continue
+            if holding is None:
+                holding = Holding(portfolio_id=portfolio_id, stock_id=stock_id)
+                session.add(holding)
+            holding.quantity = quantity
+            holding.average_cost_basis = average_cost
+            holding.date = as_of_date
+        for holding in existing.values():
+            session.delete(holding)  # held without any trade in the ledger
+        session.flush()
+
+    @classmethod
+    def _load(cls, session: Session, portfolio_ids: Optional[list], rebuild: Optional[Set[int]]):
+        """Latest checkpoint rows and the trades after them; portfolios in `rebuild` (all when empty) start over."""
+        if portfolio_ids is None:
+            return cls._load_chunk(session, None, rebuild)
+        states, trades = [], []
+        # The trade, checkpoint and rebuild filters each bind up to the whole chunk
+        for chunk in chunked(sorted(set(portfolio_ids)), MAX_BIND_PARAMS // 3):
+            chunk_rebuild = rebuild
+            if rebuild:
+                chunk_rebuild = rebuild.intersection(chunk) or None
+            chunk_states, chunk_trades = cls._load_chunk(session, list(chunk), chunk_rebuild)
+            states.extend(chunk_states)
+            trades.extend(chunk_trades)
+        return states, trades
+
+    @staticmethod
+    def _load_chunk(session: Session, portfolio_ids: Optional[list], rebuild: Optional[Set[int]]):
+        states = []
+        trades = (
+            select(Transaction.id, Transaction.portfolio_id, Transaction.stock_id, Transaction.transaction_type,
+                   Transaction.transaction_date, func.coalesce(Transaction.quantity, 0), func.coalesce(Transaction.price, 0.0),
+                   func.coalesce(Transaction.fees, 0.0))
+            .order_by(Transaction.portfolio_id, Transaction.stock_id, Transaction.transaction_date, Transaction.id)
+        )
+        if portfolio_ids is not None:
+            trades = trades.where(Transaction.portfolio_id.in_(portfolio_ids))
+        if rebuild is None or rebuild:
+            cursor = select(HoldingCheckpoint.portfolio_id, func.max(HoldingCheckpoint.last_transaction_id).label('last_id'))
+            if rebuild:
+                cursor = cursor.where(HoldingCheckpoint.portfolio_id.not_in(rebuild))
+            if portfolio_ids is not None:
+                cursor = cursor.where(HoldingCheckpoint.portfolio_id.in_(portfolio_ids))
+            cursor = cursor.group_by(HoldingCheckpoint.portfolio_id).subquery()
+            states = session.execute(
+                select(HoldingCheckpoint.portfolio_id, HoldingCheckpoint.stock_id, HoldingCheckpoint.last_transaction_id,
+                       HoldingCheckpoint.as_of_date, HoldingCheckpoint.quantity, HoldingCheckpoint.cost_value,
+                       HoldingCheckpoint.realised_pnl)
+                .join(cursor, (HoldingCheckpoint.portfolio_id == cursor.c.portfolio_id)
+                      & (HoldingCheckpoint.last_transaction_id == cursor.c.last_id))
+                .order_by(HoldingCheckpoint.portfolio_id, HoldingCheckpoint.stock_id)
+            ).all()
+            trades = (
+                trades.outerjoin(cursor, cursor.c.portfolio_id == Transaction.portfolio_id)
+                .where(Transaction.id > func.coalesce(cursor.c.last_id, 0))
+            )
+        return states, session.execute(trades).all()
+
+    @staticmethod
+    def _compute(states: list, trades: list) -> LedgerPositions:
+        # Checkpoint seeds reuse the price and fees columns for their cost value and realised P&L
+        seeds = [(state.last_transaction_id, state.portfolio_id, state.stock_id, _OPEN, state.as_of_date,
+                  state.quantity, state.cost_value, state.realised_pnl) for state in states]
+        rows = seeds + [tuple(trade) for trade in trades]
+        ids, portfolios, stocks, kinds, dates, quantity, price, fees = (
+            np.array(column, dtype=dtype) for column, dtype in zip(
+                zip(*rows) if rows else ((),) * 8,
+                (np.int64, np.int64, np.int64, object, 'datetime64[us]', float, float, float),
+            )
+        )
+        # Seeds first, then trades in (date, id) order within each (portfolio, stock)
+        order = np.lexsort((np.arange(ids.size), stocks, portfolios))
+        ids, portfolios, stocks, kinds, dates, quantity, price, fees = (
+            column[order] for column in (ids, portfolios, stocks, kinds, dates, quantity, price, fees)
+        )
+        is_open, is_buy, is_sell, is_split = (kinds == kind for kind in (_OPEN, 'BUY', 'SELL', 'STOCK_SPLIT'))
+
+        group_start = np.r_[True, (portfolios[1:] != portfolios[:-1]) | (stocks[1:] != stocks[:-1])] if ids.size else np.zeros(0, bool)
+        delta = np.where(is_open | is_buy | is_split, quantity, np.where(is_sell, -quantity, 0.0))
+        held = _segment_cumsum(delta, group_start)
+        held_before = held - delta
+
+        # Cost follows cost_t = ratio_t * cost_{t-1} + added_t, where a sell scales cost by the
+        # fraction of shares kept; a full close starts a new lot
+        closed = is_sell & (held <= 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(is_sell & ~closed, held / held_before, 1.0)
+        added = np.where(is_buy, quantity * price, 0.0) + np.where(is_buy | is_split, fees, 0.0) + np.where(is_open, price, 0.0)
+        lot_start = group_start | np.r_[False, closed[:-1]]
+        cost = np.where(closed, 0.0, _lot_cost(ratio, added, lot_start))
+
+        cost_before = np.r_[0.0, cost[:-1]] if ids.size else cost
+        cost_before = np.where(group_start, 0.0, cost_before)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average_before = np.where(held_before > 0, cost_before / held_before, 0.0)
+        realised = np.where(
+            is_sell, quantity * price - fees - np.minimum(quantity, np.maximum(held_before, 0.0)) * average_before,
+            np.where(is_open, fees, 0.0),
+        )
+
+        starts = np.flatnonzero(group_start)
+        ends = np.r_[starts[1:] - 1, ids.size - 1] if starts.size else starts
+        group_ids = np.cumsum(group_start) - 1
+        realised_total = np.bincount(group_ids, weights=realised, minlength=starts.size)
+        last_ids = np.maximum.reduceat(ids, starts) if starts.size else ids
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average_cost = np.where(held[ends] > 0, cost[ends] / held[ends], np.nan)
+
+        cursors: Dict[int, int] = {}
+        for portfolio_id, last_id in zip(portfolios[starts].tolist(), last_ids.tolist()):
+            cursors[portfolio_id] = max(last_id, cursors.get(portfolio_id, 0))
+        new_trades = dict.fromkeys(cursors, 0)
+        for portfolio_id, count in zip(*np.unique(portfolios[~is_open], return_counts=True)):
+            new_trades[int(portfolio_id)] = int(count)
+
+        return LedgerPositions(
+            portfolios[starts], stocks[starts], held[ends], cost[ends], average_cost,
+            realised_total, dates[ends].astype('datetime64[us]').astype(object) if starts.size else dates,
+            cursors, new_trades,
+        )
@@ -0,0 +1,135 @@
+# app/services/valuations/mark_to_market.py
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.dao.models import HistoricalPrice, Holding, UserPortfolio
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, chunked, select_in
+from app.services.price_store import PriceStore
+
+
+@dataclass
+class PriceSnapshot:
+    """Latest close per stock as aligned arrays sorted by stock id."""
+    stock_ids: np.ndarray
+    closes: np.ndarray
+    dates: np.ndarray
+
+    @classmethod
+    def from_database(cls, session: Session, stock_ids: Optional[Iterable[int]] = None) -> 'PriceSnapshot':
+        """Latest bar per stock in one grouped query (one per MAX_BIND_PARAMS stocks when `stock_ids` is given)."""
+        if stock_ids is None:
+            rows = session.execute(cls._latest_bars()).all()
+        else:
+            # Chunks of sorted ids keep the rows sorted by stock id
+            rows = [row for chunk in chunked(sorted(set(stock_ids)), MAX_BIND_PARAMS)
+                    for row in session.execute(cls._latest_bars(chunk))]
+        ids, closes, dates = zip(*rows) if rows else ((), (), ())
+        return cls(np.array(ids, dtype=np.int64), np.array(closes, dtype=float), np.array(dates, dtype='datetime64[D]'))
+
+    @staticmethod
+    def _latest_bars(stock_ids: Optional[Iterable[int]] = None):
+        latest = select(HistoricalPrice.stock_id, func.max(HistoricalPrice.date).label('date')).group_by(HistoricalPrice.stock_id)
+        if stock_ids is not None:
+            latest = latest.where(HistoricalPrice.stock_id.in_(list(stock_ids)))
+        latest = latest.subquery()
+        return (
+            select(HistoricalPrice.stock_id, HistoricalPrice.close_price, HistoricalPrice.date)
+            .join(latest, (HistoricalPrice.stock_id == latest.c.stock_id) & (HistoricalPrice.date == latest.c.date))
+            .order_by(HistoricalPrice.stock_id)
+        )
+
+    @classmethod
+    def from_store(cls, store: PriceStore) -> 'PriceSnapshot':
+        """Last bar of every stock in the memory-mapped PriceStore, without touching the database."""
+        return cls(*store.latest())
+
+    def lookup(self, stock_ids: np.ndarray) -> np.ndarray:
+        """Close for each id in `stock_ids`; NaN where the stock has no price."""
+        if not self.stock_ids.size:
+            return np.full(stock_ids.shape, np.nan)
+        positions = np.clip(np.searchsorted(self.stock_ids, stock_ids), 0, self.stock_ids.size - 1)
+        found = self.stock_ids[positions] == stock_ids
+        return np.where(found, self.closes[positions], np.nan)
+
+
+@dataclass
+class PortfolioMarks:
+    """Per-holding arrays plus per-portfolio totals from one revaluation pass."""
+    holding_ids: np.ndarray
+    portfolio_ids: np.ndarray
+    user_ids: np.ndarray
+    stock_ids: np.ndarray
+    quantity: np.ndarray
+    price: np.ndarray
+    market_value: np.ndarray
+    cost_value: np.ndarray
+    unrealised_pnl: np.ndarray
+    weight: np.ndarray
+    portfolios: np.ndarray
+    portfolio_market_value: np.ndarray
+    portfolio_cost_value: np.ndarray
+    portfolio_unrealised_pnl: np.ndarray
+
+    def portfolio_summary(self) -> dict:
+        """portfolio_id -> totals, for the UI layer."""
+        return {
+            int(portfolio_id): {
+                'market_value': float(market_value),
+                'cost_value': float(cost_value),
+                'unrealised_pnl': float(pnl),
+            }
+            for portfolio_id, market_value, cost_value, pnl in zip(
+                self.portfolios, self.portfolio_market_value, self.portfolio_cost_value, self.portfolio_unrealised_pnl
+            )
+        }
+
+
+class MarkToMarketEngine:
+    """
+    Values every holding of every portfolio in a single batched pass:
+    one query for holdings, one for latest closes (or a PriceSnapshot), then NumPy arithmetic.
+    Holdings without a price are carried at NaN and excluded from portfolio totals and weights.
+    """
+    def __init__(self, snapshot: Optional[PriceSnapshot] = None):
+        self.snapshot = snapshot
+
+    def revalue(self, session: Session, portfolio_ids: Optional[Iterable[int]] = None) -> PortfolioMarks:
+        stmt = (
+            select(Holding.id, Holding.portfolio_id, UserPortfolio.user_id, Holding.stock_id,
+                   Holding.quantity, Holding.average_cost_basis)
+            .join(UserPortfolio, UserPortfolio.id == Holding.portfolio_id)
+            .order_by(Holding.portfolio_id, Holding.id)
+        )
+        if portfolio_ids is None:
+            rows = session.execute(stmt).all()
+        else:
+            # Chunks of sorted ids keep the rows in portfolio order
+            rows = select_in(session, stmt, [Holding.portfolio_id], [(portfolio_id,) for portfolio_id in sorted(set(portfolio_ids))])
+        holding_ids, portfolios, users, stock_ids, quantity, cost_basis = (
+            np.array(column, dtype=dtype) for column, dtype in zip(
+                zip(*rows) if rows else ((),) * 6,
+                (np.int64, np.int64, np.int64, np.int64, float, float),
+            )
+        )
+
+        snapshot = self.snapshot or PriceSnapshot.from_database(session, np.unique(stock_ids).tolist())
+        price = snapshot.lookup(stock_ids)
+        market_value = quantity * price
+        cost_value = quantity * cost_basis
+        unrealised_pnl = market_value - cost_value
+
+        unique_portfolios, inverse = np.unique(portfolios, return_inverse=True)
+        priced = ~np.isnan(market_value)
+        totals = np.bincount(inverse, weights=np.where(priced, market_value, 0.0), minlength=unique_portfolios.size)
+        cost_totals = np.bincount(inverse, weights=np.where(priced, cost_value, 0.0), minlength=unique_portfolios.size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(priced, market_value / totals[inverse], np.nan)
+
+        return PortfolioMarks(
+            holding_ids, portfolios, users, stock_ids, quantity, price, market_value, cost_value,
+            unrealised_pnl, weight, unique_portfolios, totals, cost_totals, totals - cost_totals,
+        )
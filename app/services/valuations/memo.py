@@ -0,0 +1,114 @@
+# app/services/valuations/memo.py
+import hashlib
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Dict, Mapping, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.dao.models import ValuationMemoEntry
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, BulkLoader, chunked, select_in
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def normalise(value: Any) -> Any:
+    """
+    Canonical form of JSON-like inputs: mappings sorted, numbers compared as floats
+    (1 == 1.0, -0.0 == 0.0) and dates written in ISO format.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Mapping):
+        return {str(key): normalise(item) for key, item in sorted(value.items(), key=lambda entry: str(entry[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalise(item) for item in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        value = float(value)
+        return repr(value) if not math.isfinite(value) else value + 0.0
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy scalars
+        return normalise(value.item())
+    return str(value)
+
+
+def memo_key(method: str, parameters: Any = None, assumptions: Any = None, fingerprint: Any = None) -> str:
+    """
+    SHA-256 of the method, normalised parameters and assumptions, and the input data fingerprint.
+    `parameters` and `assumptions` may be given as JSON text, as stored on ValuationModel.
+    """
+    parameters, assumptions = (json.loads(value) if isinstance(value, str) else value for value in (parameters, assumptions))
+    payload = json.dumps([method, normalise(parameters), normalise(assumptions), normalise(fingerprint)],
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ValuationMemo:
+    """
+    Memoises valuation results in the valuation_memo table. Engines compute a `memo_key()` per
+    stock before valuing; `lookup()` returns the existing valuation ids of keys seen before, so
+    only the other stocks are valued and `store()`d. The table keeps the `max_entries` most
+    recently used keys.
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def lookup(self, session: Session, keys: Mapping[int, str]) -> Dict[int, int]:
+        """Valuation id per stock whose key (stock id -> memo key) is memoised."""
+        if not keys:
+            return {}
+        found = dict(select_in(
+            session, select(ValuationMemoEntry.key, ValuationMemoEntry.valuation_id),
+            [ValuationMemoEntry.key], [(key,) for key in set(keys.values())],
+        ))
+        for key_chunk in chunked(sorted(found), MAX_BIND_PARAMS):
+            session.execute(
+                update(ValuationMemoEntry).where(ValuationMemoEntry.key.in_(key_chunk)).values(last_used_at=datetime.utcnow())
+            )
+        cached = {stock_id: found[key] for stock_id, key in keys.items() if key in found}
+        self.hits += len(cached)
+        self.misses += len(keys) - len(cached)
+        return cached
+
+    def store(self, session: Session, method: str, entries: Mapping[int, Tuple[str, int]]) -> int:
+        """Record new results (stock id -> (memo key, valuation id)), then evict beyond max_entries."""
+        now = datetime.utcnow()
+        rows = [
+            {'key': key, 'valuation_id': valuation_id, 'stock_id': stock_id, 'valuation_method': method,
+             'created_at': now, 'last_used_at': now}
+            for stock_id, (key, valuation_id) in entries.items()
+        ]
+        written = BulkLoader(ValuationMemoEntry).load_rows(rows, session)
+        self.prune(session)
+        return written
+
+    def prune(self, session: Session) -> int:
+        """Delete the least recently used entries beyond max_entries."""
+        stale = (
+            select(ValuationMemoEntry.key)
+            .order_by(ValuationMemoEntry.last_used_at.desc(), ValuationMemoEntry.created_at.desc())
+            .offset(self.max_entries)
+        )
+        removed = session.execute(delete(ValuationMemoEntry).where(ValuationMemoEntry.key.in_(stale))).rowcount
+        self.evicted += removed
+        return removed
+
+    def size(self, session: Session) -> int:
+        return session.scalar(select(func.count()).select_from(ValuationMemoEntry))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evicted': self.evicted,
+        }
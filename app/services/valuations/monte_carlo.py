@@ -0,0 +1,248 @@
+# app/services/valuations/monte_carlo.py
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.dao.models import ValuationModel
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, BulkLoader, chunked
+from app.services.valuations.dcf import DCF_METHOD, DCFParameters
+from app.services.valuations.memo import ValuationMemo, memo_key
+
+MONTE_CARLO_METHOD = 'DCF_MONTE_CARLO'
+# Columns of the per-stock input matrix shared with the workers
+INPUT_FIELDS = ('stock_id', 'source_id', 'revenue', 'shares_outstanding', 'growth_mean', 'growth_std',
+                'margin_mean', 'margin_std', 'discount_mean', 'discount_std', 'terminal_growth', 'projection_years')
+_FIELD = {name: position for position, name in enumerate(INPUT_FIELDS)}
+# Sampled discount rates are kept at least this far above terminal growth
+MIN_DISCOUNT_SPREAD = 0.01
+_SUMMARY_STATS = 3  # median, mean, std after the percentiles
+
+
+@dataclass(frozen=True)
+class MonteCarloParameters:
+    """Simulation settings; stored as the `parameters` JSON of the written rows."""
+    scenarios: int = 100_000
+    percentiles: Tuple[float, ...] = (5.0, 25.0, 50.0, 75.0, 95.0)
+    seed: int = 0
+    # Default spreads when the DCF assumptions carry no `distributions` entry
+    growth_std: float = 0.03
+    margin_std: float = 0.02
+    discount_std: float = 0.01
+    block_size: int = 50_000  # scenarios simulated at once, bounding peak memory per worker
+
+
+@dataclass
+class MonteCarloResult:
+    """Per-stock value-per-share distribution summaries aligned with `stock_ids`."""
+    stock_ids: np.ndarray
+    source_ids: np.ndarray
+    percentiles: np.ndarray  # stocks x len(parameters.percentiles)
+    median: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    inputs: np.ndarray
+    parameters: MonteCarloParameters
+
+    def rows(self, valuation_date: Optional[datetime] = None) -> List[dict]:
+        valuation_date = valuation_date or datetime.utcnow()
+        parameters = json.dumps(asdict(self.parameters), sort_keys=True)
+        labels = [f'p{percentile:g}' for percentile in self.parameters.percentiles]
+        rows = []
+        for stock_id, source_id, percentiles, median, mean, std, inputs in zip(
+            self.stock_ids.tolist(), self.source_ids.tolist(), self.percentiles.tolist(),
+            self.median.tolist(), self.mean.tolist(), self.std.tolist(), self.inputs,
+        ):
+            rows.append({
+                'stock_id': stock_id,
+                'valuation_date': valuation_date,
+                'valuation_method': MONTE_CARLO_METHOD,
+                'valuation_result': median,
+                'assumptions': json.dumps({
+                    'source_valuation_id': source_id,
+                    'distributions': {
+                        name: {'mean': float(inputs[_FIELD[f'{name}_mean']]), 'std': float(inputs[_FIELD[f'{name}_std']])}
+                        for name in ('growth', 'margin', 'discount')
+                    },
+                    'percentiles': dict(zip(labels, percentiles)),
+                    'mean': mean,
+                    'std': std,
+                }, sort_keys=True),
+                'parameters': parameters,
+            })
+        return rows
+
+
+def simulate_stock(inputs: np.ndarray, scenarios: int, rng: np.random.Generator, block_size: int) -> np.ndarray:
+    """Value per share under `scenarios` sampled (growth, margin, discount rate) triples for one input row."""
+    years = int(inputs[_FIELD['projection_years']])
+    terminal_growth = inputs[_FIELD['terminal_growth']]
+    fade = np.arange(1, years + 1) / years
+    exponents = np.arange(1, years + 1)
+    values = np.empty(scenarios)
+    for start in range(0, scenarios, block_size):
+        size = min(block_size, scenarios - start)
+        growth = rng.normal(inputs[_FIELD['growth_mean']], inputs[_FIELD['growth_std']], size)
+        margin = rng.normal(inputs[_FIELD['margin_mean']], inputs[_FIELD['margin_std']], size)
+        discount = np.maximum(rng.normal(inputs[_FIELD['discount_mean']], inputs[_FIELD['discount_std']], size),
+                              terminal_growth + MIN_DISCOUNT_SPREAD)
+
+        path = growth[:, None] + (terminal_growth - growth[:, None]) * fade[None, :]
+        cash_flows = inputs[_FIELD['revenue']] * margin[:, None] * np.cumprod(1.0 + path, axis=1)
+        factors = (1.0 + discount[:, None]) ** -exponents[None, :]
+        terminal = cash_flows[:, -1] * (1.0 + terminal_growth) / (discount - terminal_growth)
+        values[start:start + size] = (
+            np.einsum('ij,ij->i', cash_flows, factors) + terminal * factors[:, -1]
+        ) / inputs[_FIELD['shares_outstanding']]
+    return values
+
+
+def _summarise(inputs: np.ndarray, parameters: MonteCarloParameters) -> np.ndarray:
+    """percentiles, median, mean and std per input row; each stock has its own stream seeded by (seed, stock_id)."""
+    summary = np.empty((inputs.shape[0], len(parameters.percentiles) + _SUMMARY_STATS))
+    for row, stock_inputs in enumerate(inputs):
+        rng = np.random.default_rng([parameters.seed, int(stock_inputs[_FIELD['stock_id']])])
+        values = simulate_stock(stock_inputs, parameters.scenarios, rng, parameters.block_size)
+        summary[row, :-3] = np.percentile(values, parameters.percentiles)
+        summary[row, -3] = np.median(values)
+        summary[row, -2] = values.mean()
+        summary[row, -1] = values.std()
+    return summary
+
+
+def _summarise_shared(name: str, shape: Tuple[int, int], start: int, stop: int,
+                      parameters: MonteCarloParameters) -> Tuple[int, np.ndarray]:
+    """Worker entry point: read rows [start, stop) of the shared input matrix without copying it over a pipe."""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        inputs = np.ndarray(shape, dtype=np.float64, buffer=block.buf)[start:stop].copy()
+    finally:
+        block.close()
+    return start, _summarise(inputs, parameters)
+
+
+class MonteCarloEngine:
+    """
+    Monte Carlo extension of the DCF engine. Starts from each stock's latest DCF ValuationModel row,
+    samples growth, net margin and discount rate from normal distributions (the row's
+    `assumptions["distributions"]` when present, otherwise centred on the DCF point inputs),
+    and writes the value-per-share percentiles back as a new ValuationModel row.
+
+    Stocks are fanned out over a ProcessPoolExecutor; the input matrix lives in shared memory and
+    workers only receive row ranges. Each stock draws from its own generator seeded by
+    (seed, stock_id), so results do not depend on the worker count or chunking.
+    """
+    def __init__(self, parameters: Optional[MonteCarloParameters] = None, workers: Optional[int] = None,
+                 dcf_parameters: Optional[DCFParameters] = None):
+        self.parameters = parameters or MonteCarloParameters()
+        self.workers = workers or os.cpu_count() or 1
+        self.dcf_parameters = dcf_parameters or DCFParameters()
+
+    def inputs(self, session: Session, stock_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+        """One INPUT_FIELDS row per stock with a DCF valuation, from its latest DCF row."""
+        if stock_ids is None:
+            rows = session.execute(self._latest_dcf_rows()).all()
+        else:
+            # Chunks of sorted ids keep the rows sorted by stock id; the method filter takes one parameter
+            rows = [row for chunk in chunked(sorted(set(stock_ids)), MAX_BIND_PARAMS - 1)
+                    for row in session.execute(self._latest_dcf_rows(chunk))]
+
+        p, dcf = self.parameters, self.dcf_parameters
+        inputs = np.empty((len(rows), len(INPUT_FIELDS)))
+        for row, (valuation_id, stock_id, assumptions, parameters) in enumerate(rows):
+            assumptions = json.loads(assumptions or '{}')
+            parameters = json.loads(parameters or '{}')
+            distributions = assumptions.get('distributions', {})
+            revenue = assumptions['revenue']
+            defaults = {
+                'growth': (assumptions['growth'], p.growth_std),
+                'margin': (assumptions['base_cash_flow'] / revenue if revenue else 0.0, p.margin_std),
+                'discount': (parameters.get('discount_rate', dcf.discount_rate), p.discount_std),
+            }
+            values = {'stock_id': stock_id, 'source_id': valuation_id, 'revenue': revenue,
+                      'shares_outstanding': assumptions['shares_outstanding'],
+                      'terminal_growth': parameters.get('terminal_growth', dcf.terminal_growth),
+                      'projection_years': parameters.get('projection_years', dcf.projection_years)}
+            for name, (mean, std) in defaults.items():
+                values[f'{name}_mean'] = distributions.get(name, {}).get('mean', mean)
+                values[f'{name}_std'] = distributions.get(name, {}).get('std', std)
+            inputs[row] = [values[name] for name in INPUT_FIELDS]
+        return inputs
+
+    @staticmethod
+    def _latest_dcf_rows(stock_ids: Optional[Iterable[int]] = None):
+        latest = select(func.max(ValuationModel.id)).where(ValuationModel.valuation_method == DCF_METHOD)
+        if stock_ids is not None:
+            latest = latest.where(ValuationModel.stock_id.in_(list(stock_ids)))
+        latest = latest.group_by(ValuationModel.stock_id)
+        return (
+            select(ValuationModel.id, ValuationModel.stock_id, ValuationModel.assumptions, ValuationModel.parameters)
+            .where(ValuationModel.id.in_(latest))
+            .order_by(ValuationModel.stock_id)
+        )
+
+    def simulate(self, inputs: np.ndarray) -> MonteCarloResult:
+        if self.workers <= 1 or inputs.shape[0] <= 1:
+            summary = _summarise(inputs, self.parameters)
+        else:
+            summary = self._simulate_parallel(inputs)
+        return MonteCarloResult(
+            inputs[:, _FIELD['stock_id']].astype(np.int64), inputs[:, _FIELD['source_id']].astype(np.int64),
+            summary[:, :-3], summary[:, -3], summary[:, -2], summary[:, -1], inputs, self.parameters,
+        )
+
+    def run(self, session: Session, stock_ids: Optional[Iterable[int]] = None,
+            memo: Optional[ValuationMemo] = None) -> List[int]:
+        """
+        Simulate every stock with a DCF valuation and insert one ValuationModel row each; returns their ids ordered by stock id.
+        With `memo`, stocks whose simulation inputs and parameters match a memoised run reuse its row.
+        """
+        inputs = self.inputs(session, stock_ids)
+        keys, cached = {}, {}
+        if memo is not None:
+            parameters = asdict(self.parameters)
+            # The inputs are the fingerprint: a new DCF row with the same assumptions still hits
+            fingerprint_fields = [position for name, position in _FIELD.items() if name != 'source_id']
+            keys = {int(row[_FIELD['stock_id']]): memo_key(MONTE_CARLO_METHOD, parameters, None, row[fingerprint_fields].tolist())
+                    for row in inputs}
+            cached = memo.lookup(session, keys)
+            inputs = inputs[[int(stock_id) not in cached for stock_id in inputs[:, _FIELD['stock_id']]]]
+
+        ids = []
+        if inputs.shape[0]:
+            rows = self.simulate(inputs).rows()
+            # Appended results, like the DCF rows they are derived from
+            ids = BulkLoader(ValuationModel, versioning='skip').load_rows_returning(rows, session)
+
+        simulated = dict(zip(inputs[:, _FIELD['stock_id']].astype(np.int64).tolist(), ids))
+        if memo is not None:
+            memo.store(session, MONTE_CARLO_METHOD, {stock_id: (keys[stock_id], valuation_id) for stock_id, valuation_id in simulated.items()})
+            simulated.update(cached)
+        return [simulated[stock_id] for stock_id in sorted(simulated)]
+
+    def _simulate_parallel(self, inputs: np.ndarray) -> np.ndarray:
+        block = shared_memory.SharedMemory(create=True, size=inputs.nbytes)
+        try:
+            np.ndarray(inputs.shape, dtype=np.float64, buffer=block.buf)[:] = inputs
+            # Several chunks per worker so uneven chunks do not leave cores idle
+            bounds = np.linspace(0, inputs.shape[0], min(inputs.shape[0], self.workers * 4) + 1).astype(int)
+            summary = np.empty((inputs.shape[0], len(self.parameters.percentiles) + _SUMMARY_STATS))
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(bounds) - 1)) as pool:
+                futures = [
+                    pool.submit(_summarise_shared, block.name, inputs.shape, int(start), int(stop), self.parameters)
+                    for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+                ]
+                for future in futures:
+                    start, chunk = future.result()
+                    summary[start:start + chunk.shape[0]] = chunk
+            return summary
+        finally:
+            block.close()
+            block.unlink()
@@ -0,0 +1,237 @@
+# app/services/valuations/relative_valuation.py
+from datetime import date, datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, inspect, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.dao.models import HistoricalMetrics, SectorMetricAggregate, Stock
+from app.dao.models.stock_sector import stock_sector_association
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, BulkLoader, chunked
+from app.services.utils import FlushCollector
+
+SECTOR_METRICS = (
+    'price_to_earnings', 'price_to_book', 'price_to_sales', 'price_to_cashflow', 'price_to_earnings_growth',
+    'dividend_yield', 'payout_ratio', 'enterprise_value_to_revenue', 'return_on_equity', 'return_on_investment',
+)
+PERCENTILES = {'p10': 0.10, 'p25': 0.25, 'median': 0.50, 'p75': 0.75, 'p90': 0.90}
+
+
+def quarter_end(dates) -> np.ndarray:
+    """Last day of the calendar quarter of each date."""
+    months = np.asarray(dates, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    next_quarter = (months - months % 3 + 3).astype('datetime64[M]')
+    return next_quarter.astype('datetime64[D]') - np.timedelta64(1, 'D')
+
+
+def group_percentiles(groups: np.ndarray, values: np.ndarray, size: int, quantiles: Iterable[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Linear-interpolated quantiles of `values` per group id in [0, size), ignoring NaN.
+    Returns (counts, size x len(quantiles) matrix); groups without values are NaN.
+    """
+    present = ~np.isnan(values)
+    groups, values = groups[present], values[present]
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    counts = np.bincount(groups, minlength=size)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    quantiles = np.asarray(list(quantiles))
+    result = np.full((size, quantiles.size), np.nan)
+    has_values = counts > 0
+    if not has_values.any():
+        return counts, result
+    position = starts[has_values, None] + quantiles[None, :] * (counts[has_values, None] - 1)
+    lower, upper = np.floor(position).astype(np.int64), np.ceil(position).astype(np.int64)
+    result[has_values] = values[lower] + (values[upper] - values[lower]) * (position - lower)
+    return counts, result
+
+
+class PeerComparison(NamedTuple):
+    sector_id: int
+    metric: str
+    value: Optional[float]
+    count: int
+    median: Optional[float]
+    p25: Optional[float]
+    p75: Optional[float]
+    premium: Optional[float]  # value / sector median - 1
+
+
+class SectorAggregates:
+    """
+    Maintains the sector_metric_aggregate table: per sector, per quarter distributions of the
+    HistoricalMetrics ratios. Flushes record which (stock, quarter) pairs and sector memberships
+    changed, kept once the session commits; `refresh()` recomputes only the affected (sector, quarter) groups.
+    Core bulk writes to historical_metric must call `mark_dirty()`.
+    """
+    def __init__(self):
+        self._stock_quarters: Set[Tuple[int, date]] = set()
+        self._sectors: Set[int] = set()
+        self._changes = FlushCollector(self._collect, self._apply, factory=lambda: (set(), set()))
+
+    def mark_dirty(self, stock_ids: Iterable[int] = (), dates: Iterable = (), sector_ids: Iterable[int] = ()) -> None:
+        """Flag metrics of `stock_ids` on `dates` (pairwise) and whole `sector_ids` for the next refresh."""
+        stock_ids, dates = list(stock_ids), list(dates)
+        self._stock_quarters.update(zip(stock_ids, quarter_end(dates).tolist()))
+        self._sectors.update(sector_ids)
+
+    def rebuild(self, session: Session) -> int:
+        """Recompute every sector and quarter."""
+        self._sectors.update(session.scalars(select(stock_sector_association.c.sector_id).distinct()))
+        self._sectors.update(session.scalars(select(SectorMetricAggregate.sector_id).distinct()))
+        return self.refresh(session)
+
+    def refresh(self, session: Session) -> int:
+        """Recompute the dirty groups (including ones flushed but not yet committed by `session`). Returns rows written."""
+        pending = self._changes.pending(session)
+        stock_quarters = self._stock_quarters | pending[0]
+        whole_sectors = self._sectors | pending[1]
+        if not stock_quarters and not whole_sectors:
+            return 0
+
+        memberships = self._sectors_of(session, {stock_id for stock_id, _ in stock_quarters})
+        pairs = {(sector_id, quarter) for stock_id, quarter in stock_quarters for sector_id in memberships.get(stock_id, ())}
+        pairs = {(sector_id, quarter) for sector_id, quarter in pairs if sector_id not in whole_sectors}
+
+        rows = self._aggregate(session, {sector_id for sector_id, _ in pairs} | whole_sectors, pairs, whole_sectors)
+        table = SectorMetricAggregate.__table__
+        for sector_chunk in chunked(sorted(whole_sectors), MAX_BIND_PARAMS):
+            session.execute(delete(table).where(table.c.sector_id.in_(sector_chunk)))
+        for pair_chunk in chunked(sorted(pairs), MAX_BIND_PARAMS // 2):
+            session.execute(delete(table).where(tuple_(table.c.sector_id, table.c.quarter).in_(pair_chunk)))
+        written = BulkLoader(SectorMetricAggregate).load_rows(rows, session)
+
+        self._stock_quarters -= stock_quarters
+        self._sectors -= whole_sectors
+        self._changes.pop(session)
+        return written
+
+    def compare(self, session: Session, stock_id: int, quarter: Optional[date] = None) -> List[PeerComparison]:
+        """The stock's latest metrics (within `quarter` when given) against its sectors' aggregates for that quarter."""
+        latest = select(HistoricalMetrics).where(HistoricalMetrics.stock_id == stock_id)
+        if quarter is not None:
+            last_day = quarter_end([quarter])[0]
+            first_day = (last_day.astype('datetime64[M]') - 2).astype('datetime64[D]')
+            latest = latest.where(HistoricalMetrics.date.between(first_day.item(), last_day.item()))
+        metrics = session.scalars(latest.order_by(HistoricalMetrics.date.desc()).limit(1)).first()
+        if metrics is None:
+            return []
+        quarter = quarter_end([metrics.date])[0].item()
+
+        aggregates = session.scalars(
+            select(SectorMetricAggregate)
+            .join(stock_sector_association, stock_sector_association.c.sector_id == SectorMetricAggregate.sector_id)
+            .where(stock_sector_association.c.stock_id == stock_id, SectorMetricAggregate.quarter == quarter)
+            .order_by(SectorMetricAggregate.sector_id, SectorMetricAggregate.metric)
+        ).all()
+        comparisons = []
+        for aggregate in aggregates:
+            value = getattr(metrics, aggregate.metric)
+            premium = value / aggregate.median - 1.0 if value is not None and aggregate.median else None
+            comparisons.append(PeerComparison(aggregate.sector_id, aggregate.metric, value, aggregate.count,
+                                              aggregate.median, aggregate.p25, aggregate.p75, premium))
+        return comparisons
+
+    @staticmethod
+    def _sectors_of(session: Session, stock_ids: Set[int]) -> Dict[int, List[int]]:
+        memberships: Dict[int, List[int]] = {}
+        for stock_chunk in chunked(sorted(stock_ids), MAX_BIND_PARAMS):
+            for stock_id, sector_id in session.execute(
+                select(stock_sector_association.c.stock_id, stock_sector_association.c.sector_id)
+                .where(stock_sector_association.c.stock_id.in_(stock_chunk))
+            ):
+                memberships.setdefault(stock_id, []).append(sector_id)
+        return memberships
+
+    @staticmethod
+    def _aggregate(session: Session, sector_ids: Set[int], pairs: Set[Tuple[int, date]], whole_sectors: Set[int]) -> List[dict]:
+        columns = [getattr(HistoricalMetrics, metric) for metric in SECTOR_METRICS]
+        stmt = (
+            select(stock_sector_association.c.sector_id, HistoricalMetrics.stock_id, HistoricalMetrics.date, *columns)
+            .join(stock_sector_association, stock_sector_association.c.stock_id == HistoricalMetrics.stock_id)
+            .where(HistoricalMetrics.date.is_not(None))
+        )
+        loaded = []
+        for sector_chunk in chunked(sorted(whole_sectors), MAX_BIND_PARAMS):
+            loaded.extend(session.execute(stmt.where(stock_sector_association.c.sector_id.in_(sector_chunk))))
+        # Dirty groups read only their quarter's rows: one date range per dirty quarter
+        quarters: Dict[date, List[int]] = {}
+        for sector_id, quarter in pairs:
+            quarters.setdefault(quarter, []).append(sector_id)
+        for quarter, quarter_sectors in sorted(quarters.items()):
+            first_day = (np.datetime64(quarter, 'M') - 2).astype('datetime64[D]').item()
+            in_quarter = stmt.where(HistoricalMetrics.date.between(first_day, quarter))
+            # The quarter's date bounds take two parameters
+            for sector_chunk in chunked(sorted(quarter_sectors), MAX_BIND_PARAMS - 2):
+                loaded.extend(session.execute(in_quarter.where(stock_sector_association.c.sector_id.in_(sector_chunk))))
+        if not loaded:
+            return []
+        sectors, stocks, dates, *values = (np.array(column) for column in zip(*loaded))
+        sectors, stocks = sectors.astype(np.int64), stocks.astype(np.int64)
+        dates = dates.astype('datetime64[D]')
+        quarters = quarter_end(dates)
+
+        # One observation per member stock and quarter: its latest row
+        order = np.lexsort((dates, stocks, quarters, sectors))
+        sectors, stocks, quarters = sectors[order], stocks[order], quarters[order]
+        last = np.r_[(sectors[1:] != sectors[:-1]) | (quarters[1:] != quarters[:-1]) | (stocks[1:] != stocks[:-1]), True]
+        keep = order[last]
+        sectors, quarters = sectors[last], quarters[last]
+
+        group_start = np.r_[True, (sectors[1:] != sectors[:-1]) | (quarters[1:] != quarters[:-1])]
+        groups = np.cumsum(group_start) - 1
+        size = int(group_start.sum())
+        group_sectors, group_quarters = sectors[group_start].tolist(), quarters[group_start].tolist()
+
+        updated_at = datetime.utcnow()
+        rows = []
+        for metric, column in zip(SECTOR_METRICS, values):
+            column = np.array(column[keep], dtype=float)
+            counts, quantiles = group_percentiles(groups, column, size, PERCENTILES.values())
+            present = ~np.isnan(column)
+            sums = np.bincount(groups[present], weights=column[present], minlength=size)
+            minimum = np.full(size, np.inf)
+            maximum = np.full(size, -np.inf)
+            np.minimum.at(minimum, groups[present], column[present])
+            np.maximum.at(maximum, groups[present], column[present])
+            for group in np.flatnonzero(counts).tolist():
+                row = {
+                    'sector_id': group_sectors[group], 'quarter': group_quarters[group], 'metric': metric,
+                    'count': int(counts[group]), 'mean': sums[group] / counts[group],
+                    'min': minimum[group], 'max': maximum[group], 'updated_at': updated_at,
+                }
+                row.update(zip(PERCENTILES, quantiles[group].tolist()))
+                rows.append(row)
+        return rows
+
+    def close(self) -> None:
+        """Stop following session writes."""
+        self._changes.close()
+
+    def _collect(self, session: Session) -> None:
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, HistoricalMetrics):
+                # Old and new values both matter when a row moves to another stock or quarter
+                attributes = inspect(obj).attrs
+                stock_ids = {stock_id for stock_id in attributes.stock_id.history.sum() if stock_id is not None}
+                dates = [day for day in attributes.date.history.sum() if day is not None]
+                if stock_ids and dates:
+                    stock_quarters, _ = self._changes.pending(session)
+                    stock_quarters.update((stock_id, quarter) for stock_id in stock_ids for quarter in quarter_end(dates).tolist())
+            elif isinstance(obj, Stock):
+                added, unchanged, removed = inspect(obj).attrs.sectors.history
+                # A deleted stock leaves every sector it belonged to
+                changed = [*added, *removed, *(unchanged if obj in session.deleted else ())]
+                if changed:
+                    _, sectors = self._changes.pending(session)
+                    sectors.update(sector.id for sector in changed if sector.id is not None)
+
+    def _apply(self, pending: Tuple[Set, Set]) -> None:
+        stock_quarters, sectors = pending
+        self._stock_quarters |= stock_quarters
+        self._sectors |= sectors
+
+
+# Process-wide instance
+sector_aggregates = SectorAggregates()
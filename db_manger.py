@@ -1,3 +1,13 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.dao.metadata_cache import reflect_metadata
+from app.dao.models.base import Base
+from config import Config
+
 
 class DBInitializer:
     def __init__(self, engine):
@@ -19,13 +29,12 @@ class DatabaseManager:
         if not self._database_initialized():
             initializer = initializer or DBInitializer(self.engine)
             initializer.initialize()
-        self.metadata = MetaData(bind =self.engine)
         self.SessionLocal = sessionmaker(bind=self.engine)
         self._reflect_metadata()
         
     def _reflect_metadata(self) -> None:
-        """Reflect the database metadata."""
-        self.metadata.reflect(bind=self.engine)
+        """Reflect the database metadata (from the on-disk cache while the schema is unchanged)."""
+        self.metadata = reflect_metadata(self.engine)
 
     def _database_initialized(self) -> bool:
         # Implement logic to check if database (or specific tables) exists.
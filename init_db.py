@@ -9,7 +9,7 @@ engine = create_engine(Config.DB_TEST)
 SessionLocal = sessionmaker(bind=engine)
 
 # Just importing these will make sure the models are loaded and associated with Base.
-from app.dao.models import User, Configuration, Dividend, Document, HistoricalMetrics, HistoricalPrice, Holding, Stock, Sector, ValuationModel, UserPortfolio, Transaction
+from app.dao.models import User, Configuration, Dividend, Document, HistoricalMetrics, HistoricalPrice, Holding, HoldingCheckpoint, PriceAdjustment, PriceWatermark, SectorMetricAggregate, Stock, Sector, StockSplit, ValuationModel, ValuationMemoEntry, UserPortfolio, Transaction
 
 configure_mappers()
 
@@ -87,6 +87,8 @@ class UserFromDB(UserDataTransfer):
 
 
 # A utility to optionally provide a session or create a new one
+# Design copy for the models above; the maintained provide_session and BaseRepository
+# live in app/dao/repository/base_repository.py
 @contextmanager
 def provide_session(external_session=None) -> Iterator[Session]:
     if external_session:
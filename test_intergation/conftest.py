@@ -0,0 +1,2 @@
+# test_intergation/conftest.py
+from test_intergation.fixures import memory_engine, memory_session  # noqa: F401
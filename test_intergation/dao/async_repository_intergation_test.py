@@ -0,0 +1,37 @@
+# test_intergation/dao/async_repository_intergation_test.py
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import configure_mappers
+
+from app.dao.models import Stock
+from app.dao.models.base import BaseModel
+from app.dao.repository.async_base_repository import AsyncBaseRepository
+from app.services.session_manager import AsyncDatabaseManager, async_database_url
+
+
+def test_async_database_url_swaps_driver():
+    assert async_database_url("sqlite:///data/db.sqlite3") == "sqlite+aiosqlite:///data/db.sqlite3"
+    assert async_database_url("postgresql://user:pw@localhost:5432/db") == "postgresql+asyncpg://user:pw@localhost:5432/db"
+
+
+def test_concurrent_retrieval_uses_independent_sessions(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'async.sqlite3'}"
+    configure_mappers()
+    BaseModel.metadata.create_all(bind=create_engine(database_url))
+
+    async def scenario():
+        db_manager = AsyncDatabaseManager(database_url)
+        repository = AsyncBaseRepository(Stock, db_manager)
+        created = await asyncio.gather(*(repository.create_entity(Stock(ticker_symbol=f"T{i}")) for i in range(5)))
+        ids = [stock_id for status, stock_id in created if status]
+        stocks = await asyncio.gather(*(repository.retrieve_entity_by_id(stock_id) for stock_id in ids))
+        deleted = await repository.delete_entity_by_id(ids[0])
+        remaining = await repository.retrieve_entities_by_conditions({})
+        await db_manager.dispose()
+        return stocks, deleted, remaining
+
+    stocks, deleted, remaining = asyncio.run(scenario())
+    assert sorted(stock.ticker_symbol for stock in stocks) == [f"T{i}" for i in range(5)]
+    assert deleted is True
+    assert len(remaining) == 4
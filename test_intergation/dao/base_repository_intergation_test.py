@@ -0,0 +1,37 @@
+# test_intergation/dao/base_repository_intergation_test.py
+import subprocess
+import sys
+
+from app.dao.models import Stock
+from app.dao.repository.base_repository import BaseRepository
+
+
+def test_bulk_create_upsert_and_retrieve_many(memory_session):
+    repository = BaseRepository(Stock)
+
+    status, ids = repository.bulk_create([Stock(ticker_symbol=f"T{i}") for i in range(1500)], memory_session)
+    assert status is True
+    assert len(set(ids)) == 1500
+
+    status, upserted = repository.bulk_upsert(
+        [{"ticker_symbol": "T3", "company_name": "Three"}, {"ticker_symbol": "NEW", "company_name": "New"}],
+        conflict_keys=["ticker_symbol"],
+        session=memory_session,
+    )
+    assert status is True
+    assert upserted[0] == ids[3]
+    assert upserted[1] not in ids
+
+    # More ids than SQLite allows in a single IN-list
+    stocks = repository.retrieve_many(ids + upserted[1:], memory_session)
+    assert len(stocks) == 1501
+    memory_session.expire_all()
+    assert {stock.company_name for stock in stocks if stock.ticker_symbol in ("T3", "NEW")} == {"Three", "New"}
+
+
+def test_importing_repositories_creates_no_engine():
+    probe = (
+        "import app.dao.repository.document_repository, app.dao.repository.base_repository as base; "
+        "assert base.get_engine.cache_info().currsize == 0"
+    )
+    subprocess.run([sys.executable, "-c", probe], check=True)
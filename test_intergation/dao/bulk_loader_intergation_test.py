@@ -0,0 +1,52 @@
+# test_intergation/dao/bulk_loader_intergation_test.py
+from datetime import date
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy_continuum import version_class
+
+from app.dao.models import HistoricalPrice, HistoricalMetrics, Stock
+from app.dao.repository.bulk_loader import BulkLoader, HistoricalPriceBulkLoader
+
+
+def add_stock(session, ticker="AAPL"):
+    stock = Stock(ticker_symbol=ticker, company_name=ticker)
+    session.add(stock)
+    session.flush()
+    return stock
+
+
+def test_load_ohlc_upserts_on_date_and_stock(memory_session):
+    stock = add_stock(memory_session)
+    dates = np.array(["2023-01-02", "2023-01-03", "2023-01-04"], dtype="datetime64[D]")
+    closes = np.array([10.0, 11.0, 12.0])
+    loader = HistoricalPriceBulkLoader(chunk_size=2)
+
+    assert loader.load_ohlc(stock.id, dates, closes, closes, closes, closes, memory_session) == 3
+    loader.load_ohlc(stock.id, dates[-1:], [1.0], [1.0], [1.0], [99.0], memory_session)
+
+    rows = memory_session.execute(
+        select(HistoricalPrice.date, HistoricalPrice.close_price).order_by(HistoricalPrice.date)
+    ).all()
+    assert rows == [(date(2023, 1, 2), 10.0), (date(2023, 1, 3), 11.0), (date(2023, 1, 4), 99.0)]
+    # historical_price opts out of versioning for bulk loads
+    version_count = memory_session.scalar(select(func.count()).select_from(version_class(HistoricalPrice)))
+    assert version_count == 0
+
+
+def test_coalesced_versioning_closes_previous_versions(memory_session):
+    stock = add_stock(memory_session)
+    loader = BulkLoader(HistoricalMetrics, chunk_size=10)
+    assert loader.versioning == "coalesce"
+
+    loader.load_rows([{"id": 1, "stock_id": stock.id, "date": date(2023, 3, 31), "revenue": 1.0}], memory_session)
+    loader.load_rows([{"id": 1, "stock_id": stock.id, "date": date(2023, 3, 31), "revenue": 2.0}], memory_session)
+
+    MetricsVersion = version_class(HistoricalMetrics)
+    versions = memory_session.execute(
+        select(MetricsVersion.revenue, MetricsVersion.operation_type, MetricsVersion.end_transaction_id)
+        .order_by(MetricsVersion.transaction_id)
+    ).all()
+    assert [(revenue, operation) for revenue, operation, _ in versions] == [(1.0, 0), (2.0, 1)]
+    assert versions[0].end_transaction_id is not None
+    assert versions[1].end_transaction_id is None
@@ -0,0 +1,176 @@
+# test_intergation/dao/document_repository_intergation_test.py
+import sqlite3
+import zlib
+
+import pytest
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.orm import Session, configure_mappers
+
+from app.dao.models import Document, Sector, Stock
+from app.dao.models.base import BaseModel
+from app.dao.repository.document_repository import DocumentRepository, SearchIndexMissing, fts_phrase
+
+
+@pytest.fixture
+def documents(memory_session):
+    stocks = [Stock(ticker_symbol="AAA"), Stock(ticker_symbol="BBB")]
+    sector = Sector(name="Tech")
+    memory_session.add_all([*stocks, sector])
+    memory_session.flush()
+    docs = [
+        Document(filename="aaa-10k.txt", stock_id=stocks[0].id,
+                 content="The company recorded a goodwill impairment charge after the acquisition."),
+        Document(filename="aaa-10q.txt", stock_id=stocks[0].id,
+                 content="Goodwill was tested; no impairment. Goodwill remains unchanged. Goodwill goodwill."),
+        Document(filename="bbb-10k.txt", stock_id=stocks[1].id, sector_id=sector.id,
+                 content="Impairments of goodwill were recognised in the retail segment."),
+        Document(filename="tech-outlook.txt", sector_id=sector.id, content="Cloud revenue grew strongly."),
+    ]
+    memory_session.add_all(docs)
+    memory_session.flush()
+    return memory_session, docs, stocks, sector
+
+
+def test_search_ranks_matches_and_highlights_snippets(documents):
+    session, docs, _, _ = documents
+    hits = DocumentRepository().search("goodwill AND impairment", session=session)
+
+    assert {hit.document_id for hit in hits} == {docs[0].id, docs[1].id, docs[2].id}  # porter stems "impairments"
+    assert hits[0].document_id == docs[1].id  # most occurrences in the shortest text
+    assert hits == sorted(hits, key=lambda hit: -hit.score)
+    assert "[goodwill]" in hits[0].snippet.lower()
+    phrase = DocumentRepository().search(fts_phrase("goodwill impairment"), session=session)
+    assert [hit.filename for hit in phrase] == ["aaa-10k.txt"]
+
+
+def test_search_filters_by_stock_and_sector(documents):
+    session, docs, stocks, sector = documents
+    repository = DocumentRepository()
+    assert {hit.document_id for hit in repository.search("goodwill", stock_id=stocks[0].id, session=session)} == {
+        docs[0].id, docs[1].id}
+    by_sector = repository.search("goodwill OR cloud", sector_id=sector.id, session=session)
+    assert {hit.document_id for hit in by_sector} == {docs[2].id, docs[3].id}
+    with pytest.raises(ValueError):
+        repository.search('"unbalanced', session=session)
+
+
+def test_triggers_follow_updates_deletes_and_core_writes(documents):
+    session, docs, _, _ = documents
+    repository = DocumentRepository()
+    docs[3].content = "Goodwill impairment expected in cloud."
+    session.delete(docs[0])
+    session.flush()
+    session.execute(update(Document).where(Document.id == docs[2].id).values(content="No matching words."))
+
+    assert {hit.document_id for hit in repository.search("goodwill", session=session)} == {docs[1].id, docs[3].id}
+    assert repository.search("acquisition", session=session) == []
+
+    session.execute(text("INSERT INTO document_fts(document_fts) VALUES ('delete-all')"))  # a database indexed before the triggers existed
+    assert repository.search("goodwill", session=session) == []
+    repository.rebuild_search_index(session)
+    assert {hit.document_id for hit in repository.search("goodwill", session=session)} == {docs[1].id, docs[3].id}
+
+
+def test_plain_sqlite_connections_can_write_documents(tmp_path):
+    path = tmp_path / "db.sqlite3"
+    configure_mappers()
+    engine = create_engine(f"sqlite:///{path}")
+    BaseModel.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add(Stock(ticker_symbol="AAA"))
+        session.commit()
+
+    # No content function on this connection: the triggers only queue the write
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("INSERT INTO document (id, filename, stock_id, content) VALUES (1, 'a.txt', 1, ?)",
+                           (zlib.compress("Goodwill impairment".encode("utf-8")),))
+        connection.execute("INSERT INTO document (id, filename, stock_id, content) VALUES (2, 'b.txt', 1, 'goodwill')")
+        connection.execute("DELETE FROM document WHERE id = 2")
+    connection.close()
+
+    repository = DocumentRepository()
+    with Session(engine) as session:
+        assert repository.search("goodwill", session=session) == []  # searching never writes
+        assert repository.sync_search_index(session) == 3
+        assert [hit.document_id for hit in repository.search("goodwill", session=session)] == [1]
+        assert repository.sync_search_index(session) == 0
+        assert "[Goodwill]" in repository.search("goodwill", session=session)[0].snippet
+        session.commit()
+
+        # Inserts alone are indexed from `document` without re-indexing the rest
+        with sqlite3.connect(path) as connection:
+            connection.execute("INSERT INTO document (id, filename, stock_id, content) VALUES (3, 'c.txt', 1, 'goodwill')")
+        connection.close()
+        assert repository.sync_search_index(session) == 1
+        assert {hit.document_id for hit in repository.search("goodwill", session=session)} == {1, 3}
+        session.execute(text("INSERT INTO document_fts(document_fts, rank) VALUES ('integrity-check', 1)"))
+    engine.dispose()
+
+
+def test_engine_writes_are_indexed_without_queueing_content(documents):
+    session, docs, _, _ = documents
+    columns = [row[1] for row in session.execute(text("PRAGMA table_info(document_fts_queue)"))]
+    assert columns == ["seq", "document_id", "op"]
+    docs[0].content = "Rewritten note."
+    session.flush()
+    session.execute(text("DELETE FROM document WHERE id = :id"), {"id": docs[2].id})
+    assert session.execute(text("SELECT count(*) FROM document_fts_queue")).scalar() == 0
+    assert {hit.document_id for hit in DocumentRepository().search("goodwill", session=session)} == {docs[1].id}
+    session.execute(text("INSERT INTO document_fts(document_fts, rank) VALUES ('integrity-check', 1)"))
+
+
+def test_databases_without_the_index_get_a_clear_error(documents):
+    session, _, _, _ = documents
+    repository = DocumentRepository()
+    session.execute(text("DROP TABLE document_fts_queue"))
+    with pytest.raises(SearchIndexMissing, match="document_fts_queue"):
+        repository.sync_search_index(session)
+    session.execute(text("DROP TABLE document_fts"))
+    with pytest.raises(SearchIndexMissing, match="rebuild_search_index"):
+        repository.search("goodwill", session=session)
+    repository.rebuild_search_index(session)
+    assert len(repository.search("goodwill", session=session)) == 3
+
+
+def test_content_is_compressed_and_deferred(documents):
+    session, docs, stocks, _ = documents
+    body = "Goodwill impairment — réévaluation des actifs. " * 2000
+    document = Document(filename="large.txt", stock_id=stocks[0].id, content=body)
+    session.add(document)
+    session.flush()
+
+    kind, size = session.execute(text("SELECT typeof(content), length(content) FROM document WHERE id = :id"),
+                                 {"id": document.id}).one()
+    assert kind == "blob" and size < len(body.encode("utf-8")) // 20
+    session.expunge_all()
+    listed = session.get(Document, document.id)
+    assert "content" not in listed.__dict__
+    assert listed.content == body
+    assert document.id in {hit.document_id for hit in DocumentRepository().search("réévaluation", session=session)}
+
+
+def test_stream_content_decodes_across_chunk_boundaries(documents):
+    session, docs, stocks, _ = documents
+    body = "".join(f"{n}€ écrit " for n in range(20000))
+    document = Document(filename="stream.txt", stock_id=stocks[0].id, content=body)
+    session.add(document)
+    session.flush()
+    repository = DocumentRepository()
+
+    chunks = list(repository.stream_content(document.id, chunk_size=257, session=session))
+    assert len(chunks) > 1 and "".join(chunks) == body
+    with pytest.raises(KeyError):
+        list(repository.stream_content(-1, session=session))
+
+
+def test_compress_content_migrates_plain_text_rows(documents):
+    session, docs, _, _ = documents
+    session.execute(text("UPDATE document SET content = 'Legacy goodwill note' WHERE id = :id"), {"id": docs[3].id})
+    repository = DocumentRepository()
+    assert "".join(repository.stream_content(docs[3].id, session=session)) == "Legacy goodwill note"
+
+    assert repository.compress_content(session) == 1
+    assert session.execute(text("SELECT typeof(content) FROM document WHERE id = :id"), {"id": docs[3].id}).scalar() == "blob"
+    assert "".join(repository.stream_content(docs[3].id, session=session)) == "Legacy goodwill note"
+    assert docs[3].id in {hit.document_id for hit in repository.search("legacy", session=session)}
@@ -0,0 +1,53 @@
+# test_intergation/dao/loader_profiles_intergation_test.py
+from sqlalchemy import event
+
+from app.dao.models import Document, Holding, Sector, Stock, User, UserPortfolio
+from app.dao.repository.base_repository import BaseRepository
+from app.dao.repository.loader_profiles import PORTFOLIO_SUMMARY, STOCK_DETAIL
+
+
+def record_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def make_portfolio(session, positions):
+    user = User(username=f"u{positions}", first_name="A", last_name="B", hashed_password="x")
+    portfolio = UserPortfolio(user=user, name=f"p{positions}")
+    sector = Sector(name=f"s{positions}")
+    for i in range(positions):
+        stock = Stock(ticker_symbol=f"P{positions}T{i}", sectors=[sector])
+        portfolio.holdings.append(Holding(stock=stock, quantity=1, average_cost_basis=1.0))
+    session.add(portfolio)
+    session.commit()
+    return portfolio.id
+
+
+def test_portfolio_summary_query_count_is_independent_of_positions(memory_engine, memory_session):
+    small, large = make_portfolio(memory_session, 2), make_portfolio(memory_session, 200)
+    repository = BaseRepository(UserPortfolio)
+    statements = record_statements(memory_engine)
+    counts = []
+    for portfolio_id in (small, large):
+        memory_session.expunge_all()
+        statements.clear()
+        portfolio = repository.retrieve_entity_by_id(portfolio_id, memory_session, profile=PORTFOLIO_SUMMARY)
+        tickers = [holding.stock.ticker_symbol for holding in portfolio.holdings]
+        sectors = {sector.name for holding in portfolio.holdings for sector in holding.stock.sectors}
+        counts.append(len(statements))
+    assert len(tickers) == 200 and len(sectors) == 1
+    assert counts[0] == counts[1] <= 4
+
+
+def test_stock_detail_defers_document_content(memory_session):
+    stock = Stock(ticker_symbol="DOC", documents=[Document(filename="10k.txt", content="x" * 10_000)])
+    memory_session.add(stock)
+    memory_session.commit()
+    stock_id = stock.id
+    memory_session.expunge_all()
+
+    loaded = BaseRepository(Stock).retrieve_entity_by_id(stock_id, memory_session, profile=STOCK_DETAIL)
+    document = loaded.documents[0]
+    assert "content" not in document.__dict__
+    assert document.filename == "10k.txt"
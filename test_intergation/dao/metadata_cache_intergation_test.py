@@ -0,0 +1,57 @@
+# test_intergation/dao/metadata_cache_intergation_test.py
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import configure_mappers
+
+from app.boot import import_report, lazy_import
+from app.dao.metadata_cache import reflect_metadata, schema_hash
+from app.dao.models.base import BaseModel
+
+
+def file_engine(tmp_path):
+    configure_mappers()
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    BaseModel.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_reflected_metadata_is_cached_until_the_schema_changes(tmp_path):
+    engine = file_engine(tmp_path)
+    cache_root = str(tmp_path / "cache")
+    reflected = reflect_metadata(engine, cache_root)
+    assert "holding_version" in reflected.tables
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    cached = reflect_metadata(engine, cache_root)
+    assert len(statements) == 1  # the schema hash only
+    assert set(cached.tables) == set(reflected.tables)
+    assert [column.name for column in cached.tables["stocks"].columns] == \
+        [column.name for column in reflected.tables["stocks"].columns]
+
+    before = schema_hash(engine)
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE stocks ADD COLUMN isin VARCHAR"))
+    assert schema_hash(engine) != before
+    assert "isin" in reflect_metadata(engine, cache_root).tables["stocks"].columns
+    engine.dispose()
+
+
+def test_repositories_import_without_configuring_mappers_or_numpy():
+    probe = (
+        "import sys; "
+        "import app.dao.repository.base_repository, app.dao.repository.loader_profiles as profiles; "
+        "assert not profiles.UserPortfolio.__mapper__.configured; "
+        "assert 'numpy._core' not in sys.modules and 'numpy.core' not in sys.modules; "
+        "assert profiles.PORTFOLIO_SUMMARY.options"
+    )
+    subprocess.run([sys.executable, "-c", probe], check=True)
+
+
+def test_lazy_import_and_report():
+    assert lazy_import("json") is sys.modules["json"]
+    timings = import_report(["app.dao.models"])
+    assert timings[0].module == "app.dao.models" and timings[0].depth == 0
+    assert any(timing.module == "sqlalchemy" for timing in timings)
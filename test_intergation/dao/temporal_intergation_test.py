@@ -0,0 +1,74 @@
+# test_intergation/dao/temporal_intergation_test.py
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy_continuum import version_class, versioning_manager
+
+from app.dao.models import HistoricalMetrics, Stock
+from app.dao.repository.base_repository import BaseRepository
+
+
+def commit_at(session, issued_at):
+    """Commit, then backdate the version transaction the commit wrote."""
+    session.commit()
+    transaction = versioning_manager.transaction_cls
+    latest = session.scalar(select(func.max(transaction.id)))
+    session.execute(update(transaction).where(transaction.id == latest).values(issued_at=issued_at))
+    session.commit()
+
+
+@pytest.fixture
+def history(memory_session):
+    session = memory_session
+    stocks = [Stock(ticker_symbol=f"S{n}") for n in range(3)]
+    session.add_all(stocks)
+    session.flush()
+    metrics = [HistoricalMetrics(stock_id=stock.id, date=date(2020, 12, 31), revenue=100.0) for stock in stocks]
+    session.add_all(metrics)
+    commit_at(session, datetime(2021, 1, 15))
+    for revenue, issued_at in ((110.0, datetime(2021, 2, 10)), (120.0, datetime(2021, 2, 20))):
+        metrics[0].revenue = revenue
+        metrics[1].revenue = revenue + 1
+        commit_at(session, issued_at)
+    session.delete(metrics[2])
+    commit_at(session, datetime(2021, 4, 1))
+    return session, [stock.id for stock in stocks]
+
+
+def revenues(versions):
+    return {version.stock_id: version.revenue for version in versions}
+
+
+def test_states_as_of_timestamps(history):
+    session, stock_ids = history
+    repository = BaseRepository(HistoricalMetrics)
+
+    assert repository.retrieve_as_of(datetime(2020, 12, 1), session=session) == []
+    assert revenues(repository.retrieve_as_of(datetime(2021, 1, 31), session=session)) == {
+        stock_ids[0]: 100.0, stock_ids[1]: 100.0, stock_ids[2]: 100.0}
+    assert revenues(repository.retrieve_as_of(datetime(2021, 2, 15), session=session)) == {
+        stock_ids[0]: 110.0, stock_ids[1]: 111.0, stock_ids[2]: 100.0}
+    assert revenues(repository.retrieve_as_of(datetime(2021, 4, 2), session=session)) == {
+        stock_ids[0]: 120.0, stock_ids[1]: 121.0}
+
+    filtered = repository.retrieve_as_of(datetime(2021, 2, 15), {"stock_id": stock_ids[1:], "date": date(2020, 12, 31)},
+                                         session=session)
+    assert revenues(filtered) == {stock_ids[1]: 111.0, stock_ids[2]: 100.0}
+
+
+def test_compaction_keeps_period_end_snapshots(history):
+    session, stock_ids = history
+    repository = BaseRepository(HistoricalMetrics)
+    version = version_class(HistoricalMetrics)
+    before = session.scalar(select(func.count()).select_from(version))
+
+    assert repository.compact_history(datetime(2021, 3, 1), "month", session=session) == 2
+    assert session.scalar(select(func.count()).select_from(version)) == before - 2
+    # Month ends are unchanged; inside February the January snapshot now applies
+    assert revenues(repository.retrieve_as_of(datetime(2021, 2, 28), session=session))[stock_ids[0]] == 120.0
+    assert revenues(repository.retrieve_as_of(datetime(2021, 2, 15), session=session))[stock_ids[0]] == 100.0
+    assert revenues(repository.retrieve_as_of(datetime(2021, 4, 2), session=session)) == {
+        stock_ids[0]: 120.0, stock_ids[1]: 121.0}
+    with pytest.raises(ValueError):
+        repository.compact_history(datetime(2021, 3, 1), "week", session=session)
@@ -5,7 +5,6 @@ sys.path.insert(0, "O:\\Documents\\Python_Projects\\stock_valuation")
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker,configure_mappers
-from sqlalchemy_continuum import make_versioned
 from config import Config
 from app.dao.models.user import User
 
@@ -28,7 +27,7 @@ SessionLocal = sessionmaker(bind=engine)
 @pytest.fixture(scope="module")
 def setup_database():
     # Create the tables
-    make_versioned()
+    # make_versioned() already ran in app.dao.models.base; calling it again doubles every version row
     from app.dao.models import UserPortfolio, Transaction, Holding, Dividend, Configuration, ValuationModel, Stock, Sector, HistoricalPrice, HistoricalMetrics, Document
     configure_mappers()
     
@@ -0,0 +1,38 @@
+# test_intergation/dto/base_converter_intergation_test.py
+from datetime import date
+
+from sqlalchemy import select
+
+from app.dao.models import HistoricalPrice, Stock
+from app.dto.converters import BaseConverter
+from app.dto.schemas import HistoricalPriceDataTransfer
+
+
+def add_prices(session):
+    session.add(Stock(ticker_symbol="AAPL"))
+    session.flush()
+    prices = [HistoricalPrice(stock_id=1, date=date(2023, 1, day), close_price=float(day)) for day in range(2, 7)]
+    session.add_all(prices)
+    session.flush()
+    return prices
+
+
+def test_convert_many_round_trip(memory_session):
+    prices = add_prices(memory_session)
+
+    dtos = BaseConverter.convert_many_to_dto(prices, HistoricalPriceDataTransfer)
+    assert [dto.close_price for dto in dtos] == [2.0, 3.0, 4.0, 5.0, 6.0]
+
+    orm_objects = BaseConverter.convert_many_to_orm(dtos, HistoricalPrice)
+    assert all(isinstance(obj, HistoricalPrice) for obj in orm_objects)
+    assert [obj.date for obj in orm_objects] == [price.date for price in prices]
+
+
+def test_convert_rows_to_dto_skips_orm(memory_session):
+    add_prices(memory_session)
+    columns = BaseConverter.dto_columns(HistoricalPriceDataTransfer, HistoricalPrice)
+    rows = memory_session.execute(select(*columns).order_by(HistoricalPrice.date)).mappings()
+
+    dtos = BaseConverter.convert_rows_to_dto(rows, HistoricalPriceDataTransfer)
+    assert dtos[0].model_dump() == HistoricalPriceDataTransfer(date=date(2023, 1, 2), stock_id=1, close_price=2.0).model_dump()
+    assert len(dtos) == 5
@@ -1 +1,26 @@
 # Test/fixtures/__init__.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, configure_mappers
+
+from app.dao.models.base import BaseModel
+import app.dao.models  # noqa: F401 -- registers every mapped class
+
+
+@pytest.fixture
+def memory_engine():
+    """Fresh in-memory SQLite database with every table (and version table) created."""
+    configure_mappers()
+    engine = create_engine("sqlite://")
+    BaseModel.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def memory_session(memory_engine):
+    """Session on the in-memory database, rolled back after each test."""
+    session = sessionmaker(bind=memory_engine)()
+    yield session
+    session.rollback()
+    session.close()
@@ -0,0 +1,107 @@
+# test_intergation/services/adjusted_prices_intergation_test.py
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.dao.models import Dividend, PriceAdjustment, Stock, StockSplit
+from app.dao.repository.bulk_loader import HistoricalPriceBulkLoader
+from app.services.adjusted_prices import AdjustedPrices
+from app.services.price_store import PriceStore
+
+
+@pytest.fixture
+def actions(memory_session):
+    adjusted = AdjustedPrices()  # listening before the actions are flushed
+    stocks = [Stock(ticker_symbol="SPLT"), Stock(ticker_symbol="OTHR")]
+    memory_session.add_all(stocks)
+    memory_session.flush()
+    dates = np.arange("2023-01-02", "2023-01-08", dtype="datetime64[D]")
+    closes = np.array([100.0, 102.0, 51.0, 50.0, 50.0, 51.0])  # 2-for-1 on the 4th
+    loader = HistoricalPriceBulkLoader()
+    for stock in stocks:
+        loader.load_ohlc(stock.id, dates, closes, closes, closes, closes, memory_session)
+    memory_session.add_all([
+        StockSplit(stock_id=stocks[0].id, date=date(2023, 1, 4), ratio=2.0),
+        Dividend(stock_id=stocks[0].id, date=date(2023, 1, 6), dividend=1.0),  # prior close 50
+    ])
+    memory_session.flush()
+    return memory_session, adjusted, stocks[0].id, stocks[1].id
+
+
+def test_refresh_persists_factors_for_dirty_stocks(actions):
+    session, adjusted, split_id, _ = actions
+    assert adjusted.refresh(session) == 2
+
+    rows = session.scalars(select(PriceAdjustment).order_by(PriceAdjustment.ex_date)).all()
+    assert [(r.split_factor, r.dividend_factor) for r in rows] == [(0.5, 1.0), (1.0, 0.98)]
+    assert [r.cumulative_total for r in rows] == pytest.approx([0.49, 0.98])
+    assert adjusted.refresh(session) == 0
+
+
+def test_adjusted_series_is_one_multiply(actions, tmp_path):
+    session, adjusted, _, _ = actions
+    adjusted.refresh(session)
+
+    split_only = adjusted.adjusted(session, "SPLT", total_return=False)
+    assert split_only.close.tolist() == [50.0, 51.0, 51.0, 50.0, 50.0, 51.0]
+    total = adjusted.adjusted(session, "SPLT", start=date(2023, 1, 3))
+    np.testing.assert_allclose(total.close, [51.0 * 0.98, 51.0 * 0.98, 50.0 * 0.98, 50.0, 51.0])
+    assert adjusted.adjusted(session, "OTHR").close.tolist() == [100.0, 102.0, 51.0, 50.0, 50.0, 51.0]
+
+    store = PriceStore(str(tmp_path))
+    store.sync(session)
+    from_store = AdjustedPrices(store).adjusted(session, "SPLT", start=date(2023, 1, 3))
+    np.testing.assert_allclose(from_store.close, total.close)
+
+
+def test_new_action_recomputes_only_that_stock(actions):
+    session, adjusted, split_id, other_id = actions
+    adjusted.refresh(session)
+    session.commit()
+    untouched = session.scalars(select(PriceAdjustment.updated_at).where(PriceAdjustment.stock_id == split_id)).all()
+
+    session.add(StockSplit(stock_id=other_id, date=date(2023, 1, 4), ratio=2.0))
+    session.commit()
+    assert adjusted.refresh(session) == 1
+    assert adjusted.adjusted(session, "OTHR").close.tolist() == [50.0, 51.0, 51.0, 50.0, 50.0, 51.0]
+    assert session.scalars(select(PriceAdjustment.updated_at).where(PriceAdjustment.stock_id == split_id)).all() == untouched
+
+
+def test_rolled_back_actions_are_not_dirty_and_instances_share_listeners(actions):
+    session, adjusted, split_id, other_id = actions
+    session.commit()
+    adjusted.refresh(session)
+    session.commit()
+
+    session.add(StockSplit(stock_id=other_id, date=date(2023, 1, 5), ratio=3.0))
+    session.flush()
+    session.rollback()
+    assert adjusted.refresh(session) == 0
+
+    listeners = len(Session().dispatch.after_flush), len(Session().dispatch.do_orm_execute)
+    extra = [AdjustedPrices() for _ in range(50)]
+    assert (len(Session().dispatch.after_flush), len(Session().dispatch.do_orm_execute)) == listeners
+    for instance in extra:
+        instance.close()
+
+
+def test_prices_loaded_after_a_dividend_mark_the_stock_dirty(memory_session):
+    adjusted = AdjustedPrices()
+    stock = Stock(ticker_symbol="LATE")
+    memory_session.add(stock)
+    memory_session.flush()
+    memory_session.add(Dividend(stock_id=stock.id, date=date(2023, 1, 6), dividend=1.0))
+    memory_session.commit()
+    assert adjusted.refresh(memory_session) == 0  # no close before the ex-date yet
+    assert adjusted.factors(memory_session, stock.id).ex_dates.size == 0
+
+    dates = np.arange("2023-01-02", "2023-01-08", dtype="datetime64[D]")
+    closes = np.full(dates.size, 50.0)
+    HistoricalPriceBulkLoader().load_ohlc(stock.id, dates, closes, closes, closes, closes, memory_session)
+    memory_session.commit()
+    assert adjusted.refresh(memory_session) == 1
+    np.testing.assert_allclose(adjusted.adjusted(memory_session, "LATE").close, [49.0] * 4 + [50.0] * 2)
+    adjusted.close()
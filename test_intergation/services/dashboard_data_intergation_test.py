@@ -0,0 +1,122 @@
+# test_intergation/services/dashboard_data_intergation_test.py
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+
+from app.dao.models import Holding, Stock, User, UserPortfolio, ValuationModel
+from app.dao.repository.bulk_loader import HistoricalPriceBulkLoader
+from app.services.dashboard_data import DashboardData, downsample
+from app.services.price_sync import PriceSync
+
+
+@pytest.fixture
+def portfolio(memory_session):
+    user = User(username="u", first_name="A", last_name="B", hashed_password="x")
+    stocks = [Stock(ticker_symbol=ticker) for ticker in ("A", "B")]
+    portfolio = UserPortfolio(user=user, name="main", holdings=[
+        Holding(stock=stocks[0], quantity=10, average_cost_basis=5.0),
+        Holding(stock=stocks[1], quantity=5, average_cost_basis=20.0),
+    ])
+    memory_session.add(portfolio)
+    memory_session.flush()
+    dates = np.arange("2020-01-01", "2023-01-01", dtype="datetime64[D]")
+    closes = 100 + np.sin(np.arange(dates.size) / 30.0) * 10
+    closes[400] = 500.0  # spike that a chart must keep
+    loader = HistoricalPriceBulkLoader()
+    zeros = np.zeros(dates.size)
+    loader.load_ohlc(stocks[0].id, dates, zeros, zeros, zeros, closes, memory_session)
+    loader.load_ohlc(stocks[1].id, dates[:2], [0, 0], [0, 0], [0, 0], [30.0, 15.0], memory_session)
+    return portfolio.id, stocks
+
+
+def test_downsample_keeps_extremes_and_ends():
+    values = np.random.default_rng(0).normal(size=10_001)
+    keep = downsample(values, 200)
+    assert keep.size <= 200
+    assert keep[0] == 0 and keep[-1] == values.size - 1
+    assert values.argmax() in keep and values.argmin() in keep
+    assert np.all(np.diff(keep) > 0)
+    assert downsample(values[:50], 200).tolist() == list(range(50))
+
+
+def test_payloads_are_served_from_memory_then_disk(memory_session, portfolio, tmp_path):
+    portfolio_id, _ = portfolio
+    data = DashboardData(str(tmp_path))
+    first = data.portfolio(memory_session, portfolio_id)
+    assert first["ticker"].tolist() == ["A", "B"]
+    assert float(first["total_market_value"]) == first["market_value"].sum()
+
+    assert data.portfolio(memory_session, portfolio_id) is first
+    assert data.stats()["builds"] == 1 and data.stats()["hits"] == 1
+
+    chart = data.price_chart(memory_session, "A", points=100)
+    assert chart["date"].size <= 100 and int(chart["bars"]) == 1096
+    assert chart["close"].max() == 500.0
+
+    # A new process (fresh memory tier) reads the same payloads from disk
+    restarted = DashboardData(str(tmp_path))
+    reloaded = restarted.portfolio(memory_session, portfolio_id)
+    np.testing.assert_array_equal(reloaded["market_value"], first["market_value"])
+    assert restarted.stats()["disk_hits"] == 1 and restarted.stats()["builds"] == 0
+
+
+def test_database_writes_invalidate_both_tiers(memory_session, portfolio, tmp_path):
+    portfolio_id, stocks = portfolio
+    data = DashboardData(str(tmp_path))
+    assert data.valuations(memory_session, stocks[0].id)["valuation_id"].size == 0
+    before = data.portfolio(memory_session, portfolio_id)
+
+    memory_session.add(ValuationModel(stock_id=stocks[0].id, valuation_method="dcf", valuation_result=12.5,
+                                      valuation_date=datetime(2023, 1, 1)))
+    memory_session.flush()
+    valuations = data.valuations(memory_session, stocks[0].id)
+    assert valuations["method"].tolist() == ["dcf"] and valuations["result"].tolist() == [12.5]
+
+    holding = memory_session.get(Holding, int(before["holding_id"][0]))
+    holding.quantity = 20
+    memory_session.flush()
+    after = data.portfolio(memory_session, portfolio_id)
+    assert after["quantity"][0] == 20
+    assert len(list(tmp_path.glob("portfolio-*.npz"))) == 1
+
+    data.invalidate()
+    assert not list(tmp_path.glob("*.npz"))
+    assert data.precompute(memory_session, [portfolio_id], ["A"], [stocks[0].id]) == 3
+
+
+def test_lagging_stock_advancing_refreshes_its_chart(memory_session, portfolio, tmp_path):
+    _, stocks = portfolio
+    PriceSync.advance_watermarks(memory_session, {stocks[0].id: date(2024, 6, 28), stocks[1].id: date(2020, 1, 2)})
+    data = DashboardData(str(tmp_path))
+    assert int(data.price_chart(memory_session, "B")["bars"]) == 2
+    before = data.version(memory_session)
+
+    # B catches up to a date before A's watermark: neither the latest date nor the count changes
+    day = np.array(["2024-06-27"], dtype="datetime64[D]")
+    HistoricalPriceBulkLoader().load_ohlc(stocks[1].id, day, [0], [0], [0], [16.0], memory_session)
+    PriceSync.advance_watermarks(memory_session, {stocks[1].id: date(2024, 6, 27)})
+    assert data.version(memory_session) != before
+    chart = data.price_chart(memory_session, "B")
+    assert int(chart["bars"]) == 3 and chart["close"][-1] == 16.0
+
+    # A later process reads the rebuilt chart from disk, not the one from before the load
+    restarted = DashboardData(str(tmp_path))
+    assert int(restarted.price_chart(memory_session, "B")["bars"]) == 3
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_version_is_one_aggregate_query(memory_session, portfolio, tmp_path):
+    _, stocks = portfolio
+    PriceSync.advance_watermarks(memory_session, {stock.id: date(2022, 12, 30) for stock in stocks})
+    statements = []
+    engine = memory_session.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        version = DashboardData(str(tmp_path)).version(memory_session)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+    assert version[2] == 2
@@ -0,0 +1,89 @@
+# test_intergation/services/embedding_index_intergation_test.py
+import numpy as np
+import pytest
+
+from app.dao.models import Document, Sector, Stock
+from app.services.embedding_index import EmbeddingIndex
+
+DIMENSION = 16
+
+
+@pytest.fixture
+def documents(memory_session, tmp_path):
+    index = EmbeddingIndex(str(tmp_path))
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, DIMENSION)).astype(np.float32)
+    stocks = [Stock(ticker_symbol="A"), Stock(ticker_symbol="B")]
+    sector = Sector(name="Tech")
+    memory_session.add_all([*stocks, sector])
+    memory_session.flush()
+    docs = [
+        Document(filename=f"doc{n}.txt", embedding=vector.tobytes(),
+                 stock_id=stocks[n % 2].id, sector_id=sector.id if n < 10 else None)
+        for n, vector in enumerate(vectors)
+    ]
+    memory_session.add_all(docs)
+    memory_session.flush()
+    index.sync(memory_session)
+    index.apply_changes(memory_session)  # drop the changes recorded while seeding
+    return memory_session, index, vectors, docs, stocks, sector
+
+
+def brute_force(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    return np.argsort(-scores)[:k], np.sort(scores)[::-1][:k]
+
+
+def test_batched_search_matches_brute_force(documents):
+    _, index, vectors, docs, _, _ = documents
+    queries = vectors[:3] + 0.1
+
+    results = index.search(queries, k=5)
+
+    for query, result in zip(queries, results):
+        rows, scores = brute_force(vectors, query, 5)
+        assert result.document_ids.tolist() == [docs[row].id for row in rows]
+        np.testing.assert_allclose(result.scores, scores, rtol=1e-5)
+    assert isinstance(index._base.vectors, np.memmap)
+
+
+def test_filters_restrict_candidates(documents):
+    _, index, vectors, docs, stocks, sector = documents
+    by_stock = index.search(vectors[0], k=50, stock_id=stocks[1].id)[0]
+    assert len(by_stock.document_ids) == 20
+    assert {doc.stock_id for doc in docs if doc.id in set(by_stock.document_ids.tolist())} == {stocks[1].id}
+    by_sector = index.search(vectors[0], k=3, sector_id=sector.id)[0]
+    assert by_sector.document_ids[0] == docs[0].id
+    assert set(by_sector.document_ids.tolist()) <= {doc.id for doc in docs[:10]}
+
+
+def test_incremental_changes_then_compaction(documents, tmp_path):
+    session, index, vectors, docs, stocks, _ = documents
+    new_vector = np.ones(DIMENSION, dtype=np.float32)
+    added = Document(filename="new.txt", embedding=new_vector.tobytes(), stock_id=stocks[0].id)
+    session.add(added)
+    session.delete(docs[1])
+    docs[2].embedding = (-new_vector).tobytes()
+    session.flush()
+
+    assert index.apply_changes(session) == (2, 1)
+    assert len(index) == 40
+    best = index.search(new_vector, k=1)[0]
+    assert best.document_ids.tolist() == [added.id]
+    assert index.search(-new_vector, k=1)[0].document_ids.tolist() == [docs[2].id]
+    assert docs[1].id not in index.search(vectors[1], k=40)[0].document_ids.tolist()
+
+    assert index.save() == 40
+    reopened = EmbeddingIndex(str(tmp_path))
+    assert reopened.search(new_vector, k=1)[0].document_ids.tolist() == [added.id]
+    with pytest.raises(ValueError):
+        reopened.add([999], np.ones(3))
+
+
+def test_closed_index_stops_collecting_changes(documents):
+    session, index, _, docs, _, _ = documents
+    index.close()
+    docs[0].embedding = np.ones(DIMENSION, dtype=np.float32).tobytes()
+    session.commit()
+    assert index.apply_changes(session) == (0, 0)
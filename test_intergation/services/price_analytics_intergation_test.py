@@ -0,0 +1,109 @@
+# test_intergation/services/price_analytics_intergation_test.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.dao.models import Stock
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, HistoricalPriceBulkLoader
+from app.services.price_analytics import CloseMatrix, RollingAnalytics
+from app.services.price_store import PriceStore
+
+WINDOW = 10
+
+
+@pytest.fixture
+def prices(memory_session):
+    rng = np.random.default_rng(0)
+    dates = np.arange("2023-01-02", "2023-03-03", dtype="datetime64[D]")
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (3, dates.size)), axis=1))
+    stocks = [Stock(ticker_symbol=ticker) for ticker in ("AAA", "BBB", "CCC")]
+    memory_session.add_all(stocks)
+    memory_session.flush()
+    loader = HistoricalPriceBulkLoader()
+    for stock, close in zip(stocks, closes):
+        zeros = np.zeros(dates.size)
+        loader.load_ohlc(stock.id, dates, zeros, zeros, zeros, close, memory_session)
+    return memory_session, dates, closes
+
+
+def test_history_matches_pandas_rolling(prices):
+    session, dates, closes = prices
+    metrics = RollingAnalytics(CloseMatrix.from_database(session), benchmark="CCC").history(WINDOW)
+
+    frame = pd.DataFrame(closes.T, columns=["AAA", "BBB", "CCC"])
+    returns = np.log(frame).diff()
+    expected_volatility = returns.rolling(WINDOW).std() * np.sqrt(252)
+    expected_beta = returns.apply(lambda column: column.rolling(WINDOW).cov(returns["CCC"])) / returns["CCC"].rolling(WINDOW).var().values[:, None]
+    expected_drawdown = frame.rolling(WINDOW + 1).apply(lambda w: (w / np.maximum.accumulate(w) - 1).min(), raw=True)
+
+    np.testing.assert_allclose(metrics.volatility[:, WINDOW:], expected_volatility.T.values[:, WINDOW:])
+    np.testing.assert_allclose(metrics.beta[:, WINDOW:], expected_beta.T.values[:, WINDOW:])
+    np.testing.assert_allclose(metrics.max_drawdown[:, WINDOW:], expected_drawdown.T.values[:, WINDOW:])
+    np.testing.assert_allclose(metrics.total_return[:, WINDOW:], (frame / frame.shift(WINDOW) - 1).T.values[:, WINDOW:])
+    assert np.isnan(metrics.volatility[:, :WINDOW]).all()
+
+
+def test_snapshot_is_cached_and_matches_history(prices, tmp_path):
+    session, dates, _ = prices
+    store = PriceStore(str(tmp_path))
+    store.sync(session)
+    analytics = RollingAnalytics(CloseMatrix.from_store(store), windows=(WINDOW,))
+    history = analytics.history(WINDOW)
+
+    snapshot = analytics.snapshot("BBB", WINDOW, as_of=dates[30].item())
+    assert snapshot.volatility == pytest.approx(history.volatility[1, 30])
+    assert snapshot.beta == pytest.approx(history.beta[1, 30])
+    assert analytics.snapshot("BBB", WINDOW, as_of=dates[30].item()) is snapshot
+    assert analytics.stats()["hits"] == 1
+    assert np.isnan(analytics.snapshot("BBB", WINDOW, as_of=dates[3].item()).volatility)
+
+
+def test_append_computes_only_the_new_day(prices):
+    session, dates, closes = prices
+    full = CloseMatrix.from_database(session)
+    partial = CloseMatrix(full.tickers, full.stock_ids, full.dates[:-1], full.closes[:, :-1])
+    analytics = RollingAnalytics(partial, windows=(WINDOW, 20))
+
+    appended = analytics.append(dates[-1], dict(zip(full.tickers, closes[:, -1])))
+
+    expected = RollingAnalytics(full).history(20)
+    assert appended[20]["AAA"].max_drawdown == pytest.approx(expected.max_drawdown[0, -1])
+    assert appended[20]["CCC"].beta == pytest.approx(expected.beta[2, -1])
+    assert analytics.snapshot("AAA", 20) is appended[20]["AAA"]
+    with pytest.raises(ValueError):
+        analytics.append(dates[-1], {})
+
+
+def test_missing_bars_are_skipped_up_to_the_coverage_threshold(prices):
+    session, dates, closes = prices
+    full = CloseMatrix.from_database(session)
+    gapped = full.closes.copy()
+    gapped[0, 20] = np.nan  # one missing bar in AAA
+    gapped[1, 15:] = np.nan  # BBB stops trading
+    matrix = CloseMatrix(full.tickers, full.stock_ids, full.dates, gapped)
+    metrics = RollingAnalytics(matrix, benchmark="CCC", min_coverage=0.8).history(WINDOW)
+
+    returns = np.log(pd.DataFrame(gapped.T, columns=full.tickers)).diff()
+    expected_volatility = returns["AAA"].rolling(WINDOW, min_periods=8).std() * np.sqrt(252)
+    np.testing.assert_allclose(metrics.volatility[0, WINDOW:], expected_volatility.values[WINDOW:])
+    assert np.isfinite(metrics.total_return[0, WINDOW:]).all() and np.isfinite(metrics.max_drawdown[0, WINDOW:]).all()
+    paired = returns[["AAA", "CCC"]].iloc[21 - WINDOW + 1:22].dropna()
+    assert metrics.beta[0, 21] == pytest.approx(np.cov(paired["AAA"], paired["CCC"], bias=True)[0, 1] / paired["CCC"].var(ddof=0))
+    # The window ending at column 16 still has 8 of its 10 returns, later ones have too few
+    assert np.isfinite(metrics.volatility[1, 16]) and np.isnan(metrics.volatility[1, 17:]).all()
+    assert metrics.total_return[1, 16] == pytest.approx(gapped[1, 14] / gapped[1, 6] - 1)
+
+
+def test_from_database_chunks_stock_ids(prices):
+    session, _, _ = prices
+    full = CloseMatrix.from_database(session)
+    connection = session.connection().connection.driver_connection
+    limit = connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, MAX_BIND_PARAMS)
+    try:
+        chunked = CloseMatrix.from_database(session, [*range(10**6, 10**6 + 2 * MAX_BIND_PARAMS), *full.stock_ids.tolist()])
+    finally:
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    assert chunked.tickers == full.tickers
+    np.testing.assert_array_equal(chunked.closes, full.closes)
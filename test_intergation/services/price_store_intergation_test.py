@@ -0,0 +1,27 @@
+# test_intergation/services/price_store_intergation_test.py
+from datetime import date
+
+import numpy as np
+
+from app.dao.models import Stock
+from app.dao.repository.bulk_loader import HistoricalPriceBulkLoader
+from app.services.price_store import PriceStore
+
+
+def test_sync_and_get_returns_memory_mapped_views(memory_session, tmp_path):
+    for ticker in ("AAPL", "MSFT"):
+        memory_session.add(Stock(ticker_symbol=ticker))
+    memory_session.flush()
+    dates = np.arange("2023-01-01", "2023-01-11", dtype="datetime64[D]")
+    loader = HistoricalPriceBulkLoader()
+    loader.load_ohlc(1, dates, np.ones(10), np.ones(10), np.ones(10), np.arange(10.0), memory_session)
+    loader.load_ohlc(2, dates[:5], np.ones(5), np.ones(5), np.ones(5), np.arange(100.0, 105.0), memory_session)
+
+    store = PriceStore(str(tmp_path))
+    assert store.sync(memory_session) == 15
+
+    series = store.get("AAPL", start=date(2023, 1, 3), end=date(2023, 1, 5))
+    assert series.close.tolist() == [2.0, 3.0, 4.0]
+    assert series.date[0] == np.datetime64("2023-01-03")
+    assert isinstance(series.close, np.memmap)
+    assert PriceStore(str(tmp_path)).get("MSFT").close.tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
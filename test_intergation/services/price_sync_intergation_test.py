@@ -0,0 +1,85 @@
+# test_intergation/services/price_sync_intergation_test.py
+import sqlite3
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app.dao.models import HistoricalPrice, PriceWatermark, Stock
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS
+from app.services.price_sync import PriceSync
+
+
+def write_feed(directory, ticker, dates):
+    lines = ["date,open,high,low,close,volume"]
+    lines += [f"{day},1,2,0.5,{i + 1},100" for i, day in enumerate(dates)]
+    (directory / f"{ticker}.csv").write_text("\n".join(lines) + "\n")
+
+
+def test_run_appends_only_bars_after_watermark(memory_session, tmp_path):
+    memory_session.add(Stock(ticker_symbol="AAPL"))
+    memory_session.flush()
+    sync = PriceSync(str(tmp_path))
+
+    write_feed(tmp_path, "AAPL", ["2023-01-02", "2023-01-03"])
+    write_feed(tmp_path, "ZZZZ", ["2023-01-02"])
+    first = sync.run(memory_session)
+    assert first.loaded == {"AAPL": 2}
+    assert first.unknown_tickers == ["ZZZZ"]
+
+    # Full history re-delivered with two new bars, one trading day (Thu 5th) missing
+    write_feed(tmp_path, "AAPL", ["2023-01-02", "2023-01-03", "2023-01-04", "2023-01-06"])
+    second = sync.run(memory_session)
+    assert second.loaded == {"AAPL": 2}
+    assert [(gap.after, gap.before, gap.missing_days) for gap in second.gaps] == [
+        (date(2023, 1, 4), date(2023, 1, 6), 1)
+    ]
+    assert memory_session.scalar(select(func.count()).select_from(HistoricalPrice)) == 4
+    assert memory_session.scalar(select(PriceWatermark.last_date)) == date(2023, 1, 6)
+    assert sync.run(memory_session).total_loaded == 0
+
+
+def test_many_feeds_and_stocks_are_read_in_chunks(memory_session, tmp_path):
+    stocks = [Stock(ticker_symbol=f"T{n}") for n in range(2 * MAX_BIND_PARAMS + 5)]
+    memory_session.add_all(stocks)
+    memory_session.flush()
+    for stock in stocks[:3]:
+        write_feed(tmp_path, stock.ticker_symbol, ["2023-01-02"])
+    for n in range(2 * MAX_BIND_PARAMS):
+        (tmp_path / f"X{n}.csv").write_text("date,open,high,low,close,volume\n")
+
+    connection = memory_session.connection().connection.driver_connection
+    limit = connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, MAX_BIND_PARAMS)
+    try:
+        report = PriceSync(str(tmp_path)).run(memory_session)
+        marks = PriceSync.watermarks(memory_session, [stock.id for stock in stocks])
+    finally:
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    assert report.loaded == {"T0": 1, "T1": 1, "T2": 1}
+    assert len(report.unknown_tickers) == 2 * MAX_BIND_PARAMS
+    assert marks == {stock.id: date(2023, 1, 2) for stock in stocks[:3]}
+
+
+def test_rows_with_empty_fields_are_skipped_and_reported(memory_session, tmp_path):
+    memory_session.add(Stock(ticker_symbol="AAPL"))
+    memory_session.flush()
+    (tmp_path / "AAPL.csv").write_text(
+        "date,open,high,low,close,volume\n"
+        "2023-01-02,1,2,0.5,10,100\n"
+        "2023-01-03,1,2,0.5,,100\n"
+        "2023-01-04,1,2,0.5,abc,100\n"
+        "2023-01-05,1,2,0.5,12,100\n"
+    )
+    report = PriceSync(str(tmp_path)).run(memory_session)
+    assert report.loaded == {"AAPL": 2}
+    assert [(row.ticker, row.line) for row in report.skipped_rows] == [("AAPL", 3), ("AAPL", 4)]
+    assert report.skipped_rows[0].reason == "empty close"
+
+
+def test_advancing_a_watermark_touches_updated_at(memory_session):
+    stock = Stock(ticker_symbol="AAPL")
+    memory_session.add(stock)
+    memory_session.flush()
+    PriceSync.advance_watermarks(memory_session, {stock.id: date(2023, 1, 2)})
+    first = memory_session.scalar(select(PriceWatermark.updated_at))
+    PriceSync.advance_watermarks(memory_session, {stock.id: date(2023, 1, 3)})
+    assert memory_session.scalar(select(PriceWatermark.updated_at)) > first
@@ -0,0 +1,115 @@
+# test_intergation/services/query_executor_intergation_test.py
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import configure_mappers
+
+from app.dao.models import HistoricalPrice, Stock
+from app.dao.models.base import BaseModel
+from app.dao.repository.bulk_loader import HistoricalPriceBulkLoader
+from app.services.query_cache import QueryCache, sql_tables, statement_tables
+from app.services.query_executor import DatabaseQueryExecutor
+from app.services.session_manager import DatabaseManager
+
+
+def make_db_manager(tmp_path):
+    configure_mappers()
+    db_manager = DatabaseManager(f"sqlite:///{tmp_path / 'executor.sqlite3'}")
+    BaseModel.metadata.create_all(bind=db_manager.engine)
+    return db_manager
+
+
+def test_stream_entries_walks_every_row_once_in_key_order(tmp_path):
+    db_manager = make_db_manager(tmp_path)
+    dates = np.arange("2023-01-01", "2023-02-01", dtype="datetime64[D]")
+    with db_manager.get_session() as session:
+        session.add_all([Stock(ticker_symbol="A"), Stock(ticker_symbol="B")])
+        session.flush()
+        for stock_id in (1, 2):
+            ones = np.ones(dates.size)
+            HistoricalPriceBulkLoader().load_ohlc(stock_id, dates, ones, ones, ones, ones * stock_id, session)
+
+    executor = DatabaseQueryExecutor(db_manager)
+    batches = list(executor.stream_entries(HistoricalPrice, batch_size=7, order_by=("stock_id", "date")))
+    keys = [(price.stock_id, price.date) for batch in batches for price in batch]
+    assert len(keys) == 62
+    assert keys == sorted(set(keys))
+    assert max(len(batch) for batch in batches) == 7
+
+    filtered = [price for batch in executor.stream_entries(HistoricalPrice, {"stock_id": 2}, batch_size=10) for price in batch]
+    assert {price.close_price for price in filtered} == {2.0}
+    assert len(filtered) == 31
+
+
+def test_result_cache_hits_until_a_flush_writes_the_table(tmp_path):
+    db_manager = make_db_manager(tmp_path)
+    executor = DatabaseQueryExecutor(db_manager, cache=QueryCache(maxsize=8, ttl=60))
+    with db_manager.get_session() as session:
+        session.add(Stock(ticker_symbol="A"))
+
+    assert executor.count_entries_with_conditions(Stock) == 1
+    assert executor.count_entries_with_conditions(Stock) == 1
+    assert executor.execute_select("SELECT ticker_symbol FROM stocks") == [{"ticker_symbol": "A"}]
+    assert executor.retrieve_entries_by_conditions(Stock, {"ticker_symbol": "A"})[0].ticker_symbol == "A"
+    assert executor.cache_stats()["hits"] == 1
+
+    with db_manager.get_session() as session:
+        session.add(Stock(ticker_symbol="B"))
+
+    assert executor.count_entries_with_conditions(Stock) == 2
+    assert executor.execute_select("select ticker_symbol  from stocks") == [{"ticker_symbol": "A"}, {"ticker_symbol": "B"}]
+    assert executor.cache_stats()["invalidated"] == 3
+
+
+def test_cache_keys_keep_literals_and_core_writes_invalidate(tmp_path):
+    db_manager = make_db_manager(tmp_path)
+    cache = QueryCache(maxsize=8, ttl=60)
+    executor = DatabaseQueryExecutor(db_manager, cache=cache)
+    with db_manager.get_session() as session:
+        session.add_all([Stock(ticker_symbol="AAPL"), Stock(ticker_symbol="aapl")])
+
+    assert executor.execute_select("SELECT id FROM stocks WHERE ticker_symbol='AAPL'") == [{"id": 1}]
+    assert executor.execute_select("SELECT id FROM stocks WHERE ticker_symbol='aapl'") == [{"id": 2}]
+
+    query = "SELECT count(*) AS bars FROM historical_price"
+    assert executor.execute_select(query) == [{"bars": 0}]
+    dates = np.arange("2023-01-01", "2023-01-11", dtype="datetime64[D]")
+    with db_manager.get_session() as session:
+        ones = np.ones(dates.size)
+        HistoricalPriceBulkLoader().load_ohlc(1, dates, ones, ones, ones, ones, session)
+    assert executor.execute_select(query) == [{"bars": 10}]
+
+    with db_manager.engine.begin() as connection:
+        connection.execute(text("DELETE FROM historical_price WHERE stock_id = 1"))
+    assert executor.execute_select(query) == [{"bars": 0}]
+    cache.close()
+
+
+def test_comma_joins_and_ctes_are_invalidated_by_every_table_they_read(tmp_path):
+    db_manager = make_db_manager(tmp_path)
+    cache = QueryCache(maxsize=8, ttl=60)
+    executor = DatabaseQueryExecutor(db_manager, cache=cache)
+    with db_manager.get_session() as session:
+        session.add(Stock(ticker_symbol="A"))
+
+    comma_join = "SELECT count(*) AS n FROM stocks s, historical_price AS p WHERE s.id = p.stock_id"
+    cte = ("WITH recent(stock_id) AS (SELECT stock_id FROM historical_price WHERE date >= '2023-01-01') "
+           "SELECT count(*) AS n FROM stocks JOIN recent ON recent.stock_id = stocks.id")
+    assert sql_tables(comma_join) == sql_tables(cte) == {"stocks", "historical_price"}
+    assert executor.execute_select(comma_join) == executor.execute_select(cte) == [{"n": 0}]
+
+    dates = np.arange("2023-01-01", "2023-01-04", dtype="datetime64[D]")
+    with db_manager.get_session() as session:
+        ones = np.ones(dates.size)
+        HistoricalPriceBulkLoader().load_ohlc(1, dates, ones, ones, ones, ones, session)
+    assert executor.execute_select(comma_join) == executor.execute_select(cte) == [{"n": 3}]
+    cache.close()
+
+
+def test_unidentified_tables_are_not_cached():
+    recent = select(HistoricalPrice.stock_id).where(HistoricalPrice.close_price > 1).cte("recent")
+    statement = select(func.count()).select_from(Stock).where(Stock.id.in_(select(recent.c.stock_id)))
+    assert statement_tables(statement) == {"stocks", "historical_price"}
+    assert statement_tables(select(Stock).where(text("id IN (SELECT stock_id FROM holding)"))) is None
+    assert sql_tables("SELECT * FROM document_text") is None
+    assert sql_tables("SELECT value FROM json_each('[1, 2]')") is None
+    assert sql_tables("SELECT 'from x' AS s FROM (SELECT id FROM \"stocks\") AS t -- from y") == {"stocks"}
@@ -0,0 +1,67 @@
+# test_intergation/services/symbol_cache_intergation_test.py
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, configure_mappers, sessionmaker
+
+from app.dao.models import Sector, Stock
+from app.dao.models.base import BaseModel
+from app.services.symbol_cache import SymbolCache
+
+
+def test_warm_resolve_and_flush_invalidation(memory_session):
+    tech, hardware = Sector(name="Technology"), Sector(name="Hardware")
+    apple = Stock(ticker_symbol="AAPL", company_name="Apple", sectors=[tech, hardware])
+    memory_session.add_all([apple, Stock(ticker_symbol="MSFT", company_name="Microsoft")])
+    memory_session.commit()
+
+    cache = SymbolCache(maxsize=10)
+    assert cache.warm(memory_session) == 2
+    assert cache.identity(apple.id, memory_session).sector_ids == (tech.id, hardware.id)
+    assert cache.resolve_many(["AAPL", "MSFT", "NOPE"], memory_session) == {"AAPL": apple.id, "MSFT": 2}
+    assert cache.stats()["ids"]["hits"] == 2
+
+    apple.ticker_symbol = "APPL2"
+    memory_session.flush()
+    assert cache.resolve("AAPL", memory_session) is None
+    assert cache.resolve("APPL2", memory_session) == apple.id
+
+    apple.sectors = [tech]
+    memory_session.flush()
+    assert cache.identity(apple.id, memory_session).sector_ids == (tech.id,)
+
+
+def test_commit_and_rollback_drop_entries_cached_meanwhile(tmp_path):
+    configure_mappers()
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite3'}")  # separate connections per session
+    BaseModel.metadata.create_all(bind=engine)
+    writer, reader = (sessionmaker(bind=engine)() for _ in range(2))
+    stock = Stock(ticker_symbol="IBM")
+    writer.add(stock)
+    writer.commit()
+    cache = SymbolCache(maxsize=10)
+
+    stock.ticker_symbol = "IBM2"
+    writer.flush()
+    # Another session still sees the committed row and caches it until the writer commits
+    assert cache.resolve("IBM", reader) == stock.id
+    reader.rollback()
+    writer.commit()
+    assert cache.resolve("IBM", reader) is None
+
+    writer.add(Stock(ticker_symbol="TMP"))
+    writer.flush()
+    assert cache.resolve("TMP", writer) is not None
+    writer.rollback()
+    assert cache.resolve("TMP", reader) is None
+
+    cache.close()
+    reader.close()
+    writer.close()
+    engine.dispose()
+
+
+def test_instances_share_one_set_of_session_listeners():
+    listeners = len(Session().dispatch.after_flush)
+    caches = [SymbolCache() for _ in range(50)]
+    assert len(Session().dispatch.after_flush) == listeners
+    for cache in caches:
+        cache.close()
@@ -0,0 +1,132 @@
+# test_intergation/services/valuation_reports_intergation_test.py
+import csv
+import os
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.dao.models import HistoricalMetrics, Stock, ValuationModel
+from app.services.valuation_reports import ReportStore, split_report_path
+from app.services.valuations.dcf import DCFEngine, DCFParameters
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReportStore(str(tmp_path / "reports"), chunk_size=3)
+    yield store
+    store.close()
+
+
+def ragged_reports(count):
+    return {
+        100 + n: {"year": np.arange(n % 4 + 1), "value": np.linspace(n, n + 1, n % 4 + 1)}
+        for n in range(count)
+    }
+
+
+def test_read_single_reports_and_columns(store):
+    reports = ragged_reports(10)
+    batch = store.submit(reports)
+    assert set(batch.file_paths) == set(reports)
+
+    for valuation_id, columns in reports.items():
+        stored = store.read(batch.file_paths[valuation_id])
+        np.testing.assert_array_equal(stored["year"], columns["year"])
+        np.testing.assert_allclose(stored["value"], columns["value"])
+    assert list(store.read(batch.file_paths[105], columns=["value"])) == ["value"]
+
+    ids, offsets, values = store.read_column(batch.path, "value")
+    assert ids.tolist() == sorted(reports)
+    np.testing.assert_allclose(values[offsets[4]:offsets[5]], reports[104]["value"])
+    # Each column is stored as one member per chunk of three valuations
+    archive = np.load(batch.path)
+    assert {name for name in archive.files if name.startswith("value.")} == {"value.0", "value.1", "value.2", "value.3"}
+
+
+def test_invalid_reports_and_paths(store):
+    with pytest.raises(ValueError):
+        store.submit({1: {"a": np.ones(2), "b": np.ones(3)}})
+    with pytest.raises(ValueError):
+        store.submit({1: {"a": np.ones(2)}, 2: {"b": np.ones(2)}})
+    batch = store.submit(ragged_reports(2))
+    with pytest.raises(KeyError):
+        store.read(batch.path + "#999")
+    with pytest.raises(KeyError):
+        store.read(batch.file_paths[100], columns=["missing"])
+    with pytest.raises(ValueError):
+        split_report_path("GROW_DCF_2024-01-01.csv")
+
+
+def test_finalize_links_only_written_batches(memory_session, store):
+    stock = Stock(ticker_symbol="LATE")
+    memory_session.add(stock)
+    memory_session.flush()
+    valuation = ValuationModel(stock_id=stock.id, valuation_method="dcf", valuation_result=1.0,
+                               valuation_date=datetime(2024, 1, 1))
+    memory_session.add(valuation)
+    memory_session.flush()
+
+    release = threading.Event()
+    store._executor.submit(release.wait)  # occupy the writers so the batch stays queued
+    store._executor.submit(release.wait)
+    batch = store.submit({valuation.id: {"year": np.arange(3)}})
+    assert store.finalize(memory_session) == 0
+    release.set()
+    store.wait()
+    assert store.finalize(memory_session) == 1
+    memory_session.refresh(valuation)
+    assert valuation.file_path == batch.file_paths[valuation.id]
+
+
+def test_evicted_and_closed_batches_release_their_files(tmp_path):
+    store = ReportStore(str(tmp_path / "reports"))
+    store._batches.maxsize = 1
+    first, second = store.submit(ragged_reports(2)), store.submit(ragged_reports(3))
+    store.read(first.file_paths[100])
+    archive = store._batches.get(first.path).archive
+    store.read(second.file_paths[100])
+    assert archive.zip is None  # evicted, so closed
+
+    archive = store._batches.get(second.path).archive
+    store.close()
+    assert archive.zip is None
+    assert store.read(first.file_paths[101])["year"].tolist() == [0, 1]  # reopened on demand
+    store.close()
+
+
+def test_dcf_run_writes_reports_in_background(memory_session, store, tmp_path):
+    stock = Stock(ticker_symbol="GROW")
+    memory_session.add(stock)
+    memory_session.flush()
+    memory_session.add_all(
+        HistoricalMetrics(stock_id=stock.id, date=day, revenue=100.0, net_income=25.0, shares_outstanding=50.0)
+        for day in (date(2023, 3, 31), date(2023, 6, 30), date(2023, 9, 30), date(2023, 12, 31))
+    )
+    memory_session.flush()
+    parameters = DCFParameters()
+
+    [valuation_id] = DCFEngine(parameters).run(memory_session, reports=store)
+    valuation = memory_session.scalars(select(ValuationModel).where(ValuationModel.id == valuation_id)).one()
+    # run() does not wait for the write; file_path is only set for batches already on disk
+    assert valuation.file_path is None or os.path.exists(split_report_path(valuation.file_path)[0])
+    store.wait()
+    assert store.finalize(memory_session) in (0, 1)
+    assert store.finalize(memory_session) == 0
+    memory_session.refresh(valuation)
+    report = store.read(valuation.file_path)
+
+    assert report["year"].tolist() == list(range(1, parameters.projection_years + 1))
+    terminal = report["cash_flow"][-1] * (1 + parameters.terminal_growth) / (parameters.discount_rate - parameters.terminal_growth)
+    assert report["present_value"].sum() + terminal * report["discount_factor"][-1] == pytest.approx(
+        valuation.valuation_result * 50.0)
+
+    exported = store.export(memory_session, valuation_id, str(tmp_path / "export"))
+    assert exported.endswith(f"GROW_DCF_{valuation.valuation_date:%Y-%m-%d}.csv")
+    with open(exported) as export_file:
+        rows = list(csv.DictReader(export_file))
+    assert [float(row["cash_flow"]) for row in rows] == pytest.approx(report["cash_flow"].tolist())
+    with pytest.raises(ValueError):
+        store.export(memory_session, valuation_id, str(tmp_path), fmt="pdf")
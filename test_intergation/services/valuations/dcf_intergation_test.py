@@ -0,0 +1,85 @@
+# test_intergation/services/valuations/dcf_intergation_test.py
+import json
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.dao.models import HistoricalMetrics, Stock, ValuationModel
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS
+from app.services.valuations.dcf import DCFEngine, DCFParameters, MetricsMatrix
+
+QUARTERS = [date(2022, 3, 31), date(2022, 6, 30), date(2022, 9, 30), date(2022, 12, 31),
+            date(2023, 3, 31), date(2023, 6, 30), date(2023, 9, 30), date(2023, 12, 31)]
+
+
+def reference_value(ttm_income, growth, shares, p):
+    value, cash_flow = 0.0, ttm_income
+    for year in range(1, p.projection_years + 1):
+        cash_flow *= 1 + growth + (p.terminal_growth - growth) * year / p.projection_years
+        value += cash_flow / (1 + p.discount_rate) ** year
+    terminal = cash_flow * (1 + p.terminal_growth) / (p.discount_rate - p.terminal_growth)
+    return (value + terminal / (1 + p.discount_rate) ** p.projection_years) / shares
+
+
+@pytest.fixture
+def universe(memory_session):
+    stocks = {ticker: Stock(ticker_symbol=ticker) for ticker in ("GROW", "NEW", "LOSS")}
+    memory_session.add_all(stocks.values())
+    memory_session.flush()
+    metrics = [
+        # Revenue 100/quarter then 110/quarter: 10% growth, 25 net income per quarter
+        *[HistoricalMetrics(stock_id=stocks["GROW"].id, date=day, revenue=100.0 if day.year == 2022 else 110.0,
+                            net_income=25.0, shares_outstanding=50.0) for day in QUARTERS],
+        # One year of history only: default growth
+        *[HistoricalMetrics(stock_id=stocks["NEW"].id, date=day, revenue=10.0, net_income=2.0,
+                            shares_outstanding=4.0) for day in QUARTERS[4:]],
+        *[HistoricalMetrics(stock_id=stocks["LOSS"].id, date=day, revenue=10.0, net_income=-1.0,
+                            shares_outstanding=4.0) for day in QUARTERS],
+    ]
+    memory_session.add_all(metrics)
+    memory_session.flush()
+    return {ticker: stock.id for ticker, stock in stocks.items()}
+
+
+def test_value_universe_in_one_pass(memory_session, universe):
+    parameters = DCFParameters()
+    result = DCFEngine(parameters).value(memory_session)
+    by_stock = dict(zip(result.stock_ids.tolist(), result.value_per_share.tolist()))
+
+    assert by_stock[universe["GROW"]] == pytest.approx(reference_value(100.0, 0.10, 50.0, parameters))
+    assert by_stock[universe["NEW"]] == pytest.approx(reference_value(8.0, parameters.default_growth, 4.0, parameters))
+    assert np.isnan(by_stock[universe["LOSS"]])
+    assert result.as_of.tolist()[0] == date(2023, 12, 31)
+
+
+def test_run_bulk_inserts_valuations(memory_session, universe):
+    ids = DCFEngine().run(memory_session)
+
+    valuations = memory_session.scalars(select(ValuationModel).order_by(ValuationModel.stock_id)).all()
+    assert [v.id for v in valuations] == sorted(ids)
+    assert {v.stock_id for v in valuations} == {universe["GROW"], universe["NEW"]}
+    assert {v.valuation_method for v in valuations} == {"DCF"}
+    grow = next(v for v in valuations if v.stock_id == universe["GROW"])
+    assert json.loads(grow.assumptions)["growth"] == pytest.approx(0.10)
+    assert json.loads(grow.parameters)["discount_rate"] == 0.09
+
+
+def test_parameters_are_validated():
+    with pytest.raises(ValueError):
+        DCFParameters(discount_rate=0.02, terminal_growth=0.03)
+
+
+def test_metrics_of_a_large_universe_are_loaded_in_chunks(memory_session, universe):
+    everything = MetricsMatrix.load(memory_session, 8)
+    missing = list(range(10**6, 10**6 + 2 * MAX_BIND_PARAMS))
+    connection = memory_session.connection().connection.driver_connection
+    limit = connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, MAX_BIND_PARAMS)
+    try:
+        chunked = MetricsMatrix.load(memory_session, 8, [*missing, *reversed(universe.values())])
+    finally:
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    np.testing.assert_array_equal(chunked.stock_ids, everything.stock_ids)
+    np.testing.assert_array_equal(chunked.revenue, everything.revenue)
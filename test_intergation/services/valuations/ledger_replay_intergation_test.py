@@ -0,0 +1,189 @@
+# test_intergation/services/valuations/ledger_replay_intergation_test.py
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+
+from app.dao.models import Holding, HoldingCheckpoint, Stock, Transaction, User, UserPortfolio
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS
+from app.services.valuations.ledger_replay import LedgerReplayEngine, _affine_scan, _segment_cumsum
+
+
+def reference_positions(trades):
+    """Trade-by-trade average cost bookkeeping the engine must reproduce."""
+    state = {}
+    for trade in sorted(trades, key=lambda t: (t.portfolio_id, t.stock_id, t.transaction_date, t.id)):
+        quantity, cost, realised = state.get((trade.portfolio_id, trade.stock_id), (0.0, 0.0, 0.0))
+        if trade.transaction_type == "BUY":
+            quantity, cost = quantity + trade.quantity, cost + trade.quantity * trade.price + trade.fees
+        elif trade.transaction_type == "STOCK_SPLIT":
+            quantity, cost = quantity + trade.quantity, cost + trade.fees
+        elif trade.transaction_type == "SELL":
+            average = cost / quantity
+            realised += trade.quantity * (trade.price - average) - trade.fees
+            quantity -= trade.quantity
+            cost = quantity * average
+        state[(trade.portfolio_id, trade.stock_id)] = (quantity, cost, realised)
+    return state
+
+
+@pytest.fixture
+def ledger(memory_session):
+    user = User(username="u", first_name="A", last_name="B", hashed_password="x")
+    stocks = [Stock(ticker_symbol=ticker) for ticker in ("A", "B", "C")]
+    portfolios = [UserPortfolio(user=user, name=name) for name in ("first", "second")]
+    memory_session.add_all([*stocks, *portfolios])
+    memory_session.flush()
+    return memory_session, [p.id for p in portfolios], [s.id for s in stocks]
+
+
+def random_trades(portfolio_ids, stock_ids, count, start, seed):
+    rng = np.random.default_rng(seed)
+    held, trades = {}, []
+    for day in range(count):
+        key = (int(rng.choice(portfolio_ids)), int(rng.choice(stock_ids)))
+        quantity = held.get(key, 0)
+        kind = rng.choice(["BUY", "SELL", "DIVIDEND", "STOCK_SPLIT"], p=[0.5, 0.3, 0.1, 0.1])
+        if quantity == 0 and kind != "DIVIDEND":
+            kind = "BUY"
+        size = {"BUY": int(rng.integers(1, 50)), "SELL": int(rng.integers(1, quantity + 1)) if quantity else 0,
+                "STOCK_SPLIT": quantity, "DIVIDEND": 0}[kind]
+        held[key] = quantity + (-size if kind == "SELL" else size if kind != "DIVIDEND" else 0)
+        trades.append(Transaction(portfolio_id=key[0], stock_id=key[1], transaction_type=kind,
+                                  transaction_date=start + timedelta(days=day), quantity=size,
+                                  price=float(rng.uniform(5, 100)), fees=float(rng.uniform(0, 2))))
+    return trades
+
+
+def assert_matches_reference(positions, trades):
+    expected = reference_positions(trades)
+    assert len(expected) == positions.portfolio_ids.size
+    for (portfolio_id, stock_id), (quantity, cost, realised) in expected.items():
+        actual = positions.position(portfolio_id, stock_id)
+        assert actual["quantity"] == pytest.approx(quantity)
+        # The vectorised recurrence accumulates rounding differently from the loop
+        assert actual["cost_value"] == pytest.approx(cost, rel=1e-6)
+        assert actual["realised_pnl"] == pytest.approx(realised, rel=1e-6)
+
+
+def test_replay_matches_trade_by_trade_bookkeeping(ledger):
+    session, portfolio_ids, stock_ids = ledger
+    trades = random_trades(portfolio_ids, stock_ids, 300, datetime(2023, 1, 1), seed=1)
+    session.add_all(trades)
+    session.flush()
+
+    positions = LedgerReplayEngine().replay(session)
+
+    assert_matches_reference(positions, trades)
+    assert positions.new_trades == {portfolio_ids[0]: sum(t.portfolio_id == portfolio_ids[0] for t in trades),
+                                    portfolio_ids[1]: sum(t.portfolio_id == portfolio_ids[1] for t in trades)}
+
+
+def test_update_resumes_from_checkpoint_and_derives_holdings(ledger):
+    session, portfolio_ids, stock_ids = ledger
+    engine = LedgerReplayEngine(checkpoint_every=1)
+    first = random_trades(portfolio_ids, stock_ids, 100, datetime(2023, 1, 1), seed=2)
+    session.add_all(first)
+    session.flush()
+    engine.update(session)
+    checkpoints = session.scalar(select(func.count()).select_from(HoldingCheckpoint))
+    assert checkpoints == engine.replay(session, full=True).portfolio_ids.size
+
+    later = random_trades(portfolio_ids, stock_ids, 20, datetime(2024, 1, 1), seed=3)
+    later = [t for t in later if t.transaction_type in ("BUY", "DIVIDEND")]
+    session.add_all(later)
+    session.flush()
+    positions = engine.update(session)
+
+    assert sum(positions.new_trades.values()) == 0  # checkpointed again
+    assert_matches_reference(positions, first + later)
+    holdings = {(h.portfolio_id, h.stock_id): h for h in session.scalars(select(Holding))}
+    open_positions = {key: value for key, value in reference_positions(first + later).items() if value[0] > 0}
+    assert set(holdings) == set(open_positions)
+    for key, (quantity, cost, _) in open_positions.items():
+        assert holdings[key].quantity == pytest.approx(quantity)
+        assert holdings[key].average_cost_basis == pytest.approx(cost / quantity)
+
+
+def test_backdated_trade_rebuilds_portfolio(ledger):
+    session, portfolio_ids, stock_ids = ledger
+    engine = LedgerReplayEngine(checkpoint_every=1)
+    trades = [
+        Transaction(portfolio_id=portfolio_ids[0], stock_id=stock_ids[0], transaction_type="BUY",
+                    transaction_date=datetime(2023, 1, 2), quantity=10, price=10.0, fees=0.0),
+        Transaction(portfolio_id=portfolio_ids[0], stock_id=stock_ids[0], transaction_type="SELL",
+                    transaction_date=datetime(2023, 1, 5), quantity=5, price=20.0, fees=0.0),
+    ]
+    session.add_all(trades)
+    session.flush()
+    engine.update(session)
+
+    backdated = Transaction(portfolio_id=portfolio_ids[0], stock_id=stock_ids[0], transaction_type="BUY",
+                            transaction_date=datetime(2023, 1, 3), quantity=10, price=40.0, fees=0.0)
+    session.add(backdated)
+    session.flush()
+    position = engine.replay(session).position(portfolio_ids[0], stock_ids[0])
+
+    # Sell now comes after both buys: average cost 25, 15 shares remain
+    assert position["quantity"] == 15
+    assert position["average_cost"] == pytest.approx(25.0)
+    assert position["realised_pnl"] == pytest.approx(5 * (20.0 - 25.0))
+
+
+def test_long_ledger_keeps_precision_across_lots(ledger):
+    session, portfolio_ids, stock_ids = ledger
+    # Many lots per position: earlier lots must not leak rounding into later ones
+    trades = random_trades(portfolio_ids, stock_ids, 20_000, datetime(2000, 1, 1), seed=4)
+    rows = [{column: getattr(trade, column) for column in
+             ("portfolio_id", "stock_id", "transaction_type", "transaction_date", "quantity", "price", "fees")}
+            for trade in trades]
+    session.execute(Transaction.__table__.insert(), rows)
+    for trade_id, trade in enumerate(trades, start=1):
+        trade.id = trade_id
+
+    positions = LedgerReplayEngine().replay(session)
+
+    for (portfolio_id, stock_id), (quantity, cost, realised) in reference_positions(trades).items():
+        actual = positions.position(portfolio_id, stock_id)
+        assert actual["quantity"] == quantity
+        assert actual["cost_value"] == pytest.approx(cost, rel=1e-9, abs=1e-6)
+        assert actual["realised_pnl"] == pytest.approx(realised, rel=1e-9, abs=1e-6)
+
+
+def test_segment_scans_restart_exactly():
+    rng = np.random.default_rng(5)
+    values = rng.uniform(-1e6, 1e6, 1001)
+    starts = rng.random(values.size) < 0.05
+    starts[0] = True
+    ratio = rng.uniform(0.1, 1.0, values.size)
+    expected_sum, expected_scan, running_sum, running_scan = [], [], 0.0, 0.0
+    for value, start, factor in zip(values, starts, ratio):
+        running_sum = value + (0.0 if start else running_sum)
+        running_scan = value + (0.0 if start else factor * running_scan)
+        expected_sum.append(running_sum)
+        expected_scan.append(running_scan)
+    np.testing.assert_allclose(_segment_cumsum(values, starts), expected_sum, rtol=1e-12, atol=1e-6)
+    np.testing.assert_allclose(_affine_scan(np.where(starts, 0.0, ratio), values), expected_scan, rtol=1e-12, atol=1e-6)
+
+
+def test_long_portfolio_lists_are_chunked(ledger):
+    session, portfolio_ids, stock_ids = ledger
+    engine = LedgerReplayEngine(checkpoint_every=1)
+    trades = random_trades(portfolio_ids, stock_ids, 50, datetime(2023, 1, 1), seed=6)
+    session.add_all(trades)
+    session.flush()
+    requested = [*range(10**6, 10**6 + 2 * MAX_BIND_PARAMS), *portfolio_ids]
+    connection = session.connection().connection.driver_connection
+    limit = connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, MAX_BIND_PARAMS)
+    try:
+        engine.update(session, requested)
+        backdated = Transaction(portfolio_id=portfolio_ids[1], stock_id=stock_ids[0], transaction_type="BUY",
+                                transaction_date=datetime(2022, 12, 1), quantity=3, price=9.0, fees=0.5)
+        session.add(backdated)
+        session.flush()
+        positions = engine.replay(session, requested)
+    finally:
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    assert_matches_reference(positions, trades + [backdated])
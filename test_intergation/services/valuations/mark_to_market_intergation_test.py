@@ -0,0 +1,69 @@
+# test_intergation/services/valuations/mark_to_market_intergation_test.py
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.dao.models import Holding, Stock, User, UserPortfolio
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS, HistoricalPriceBulkLoader
+from app.services.price_store import PriceStore
+from app.services.valuations.mark_to_market import MarkToMarketEngine, PriceSnapshot
+
+
+@pytest.fixture
+def portfolios(memory_session):
+    user = User(username="u", first_name="A", last_name="B", hashed_password="x")
+    stocks = [Stock(ticker_symbol=ticker) for ticker in ("A", "B", "C")]
+    first = UserPortfolio(user=user, name="first", holdings=[
+        Holding(stock=stocks[0], quantity=10, average_cost_basis=5.0),
+        Holding(stock=stocks[1], quantity=5, average_cost_basis=20.0),
+    ])
+    second = UserPortfolio(user=user, name="second", holdings=[
+        Holding(stock=stocks[2], quantity=1, average_cost_basis=1.0),  # never priced
+        Holding(stock=stocks[0], quantity=2, average_cost_basis=8.0),
+    ])
+    memory_session.add_all([first, second])
+    memory_session.flush()
+    dates = np.array(["2023-01-02", "2023-01-03"], dtype="datetime64[D]")
+    loader = HistoricalPriceBulkLoader()
+    loader.load_ohlc(stocks[0].id, dates, [0, 0], [0, 0], [0, 0], [9.0, 10.0], memory_session)
+    loader.load_ohlc(stocks[1].id, dates, [0, 0], [0, 0], [0, 0], [30.0, 15.0], memory_session)
+    return first.id, second.id
+
+
+def test_revalue_all_portfolios_in_one_pass(memory_session, portfolios):
+    first, second = portfolios
+    marks = MarkToMarketEngine().revalue(memory_session)
+
+    assert marks.price.tolist()[:2] == [10.0, 15.0]
+    assert marks.portfolio_summary() == {
+        first: {"market_value": 175.0, "cost_value": 150.0, "unrealised_pnl": 25.0},
+        second: {"market_value": 20.0, "cost_value": 16.0, "unrealised_pnl": 4.0},
+    }
+    first_weights = marks.weight[marks.portfolio_ids == first]
+    assert np.isclose(first_weights.sum(), 1.0)
+    assert np.isnan(marks.weight[marks.portfolio_ids == second][0])
+
+
+def test_snapshot_from_price_store_matches_database(memory_session, portfolios, tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.sync(memory_session)
+    from_store = MarkToMarketEngine(PriceSnapshot.from_store(store)).revalue(memory_session)
+    from_database = MarkToMarketEngine().revalue(memory_session)
+    np.testing.assert_array_equal(from_store.portfolio_market_value, from_database.portfolio_market_value)
+
+
+def test_long_id_lists_are_chunked(memory_session, portfolios):
+    first, second = portfolios
+    everything = MarkToMarketEngine().revalue(memory_session)
+    connection = memory_session.connection().connection.driver_connection
+    limit = connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, MAX_BIND_PARAMS)
+    try:
+        missing = list(range(10**6, 10**6 + 2 * MAX_BIND_PARAMS))
+        chunked = MarkToMarketEngine().revalue(memory_session, [second, *missing, first])
+        snapshot = PriceSnapshot.from_database(memory_session, [*missing, *everything.stock_ids.tolist()])
+    finally:
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    np.testing.assert_array_equal(chunked.holding_ids, everything.holding_ids)
+    np.testing.assert_array_equal(chunked.portfolio_market_value, everything.portfolio_market_value)
+    np.testing.assert_array_equal(snapshot.stock_ids, PriceSnapshot.from_database(memory_session).stock_ids)
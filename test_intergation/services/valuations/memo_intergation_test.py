@@ -0,0 +1,111 @@
+# test_intergation/services/valuations/memo_intergation_test.py
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app.dao.models import HistoricalMetrics, Stock, ValuationMemoEntry, ValuationModel
+from app.services.valuations.dcf import DCFEngine, DCFParameters
+from app.services.valuations.memo import ValuationMemo, memo_key
+from app.services.valuations.monte_carlo import MonteCarloEngine, MonteCarloParameters
+
+QUARTERS = [date(2023, 3, 31), date(2023, 6, 30), date(2023, 9, 30), date(2023, 12, 31)]
+
+
+@pytest.fixture
+def universe(memory_session):
+    stocks = [Stock(ticker_symbol=ticker) for ticker in ("A", "B", "C")]
+    memory_session.add_all(stocks)
+    memory_session.flush()
+    memory_session.add_all([
+        HistoricalMetrics(stock_id=stock.id, date=day, revenue=100.0, net_income=10.0 * scale, shares_outstanding=20.0)
+        for stock, scale in zip(stocks, (1.0, 1.1, 1.2)) for day in QUARTERS
+    ])
+    memory_session.flush()
+    return memory_session, [stock.id for stock in stocks]
+
+
+def valuation_count(session):
+    return session.scalar(select(func.count()).select_from(ValuationModel))
+
+
+def test_memo_key_normalises_inputs():
+    assert memo_key("DCF", '{"b": 1, "a": [2.0, null]}', {"x": 1}) == memo_key("DCF", {"a": [2, None], "b": 1.0}, '{"x": 1.0}')
+    assert memo_key("DCF", {"a": 1}) != memo_key("DCF", {"a": 2})
+    assert memo_key("DCF", {"a": 1}) != memo_key("DCF_MONTE_CARLO", {"a": 1})
+    assert memo_key("DCF", fingerprint=[date(2023, 1, 1)]) != memo_key("DCF", fingerprint=[date(2023, 1, 2)])
+
+
+def test_dcf_rerun_skips_unchanged_stocks(universe):
+    session, stock_ids = universe
+    memo = ValuationMemo()
+    first = DCFEngine().run(session, memo=memo)
+    assert valuation_count(session) == 3
+
+    assert DCFEngine().run(session, memo=memo) == first
+    assert valuation_count(session) == 3
+    assert memo.stats()["hit_ratio"] == pytest.approx(0.5)
+
+    edited = session.scalars(select(HistoricalMetrics).where(HistoricalMetrics.stock_id == stock_ids[1])).first()
+    edited.net_income = 50.0
+    session.flush()
+    third = DCFEngine().run(session, memo=memo)
+    assert valuation_count(session) == 4
+    assert third[0] == first[0] and third[2] == first[2] and third[1] not in first
+
+    # Other parameters are other keys
+    DCFEngine(DCFParameters(discount_rate=0.1)).run(session, memo=memo)
+    assert valuation_count(session) == 7
+
+
+def test_dcf_edit_that_keeps_aggregates_is_a_miss(universe):
+    session, stock_ids = universe
+    metrics = session.scalars(
+        select(HistoricalMetrics).where(HistoricalMetrics.stock_id == stock_ids[0]).order_by(HistoricalMetrics.date)
+    ).all()
+    for quarter, net_income in zip(metrics, (4.0, 8.0, 12.0, 16.0)):
+        quarter.net_income = net_income
+    session.flush()
+    memo = ValuationMemo()
+    first = DCFEngine().run(session, memo=memo)
+
+    # Same count, dates and sums; different inputs per quarter
+    metrics[0].net_income, metrics[-1].net_income = metrics[-1].net_income, metrics[0].net_income
+    session.flush()
+    rerun = DCFEngine().run(session, memo=memo)
+    assert rerun[0] != first[0] and rerun[1:] == first[1:]
+    assert rerun == DCFEngine().run(session, memo=memo)
+
+
+def test_run_returns_ids_in_stock_order_with_and_without_memo(universe):
+    session, stock_ids = universe
+    plain = DCFEngine().run(session, list(reversed(stock_ids)))
+    assert [session.get(ValuationModel, valuation_id).stock_id for valuation_id in plain] == stock_ids
+    memoised = DCFEngine().run(session, list(reversed(stock_ids)), memo=ValuationMemo())
+    assert [session.get(ValuationModel, valuation_id).stock_id for valuation_id in memoised] == stock_ids
+
+
+def test_monte_carlo_reuses_results_with_unchanged_inputs(universe):
+    session, _ = universe
+    memo = ValuationMemo()
+    DCFEngine().run(session)
+    engine = MonteCarloEngine(MonteCarloParameters(scenarios=500), workers=1)
+    first = engine.run(session, memo=memo)
+    # A fresh DCF run produces new rows with identical assumptions: the simulations still hit
+    DCFEngine().run(session)
+    before = valuation_count(session)
+    assert engine.run(session, memo=memo) == first
+    assert valuation_count(session) == before
+    assert memo.stats()["hits"] == 3
+
+
+def test_least_recently_used_entries_are_evicted(universe):
+    session, stock_ids = universe
+    memo = ValuationMemo(max_entries=2)
+    DCFEngine().run(session, stock_ids[:2], memo=memo)
+    DCFEngine().run(session, stock_ids[:1], memo=memo)  # touches the first stock's entry
+    DCFEngine().run(session, stock_ids[2:], memo=memo)
+
+    assert memo.size(session) == 2 and memo.stats()["evicted"] == 1
+    remaining = set(session.scalars(select(ValuationMemoEntry.stock_id)))
+    assert remaining == {stock_ids[0], stock_ids[2]}
@@ -0,0 +1,81 @@
+# test_intergation/services/valuations/monte_carlo_intergation_test.py
+import json
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.dao.models import HistoricalMetrics, Stock, ValuationModel
+from app.dao.repository.bulk_loader import MAX_BIND_PARAMS
+from app.services.valuations.dcf import DCFEngine
+from app.services.valuations.monte_carlo import MonteCarloEngine, MonteCarloParameters
+
+QUARTERS = [date(2022, 3, 31), date(2022, 6, 30), date(2022, 9, 30), date(2022, 12, 31),
+            date(2023, 3, 31), date(2023, 6, 30), date(2023, 9, 30), date(2023, 12, 31)]
+
+
+@pytest.fixture
+def valued(memory_session):
+    stocks = [Stock(ticker_symbol=ticker) for ticker in ("A", "B", "C")]
+    memory_session.add_all(stocks)
+    memory_session.flush()
+    memory_session.add_all([
+        HistoricalMetrics(stock_id=stock.id, date=day, revenue=100.0 * (scale if day.year == 2023 else 1.0),
+                          net_income=10.0 * scale, shares_outstanding=20.0)
+        for stock, scale in zip(stocks, (1.0, 1.1, 1.2)) for day in QUARTERS
+    ])
+    memory_session.flush()
+    DCFEngine().run(memory_session)
+    return memory_session, [stock.id for stock in stocks]
+
+
+def test_degenerate_distributions_reproduce_dcf(valued):
+    session, _ = valued
+    fixed = MonteCarloParameters(scenarios=1_000, growth_std=0.0, margin_std=0.0, discount_std=0.0)
+    engine = MonteCarloEngine(fixed, workers=1)
+    result = engine.simulate(engine.inputs(session))
+
+    dcf = dict(session.execute(select(ValuationModel.stock_id, ValuationModel.valuation_result)).all())
+    expected = np.array([dcf[stock_id] for stock_id in result.stock_ids.tolist()])
+    np.testing.assert_allclose(result.median, expected)
+    np.testing.assert_allclose(result.percentiles, np.repeat(expected[:, None], 5, axis=1))
+
+
+def test_seeded_results_do_not_depend_on_worker_count(valued):
+    session, _ = valued
+    parameters = MonteCarloParameters(scenarios=20_000, seed=7, block_size=6_000)
+    serial = MonteCarloEngine(parameters, workers=1)
+    inputs = serial.inputs(session)
+
+    single = serial.simulate(inputs)
+    pooled = MonteCarloEngine(parameters, workers=2).simulate(inputs)
+
+    np.testing.assert_array_equal(single.percentiles, pooled.percentiles)
+    assert np.all(np.diff(single.percentiles, axis=1) > 0)
+
+
+def test_run_writes_percentiles(valued):
+    session, stock_ids = valued
+    ids = MonteCarloEngine(MonteCarloParameters(scenarios=2_000), workers=1).run(session, stock_ids[:2])
+
+    rows = session.scalars(select(ValuationModel).where(ValuationModel.id.in_(ids))).all()
+    assert {row.stock_id for row in rows} == set(stock_ids[:2])
+    assumptions = json.loads(rows[0].assumptions)
+    assert set(assumptions["percentiles"]) == {"p5", "p25", "p50", "p75", "p95"}
+    assert rows[0].valuation_result == pytest.approx(assumptions["percentiles"]["p50"])
+
+
+def test_inputs_of_a_large_universe_are_loaded_in_chunks(valued):
+    session, stock_ids = valued
+    engine = MonteCarloEngine(workers=1)
+    everything = engine.inputs(session)
+    missing = list(range(10**6, 10**6 + 2 * MAX_BIND_PARAMS))
+    connection = session.connection().connection.driver_connection
+    limit = connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, MAX_BIND_PARAMS)
+    try:
+        chunked = engine.inputs(session, [*missing, *reversed(stock_ids)])
+    finally:
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    np.testing.assert_array_equal(chunked, everything)
@@ -0,0 +1,131 @@
+# test_intergation/services/valuations/relative_valuation_intergation_test.py
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.dao.models import HistoricalMetrics, Sector, SectorMetricAggregate, Stock
+from app.services.valuations.relative_valuation import SectorAggregates, group_percentiles, quarter_end
+
+
+@pytest.fixture
+def sectors(memory_session):
+    tech, energy = Sector(name="Tech"), Sector(name="Energy")
+    stocks = [Stock(ticker_symbol=f"T{n}", sectors=[tech]) for n in range(4)]
+    stocks.append(Stock(ticker_symbol="E0", sectors=[energy, tech]))
+    memory_session.add_all(stocks)
+    memory_session.flush()
+    for pe, stock in zip((10.0, 20.0, 30.0, 40.0, 50.0), stocks):
+        memory_session.add_all([
+            # The later row of the quarter wins
+            HistoricalMetrics(stock_id=stock.id, date=date(2023, 2, 1), price_to_earnings=pe * 100),
+            HistoricalMetrics(stock_id=stock.id, date=date(2023, 3, 31), price_to_earnings=pe, price_to_book=2.0),
+        ])
+    memory_session.flush()
+    aggregates = SectorAggregates()
+    aggregates.rebuild(memory_session)
+    return memory_session, aggregates, tech.id, energy.id, stocks
+
+
+def aggregate(session, sector_id, metric, quarter=date(2023, 3, 31)):
+    return session.get(SectorMetricAggregate, (sector_id, quarter, metric))
+
+
+def test_quarter_end_and_group_percentiles():
+    assert quarter_end(["2023-01-01", "2023-03-31", "2023-11-15"]).tolist() == [
+        date(2023, 3, 31), date(2023, 3, 31), date(2023, 12, 31)]
+    groups = np.array([0, 0, 0, 1, 1, 0])
+    values = np.array([3.0, 1.0, np.nan, 5.0, 7.0, 2.0])
+    counts, result = group_percentiles(groups, values, 3, [0.25, 0.5])
+    assert counts.tolist() == [3, 2, 0]
+    np.testing.assert_allclose(result[:2], [np.percentile([1, 2, 3], [25, 50]), np.percentile([5, 7], [25, 50])])
+    assert np.isnan(result[2]).all()
+
+
+def test_rebuild_materialises_sector_quarter_distributions(sectors):
+    session, _, tech, energy, _ = sectors
+    pe = aggregate(session, tech, "price_to_earnings")
+    assert (pe.count, pe.median, pe.min, pe.max, pe.mean) == (5, 30.0, 10.0, 50.0, 30.0)
+    assert pe.p25 == 20.0
+    assert aggregate(session, energy, "price_to_earnings").median == 50.0
+    assert aggregate(session, tech, "dividend_yield") is None  # no values, no row
+
+
+def test_refresh_recomputes_only_dirty_groups(sectors):
+    session, aggregates, tech, energy, stocks = sectors
+    energy_before = aggregate(session, energy, "price_to_earnings").updated_at
+
+    session.add(HistoricalMetrics(stock_id=stocks[0].id, date=date(2023, 3, 31), price_to_earnings=100.0))
+    session.add(HistoricalMetrics(stock_id=stocks[1].id, date=date(2023, 6, 30), price_to_earnings=12.0))
+    session.flush()
+    aggregates.refresh(session)
+    session.expire_all()
+
+    assert aggregate(session, tech, "price_to_earnings").max == 100.0
+    assert aggregate(session, tech, "price_to_earnings", date(2023, 6, 30)).count == 1
+    assert aggregate(session, energy, "price_to_earnings").updated_at == energy_before
+    assert aggregates.refresh(session) == 0
+
+
+def test_refresh_reads_only_the_dirty_quarter(sectors):
+    session, aggregates, tech, energy, stocks = sectors
+    session.add(HistoricalMetrics(stock_id=stocks[2].id, date=date(2023, 5, 15), price_to_earnings=7.0))
+    session.flush()
+
+    reads = []
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if "FROM historical_metric" in statement:
+            reads.append((statement, parameters))
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        aggregates.refresh(session)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(reads) == 1 and "BETWEEN" in reads[0][0]
+    assert "2023-04-01" in [str(value) for value in reads[0][1]]
+    session.expire_all()
+    assert aggregate(session, tech, "price_to_earnings", date(2023, 6, 30)).count == 1
+    assert aggregate(session, tech, "price_to_earnings").count == 5  # Q1 untouched
+
+
+def test_membership_change_refreshes_sector(sectors):
+    session, aggregates, tech, energy, stocks = sectors
+    session.commit()  # continuum cannot version adding and removing a membership in one transaction
+    session.get(Stock, stocks[4].id).sectors.remove(session.get(Sector, energy))
+    session.flush()
+    aggregates.refresh(session)
+    assert aggregate(session, energy, "price_to_earnings") is None
+
+
+def test_compare_reads_peer_aggregates(sectors):
+    session, _, tech, energy, stocks = sectors
+    comparisons = {(c.sector_id, c.metric): c for c in SectorAggregates().compare(session, stocks[4].id)}
+
+    assert comparisons[(tech, "price_to_earnings")].premium == pytest.approx(50.0 / 30.0 - 1)
+    assert comparisons[(energy, "price_to_earnings")].premium == pytest.approx(0.0)
+    assert comparisons[(tech, "price_to_book")].value == 2.0
+    in_quarter = SectorAggregates().compare(session, stocks[0].id, date(2023, 2, 15))
+    assert {c.metric: c.value for c in in_quarter}["price_to_earnings"] == 10.0
+    assert SectorAggregates().compare(session, stocks[0].id, date(2022, 6, 1)) == []
+
+
+def test_instances_do_not_add_session_listeners_and_close_detaches(memory_session):
+    listeners = len(Session().dispatch.after_flush)
+    instances = [SectorAggregates() for _ in range(50)]
+    assert len(Session().dispatch.after_flush) == listeners
+
+    closed, live = instances[0], instances[1]
+    closed.close()
+    stock = Stock(ticker_symbol="X")
+    memory_session.add(stock)
+    memory_session.flush()
+    memory_session.add(HistoricalMetrics(stock_id=stock.id, date=date(2023, 3, 31), price_to_earnings=1.0))
+    memory_session.commit()
+    assert live._stock_quarters == {(stock.id, date(2023, 3, 31))}
+    assert not closed._stock_quarters
+    for instance in instances[1:]:
+        instance.close()